@@ -5,12 +5,29 @@ ObsidianとTodoistの双方向同期を行う
 """
 
 import os
-import re
+import sys
 import json
-import requests
+import uuid
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 
+# リポジトリ直下の共通モジュールを読み込めるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from http_client import get_client
+from todoist_sync import TodoistSyncClient
+from todoist_metadata import TodoistMetadata
+from content_hash import has_meaningful_change
+from note_parser import extract_task_lines, note_date_from_path
+from note_merge import MergeBaseStore, merge_task_section
+from task_identity import TaskIdentityMap, task_title, add_markers
+from task_model import Task
+from note_writer import get_writer
+from outbox import Outbox
+from instrumentation import start_run, finish_run, span, count
+
 # 設定
 OBSIDIAN_VAULT_PATH = "/Users/tekitoo/Library/Mobile Documents/iCloud~md~obsidian/Documents/ObsidianVault"
 DAILY_NOTES_PATH = f"{OBSIDIAN_VAULT_PATH}/Vault/02.Index"
@@ -26,14 +43,32 @@ class TodoistAPI:
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json"
         }
-        self.base_url = "https://api.todoist.com/rest/v2"
+        self.base_url = Config.TODOIST_API_BASE_URL
+        
+        # 差分同期クライアント（sync_token + ローカルレプリカ）
+        if Config.TODOIST_INCREMENTAL_SYNC:
+            self.sync_client = TodoistSyncClient(self.api_token)
+        else:
+            self.sync_client = None
+        
+        # プロジェクト名などの解決（レプリカか有効期間付きキャッシュを使う）
+        self.metadata = TodoistMetadata(self.api_token, self.sync_client)
+        
+        # 送れなかった書き込みを次回に再送するアウトボックス
+        self.outbox = Outbox()
 
     def get_tasks(self, filter_str="today"):
         """タスクを取得"""
-        response = requests.get(
+        if filter_str == "today" and self.sync_client:
+            tasks = self.sync_client.get_today_tasks()
+            if tasks is not None:
+                return tasks
+        
+        response = get_client().get(
             f"{self.base_url}/tasks",
             headers=self.headers,
-            params={"filter": filter_str}
+            params={"filter": filter_str},
+            cache=True
         )
         if response.status_code == 200:
             return response.json()
@@ -42,12 +77,16 @@ class TodoistAPI:
             return []
 
     def complete_task(self, task_id):
-        """タスクを完了"""
-        response = requests.post(
-            f"{self.base_url}/tasks/{task_id}/close",
-            headers=self.headers
-        )
-        return response.status_code == 204
+        """タスクを完了（送れなければアウトボックスに残して次回再送）"""
+        self.outbox.enqueue_todoist("item_close", {"id": str(task_id)}, label=str(task_id))
+        results = self.outbox.flush_todoist(self.api_token)
+        return any(result['ok'] and result['args'].get('id') == str(task_id) for result in results.values())
+
+    def command_batch(self):
+        """Sync APIのコマンドバッチを作成"""
+        from todoist_commands import TodoistCommandBatch
+
+        return TodoistCommandBatch(self.api_token)
 
     def create_task(self, content, description=None, due_string=None):
         """新しいタスクを作成"""
@@ -56,7 +95,7 @@ class TodoistAPI:
             "description": description,
             "due_string": due_string
         }
-        response = requests.post(
+        response = get_client().post(
             f"{self.base_url}/tasks",
             headers=self.headers,
             json=data
@@ -69,6 +108,8 @@ class SyncManager:
     def __init__(self):
         self.todoist = TodoistAPI()
         self.sync_data = self.load_sync_data()
+        self.identity = TaskIdentityMap(self.sync_data.setdefault('task_mapping', {}))
+        self.merge_bases = MergeBaseStore()
 
     def load_sync_data(self):
         """同期データを読み込み"""
@@ -94,76 +135,115 @@ class SyncManager:
         return f"{DAILY_NOTES_PATH}/{year}/{month}/{day}.md"
 
     def parse_obsidian_tasks(self, file_path):
-        """Obsidianファイルからタスクを解析"""
-        if not os.path.exists(file_path):
+        """Obsidianファイルからタスク（Task）を解析"""
+        # 書き込み待ちの編集を含めた内容を読む
+        content = get_writer().read(file_path)
+        if content is None:
             return []
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # 今日のタスクセクションを抽出
-        pattern = r'#### ＜今日のタスク＞\n(.*?)(?=\n#### |$)'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if not match:
-            return []
+        # 今日のタスクセクションのタスク行を解析
+        return [
+            Task.from_content(task_line.content, task_line.checked)
+            for task_line in extract_task_lines(content)
+            if task_line.content
+        ]
 
-        tasks_section = match.group(1)
-        
-        # タスクを解析
-        tasks = []
-        for line in tasks_section.split('\n'):
-            line = line.strip()
-            if line.startswith('- ['):
-                completed = 'x' in line[:5]
-                task_content = re.sub(r'^- \[[x ]\] ', '', line)
-                if task_content:
-                    tasks.append({
-                        'content': task_content,
-                        'completed': completed,
-                        'original_line': line
-                    })
-        
-        return tasks
-
-    def sync_obsidian_to_todoist(self):
-        """ObsidianからTodoistへの同期"""
+    def sync_obsidian_to_todoist(self, todoist_tasks=None, daily_file=None):
+        """ObsidianからTodoistへの同期（daily_file省略時は今日のノート）"""
         print("🔄 Syncing Obsidian → Todoist...")
         
-        daily_file = self.get_daily_file_path()
-        obsidian_tasks = self.parse_obsidian_tasks(daily_file)
-        todoist_tasks = self.todoist.get_tasks("today")
+        if daily_file is None:
+            daily_file = self.get_daily_file_path()
+        with span("parse"):
+            obsidian_tasks = self.parse_obsidian_tasks(daily_file)
+        if todoist_tasks is None:
+            todoist_tasks = self.todoist.get_tasks("today")
+        
+        # マーカー・対応表・タイトルの順でTodoistタスクと対応付け
+        note = note_date_from_path(daily_file) or daily_file
+        matches = self.identity.match(note, obsidian_tasks, todoist_tasks)
+        
+        outbox = self.todoist.outbox
+        for obs_task, todoist_task in matches:
+            # Obsidianで完了、Todoistで未完了の場合
+            if todoist_task and obs_task.checked and not todoist_task.get('is_completed', False):
+                outbox.enqueue_todoist("item_close", {"id": str(todoist_task['id'])}, label=obs_task.title)
         
-        # Todoistタスクをマッピング
-        todoist_task_map = {task['content']: task for task in todoist_tasks}
+        # Obsidianで追加されたタスクはtemp_id付きのitem_addで作成
+        occurrences = defaultdict(int)
+        for obs_task in self.find_new_tasks(note, matches):
+            # 同じ行は同じキーになるので、送信待ちの間に何度同期しても1件だけ
+            key = f"item_add:{note}:{obs_task.title}#{occurrences[obs_task.title]}"
+            occurrences[obs_task.title] += 1
+            args = {"content": obs_task.title}
+            due = obs_task.due.isoformat() if obs_task.due else note_date_from_path(daily_file)
+            if due:
+                args["due"] = {"date": due}
+            outbox.enqueue_todoist(
+                "item_add", args, key=key, label=obs_task.title,
+                temp_id=str(uuid.uuid5(uuid.NAMESPACE_URL, key)),
+                meta={"file": daily_file, "note": note, "title": obs_task.title}
+            )
         
+        # 前回送れなかった分も含めてまとめて送信（送れなかった分は次回再送）
         completed_count = 0
+        created = defaultdict(list)  # ノート -> [(タイトル, 実ID), ...]
+        with span("push"):
+            results = outbox.flush_todoist(self.todoist.api_token)
+        for result in results.values():
+            if result['type'] == 'item_add':
+                meta = result.get('meta') or {}
+                if result['ok'] and result.get('id') and meta:
+                    print(f"➕ Created in Todoist: {result['key']}")
+                    self.identity.bind(result['id'], meta['note'], meta['title'])
+                    created[meta['file']].append((meta['title'], result['id']))
+                else:
+                    print(f"❌ Failed to create in Todoist: {result['key']} ({result['error']})")
+            elif result['ok']:
+                print(f"✅ Completed in Todoist: {result['key']}")
+                completed_count += 1
+            else:
+                print(f"❌ Failed to complete in Todoist: {result['key']} ({result['error']})")
         
-        for obs_task in obsidian_tasks:
-            task_content = obs_task['content']
-            
-            # Todoistに対応するタスクがあるかチェック
-            if task_content in todoist_task_map:
-                todoist_task = todoist_task_map[task_content]
-                
-                # Obsidianで完了、Todoistで未完了の場合
-                if obs_task['completed'] and not todoist_task.get('is_completed', False):
-                    if self.todoist.complete_task(todoist_task['id']):
-                        print(f"✅ Completed in Todoist: {task_content}")
-                        completed_count += 1
-                    else:
-                        print(f"❌ Failed to complete in Todoist: {task_content}")
-        
-        print(f"📊 Completed {completed_count} tasks in Todoist")
+        # 実IDのマーカーを書き戻す（他の編集と一緒に1回で書き込まれる）
+        for file_path, ids in created.items():
+            get_writer().edit(file_path, lambda content, ids=ids: add_markers(content, ids) if content else content)
+        created_count = sum(len(ids) for ids in created.values())
+        count("tasks_created", created_count)
+        
+        print(f"📊 Completed {completed_count}, created {created_count} tasks in Todoist")
         return completed_count
 
-    def sync_todoist_to_obsidian(self):
+    def find_new_tasks(self, note, matches):
+        """Todoistにまだない、Obsidianで追加された未完了のタスク
+        
+        マーカー・対応表にIDがある行と、同期で取り込んだ行（マージのベースにある
+        タイトルやプロジェクト表記付きの行）は除く。
+        """
+        imported = set()
+        for source in ('todoist', 'github'):
+            for line in self.merge_bases.load(source, note) or ():
+                task = Task.from_line(line)
+                if task:
+                    imported.add(task.title)
+        
+        new_tasks = []
+        for obs_task, todoist_task in matches:
+            if todoist_task or obs_task.checked or obs_task.todoist_id or obs_task.project:
+                continue
+            if not obs_task.title or obs_task.title in imported or self.identity.ids_for(note, obs_task.title):
+                continue
+            new_tasks.append(obs_task)
+        return new_tasks
+
+    def sync_todoist_to_obsidian(self, todoist_tasks=None):
         """TodoistからObsidianへの同期"""
         print("🔄 Syncing Todoist → Obsidian...")
         
         try:
             # 今日のタスクを取得
-            todoist_tasks = self.todoist.get_tasks("today")
+            if todoist_tasks is None:
+                todoist_tasks = self.todoist.get_tasks("today")
             if not todoist_tasks:
                 print("📝 No tasks found for today")
                 return True
@@ -171,40 +251,40 @@ class SyncManager:
             # 今日のファイルパスを取得
             daily_file = self.get_daily_file_path()
             
-            # ディレクトリが存在しない場合は作成
-            os.makedirs(os.path.dirname(daily_file), exist_ok=True)
-            
-            # ファイルが存在しない場合は作成
-            if not os.path.exists(daily_file):
-                with open(daily_file, 'w', encoding='utf-8') as f:
-                    f.write(f"# {datetime.now().strftime('%Y-%m-%d')}\n\n## 今日のタスク\n\n")
-            
-            # ファイルを読み込み
-            with open(daily_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # タスクセクションを更新
+            # タスクセクションを更新（行末にタスクIDのマーカーを付ける）
+            note = note_date_from_path(daily_file) or daily_file
+            metadata = self.todoist.metadata.refresh()
             task_lines = []
-            for task in todoist_tasks:
-                task_lines.append(f"- [ ] {task['content']} 🔥 [プロジェクト: {task.get('project_id', 'Unknown')}]")
+            for task in metadata.group(todoist_tasks):
+                project = metadata.project_label(task) if task.get('project_id') else 'Unknown'
+                task_lines.append(Task(
+                    task['content'], todoist_id=task['id'], project=project,
+                    project_id=task.get('project_id'), flagged=True
+                ).to_line())
+                self.identity.bind(task['id'], note, task_title(task['content']))
             
-            # タスクセクションを置換
-            import re
-            pattern = r'(#### ＜今日のタスク＞\n)(.*?)(?=\n#### |$)'
-            if re.search(pattern, content, re.DOTALL):
-                new_content = re.sub(
-                    pattern, 
-                    r'\1\n' + '\n'.join(task_lines) + '\n',
-                    content, 
-                    flags=re.DOTALL
-                )
-            else:
-                # タスクセクションが見つからない場合は追加
-                new_content = content + f"\n#### ＜今日のタスク＞\n\n" + '\n'.join(task_lines) + '\n'
+            base_lines = self.merge_bases.load('todoist', note)
+            
+            def apply(content):
+                # ファイルが存在しない場合は作成
+                if content is None:
+                    content = f"# {datetime.now().strftime('%Y-%m-%d')}\n\n## 今日のタスク\n\n"
+                
+                # 前回取り込んだ行をベースに3方向マージ（チェック済み・手動の行は残す）
+                new_content, _, conflicts = merge_task_section(content, task_lines, base_lines)
+                for conflict in conflicts:
+                    print(f"⚠️ 衝突のためVault側を優先: {conflict['ours']} ⇔ {conflict['theirs']}")
+                
+                # 変更がなければ書き込まない
+                if not has_meaningful_change(content, new_content):
+                    return content
+                return new_content
             
-            # ファイルに書き込み
-            with open(daily_file, 'w', encoding='utf-8') as f:
-                f.write(new_content)
+            # 書き込みは full_sync の最後にまとめて行う（ベースは書き込めた場合だけ更新）
+            get_writer().edit(
+                daily_file, apply,
+                on_flushed=lambda: self.merge_bases.save('todoist', note, task_lines)
+            )
             
             print(f"✅ Todoist → Obsidian sync completed: {len(todoist_tasks)} tasks")
             return True
@@ -216,26 +296,67 @@ class SyncManager:
     def full_sync(self):
         """完全な双方向同期"""
         print(f"🚀 Starting bidirectional sync - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        # 1. Todoist → Obsidian
-        todoist_success = self.sync_todoist_to_obsidian()
-        
-        # 2. Obsidian → Todoist
-        completed_count = self.sync_obsidian_to_todoist()
-        
-        # 3. 同期データを更新
+        run = start_run("bidirectional_sync")
+        status = "error"  # 例外で抜けた場合もその実行を記録する
+        try:
+            # 今日のタスクは一度だけ取得して両方向で共有
+            with span("fetch"):
+                todoist_tasks = self.todoist.get_tasks("today")
+            count("tasks_fetched", len(todoist_tasks))
+            
+            # 1. Todoist → Obsidian
+            with span("merge"):
+                todoist_success = self.sync_todoist_to_obsidian(todoist_tasks)
+            
+            # 2. Obsidian → Todoist（parse・push の区間は sync_obsidian_to_todoist の中で計測）
+            completed_count = self.sync_obsidian_to_todoist(todoist_tasks)
+            count("tasks_completed", completed_count)
+            
+            # 3. 同期データを更新
+            with span("write"):
+                self.identity.prune()
+                self.sync_data['last_sync'] = datetime.now().isoformat()
+                self.sync_data['metrics'] = run.summary()
+                self.save_sync_data()
+                
+                # 4. ノートへの編集を1回だけ書き込む
+                get_writer().flush()
+            
+            print(f"🎉 Bidirectional sync completed!")
+            print(f"   - Todoist → Obsidian: {'✅' if todoist_success else '❌'}")
+            print(f"   - Obsidian → Todoist: {completed_count} tasks completed")
+            get_client().report()
+            status = "success" if todoist_success else "failed"
+            
+            return {
+                'todoist_success': todoist_success,
+                'completed_count': completed_count,
+            }
+        finally:
+            finish_run(status)
+
+    def on_note_changed(self, file_path):
+        """監視モード: 変更されたノートだけをTodoistへ反映"""
+        print(f"📝 変更を検知: {file_path}")
+        self.sync_obsidian_to_todoist(daily_file=file_path)
         self.sync_data['last_sync'] = datetime.now().isoformat()
         self.save_sync_data()
-        
-        print(f"🎉 Bidirectional sync completed!")
-        print(f"   - Todoist → Obsidian: {'✅' if todoist_success else '❌'}")
-        print(f"   - Obsidian → Todoist: {completed_count} tasks completed")
+        get_writer().flush()
+
+    def watch(self):
+        """Vaultを監視し、保存されたノートをその都度同期"""
+        from vault_watcher import VaultWatcher
+
+        VaultWatcher(DAILY_NOTES_PATH, self.on_note_changed).run()
 
 def main():
     """メイン処理"""
     try:
         sync_manager = SyncManager()
-        sync_manager.full_sync()
+        if "--watch" in sys.argv[1:]:
+            sync_manager.watch()
+        else:
+            sync_manager.full_sync()
     except Exception as e:
         print(f"❌ Error during sync: {e}")
 
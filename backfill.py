@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Historical backfill
+期間内の完了タスクを1回のページングで取得し、欠けている日次ノートをまとめて1コミットで作り直す
+
+    python backfill.py 2025-07-01 2025-07-31 [--force] [--dry-run]
+"""
+
+import sys
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from config import Config
+from http_client import get_client
+from task_model import local_time
+
+
+def parse_date(value):
+    """YYYY-MM-DD を datetime に変換"""
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def date_range(start, end):
+    """start から end まで（両端を含む）の日付"""
+    days = (end - start).days
+    return [start + timedelta(days=offset) for offset in range(days + 1)]
+
+
+def local_range_to_utc(start, end, tz):
+    """ローカル日付の範囲を completed/get_all 用のUTC (since, until) に変換"""
+    since = start.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=tz)
+    until = end.replace(hour=23, minute=59, second=59, microsecond=0, tzinfo=tz)
+    return since.astimezone(timezone.utc), until.astimezone(timezone.utc)
+
+
+def bucket_by_local_date(items, tz):
+    """完了タスクを完了日（ローカル時刻）ごとに分ける（時刻の変換は Task.from_todoist と同じ）"""
+    buckets = defaultdict(list)
+    for item in items:
+        completed_at = item.get('completed_at')
+        if not completed_at:
+            continue
+        buckets[local_time(completed_at, tz).strftime("%Y-%m-%d")].append(item)
+    return buckets
+
+
+class Backfill:
+    """日付範囲の日次ノートを再生成してGitHubに1コミットで保存"""
+
+    def __init__(self, cloud=None):
+        if cloud is None:
+            from cloud_sync import CloudSync
+            cloud = CloudSync()
+        self.cloud = cloud
+        self.tz = ZoneInfo(Config.TIMEZONE)
+
+    def target_dates(self, start, end, force=False):
+        """作り直す日付（force でなければリポジトリにまだないノートだけ）"""
+        dates = date_range(start, end)
+        builder = self.cloud.commit_builder
+        if force or builder is None:
+            return dates
+        existing = builder.remote_paths("daily_notes/")
+        return [date for date in dates if self.cloud.github_note_path(date) not in existing]
+
+    def run(self, start, end, force=False, dry_run=False):
+        """バックフィルを実行し、作成したノート数を返す"""
+        started = datetime.now()
+        targets = self.target_dates(start, end, force)
+        print(f"🗓️ バックフィル: {start:%Y-%m-%d}〜{end:%Y-%m-%d} ({len(targets)}日が対象)")
+        if not targets:
+            print("✅ 欠けている日次ノートはありません")
+            return 0
+
+        # 期間全体の完了タスクを1回のページングで取得し、日付ごとに振り分ける
+        # 途中までの履歴で作ったノートは「既にあるノート」として以後作り直されないので、
+        # 最後まで取得できなければ1日分も保存しない
+        since, until = local_range_to_utc(targets[0], targets[-1], self.tz)
+        try:
+            buckets = bucket_by_local_date(self.cloud.iter_completed_tasks(since=since, until=until), self.tz)
+        except Exception as e:
+            print(f"❌ 完了履歴を最後まで取得できなかったため、ノートを作成しません: {e}")
+            raise
+
+        # 今日が含まれていれば今日期限の未完了タスクも載せる
+        today = datetime.now(self.tz).strftime("%Y-%m-%d")
+        incomplete_today = []
+        if today in {date.strftime("%Y-%m-%d") for date in targets}:
+            incomplete_today, _ = self.cloud.get_todoist_tasks()
+
+        created = 0
+        for date in targets:
+            key = date.strftime("%Y-%m-%d")
+            completed = buckets.get(key, [])
+            incomplete = incomplete_today if key == today else []
+            if not completed and not incomplete:
+                continue
+
+            content = self.cloud.create_simple_daily_note_content(incomplete, completed, date)
+            path = self.cloud.github_note_path(date)
+            print(f"📄 {path}: 未完了{len(incomplete)}個, 完了{len(completed)}個")
+            if not dry_run:
+                self.cloud.save_to_github(content, date)
+            created += 1
+
+        if created and not dry_run:
+            committed = self.cloud.commit_to_github(
+                f"Backfill daily notes {targets[0]:%Y-%m-%d}..{targets[-1]:%Y-%m-%d}"
+            )
+            if committed is False:
+                # GitHubが設定されていればノートはアウトボックスに残り、次回の同期で再送される
+                state = "GitHub未設定" if self.cloud.commit_builder is None else "アウトボックスに保留"
+                raise RuntimeError(f"{created}ノートをGitHubに書き込めませんでした（{state}）")
+
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"✅ バックフィル完了: {created}ノート ({elapsed:.1f}秒)")
+        get_client().report()
+        return created
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="欠けている日次ノートを期間指定で作り直す")
+    parser.add_argument("start", type=parse_date, help="開始日 (YYYY-MM-DD)")
+    parser.add_argument("end", type=parse_date, nargs="?", help="終了日 (YYYY-MM-DD、省略時は開始日)")
+    parser.add_argument("--force", action="store_true", help="既にあるノートも作り直す")
+    parser.add_argument("--dry-run", action="store_true", help="GitHubに書き込まない")
+    args = parser.parse_args()
+
+    end = args.end or args.start
+    if end < args.start:
+        print("❌ 終了日は開始日以降にしてください")
+        sys.exit(1)
+
+    try:
+        Backfill().run(args.start, end, force=args.force, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ バックフィルエラー: {e}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the sync scripts
+同期スクリプトの性能計測
+"""
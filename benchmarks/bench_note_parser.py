@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: note_parser vs. the previous regex path
+タスクセクションの抽出・差し替えを旧来の正規表現と比較する
+
+    python -m benchmarks.bench_note_parser [--tasks 2000] [--repeat 50]
+"""
+
+import re
+import sys
+import json
+import timeit
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from note_parser import parse_note, replace_task_section
+
+
+def build_note(task_count, filler_lines):
+    """大きな日次ノートを生成"""
+    lines = ["---", "tags:", "  - daily", "  - diary", "---", "### 2025-07-11", ""]
+    lines += ["#### <朝日記>"] + [f"メモ {i} ああいうえお" for i in range(filler_lines)]
+    lines += ["#### ＜今日のタスク＞", ""]
+    lines += [
+        f"- [{'x' if i % 3 == 0 else ' '}] タスク{i} [リンク](https://example.com/{i}) 🔥 [プロジェクト: 2354964701]"
+        for i in range(task_count)
+    ]
+    lines += ["", "#### ＜AI振り返り＞", ""]
+    lines += ["#### <夜振り返り>"] + [f"振り返り {i}" for i in range(filler_lines)]
+    return "\n".join(lines) + "\n"
+
+
+def regex_parse(content):
+    """旧 SyncManager.parse_obsidian_tasks 相当"""
+    match = re.search(r'#### ＜今日のタスク＞\n(.*?)(?=\n#### |$)', content, re.DOTALL)
+    tasks = []
+    for line in match.group(1).split('\n'):
+        line = line.strip()
+        if line.startswith('- ['):
+            tasks.append((re.sub(r'^- \[[x ]\] ', '', line), 'x' in line[:5]))
+    return tasks
+
+
+def regex_replace(content, lines):
+    """旧 sync_todoist_to_obsidian 相当"""
+    return re.sub(
+        r'(#### ＜今日のタスク＞\n)(.*?)(?=\n#### |$)',
+        lambda m: m.group(1) + '\n' + '\n'.join(lines) + '\n',
+        content,
+        flags=re.DOTALL
+    )
+
+
+def parser_parse(content):
+    index = parse_note(content)
+    return [(task.content, task.checked) for task in index.section_tasks(index.task_section())]
+
+
+def parser_replace(content, lines):
+    return replace_task_section(content, lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--filler", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    note = build_note(args.tasks, args.filler)
+    new_lines = [f"- [ ] 新タスク{i}" for i in range(args.tasks)]
+    assert regex_parse(note) == parser_parse(note)
+
+    cases = {
+        "parse/regex": lambda: regex_parse(note),
+        "parse/note_parser": lambda: parser_parse(note),
+        "replace/regex": lambda: regex_replace(note, new_lines),
+        "replace/note_parser": lambda: parser_replace(note, new_lines),
+    }
+
+    results = {"note_bytes": len(note.encode('utf-8')), "tasks": args.tasks, "timings_ms": {}}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        results["timings_ms"][name] = round(best * 1000, 3)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
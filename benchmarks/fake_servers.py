@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the Todoist and GitHub APIs
+ベンチマーク用に Todoist REST/Sync と GitHub（contents・Git Data API）を模したHTTPサーバー
+
+    /rest/v2/...   Todoist REST API v2
+    /sync/v9/...   Todoist Sync API v9
+    /github/...    GitHub REST API
+"""
+
+import json
+import time
+import uuid
+import base64
+import hashlib
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+
+def _blob_sha(data):
+    return hashlib.sha1(f"blob {len(data)}\0".encode('ascii') + data).hexdigest()
+
+
+def _object_sha(kind, payload):
+    return hashlib.sha1(f"{kind}:{json.dumps(payload, sort_keys=True)}".encode('utf-8')).hexdigest()
+
+
+class FakeTodoist:
+    """Todoistアカウントの状態（synthetic_vault.generate_todoist の形式）"""
+
+    def __init__(self, data):
+        self.lock = threading.Lock()
+        self.resources = {name: dict(data.get(name, {})) for name in ('items', 'projects', 'sections', 'labels')}
+        self.completed = list(data.get('completed', []))
+        self.version = 0
+        self.changed = {}  # (リソース名, ID) -> 変更されたバージョン
+
+    def _touch(self, name, obj_id):
+        self.version += 1
+        self.changed[(name, obj_id)] = self.version
+
+    def sync(self, form):
+        """POST /sync/v9/sync"""
+        with self.lock:
+            response = {'sync_status': {}, 'temp_id_mapping': {}}
+            for command in json.loads(form.get('commands', '[]')):
+                response['sync_status'][command['uuid']] = self._command(command, response['temp_id_mapping'])
+
+            token = form.get('sync_token', '*')
+            resource_types = json.loads(form.get('resource_types', '[]'))
+            since = int(token) if token.isdigit() else None
+            response['full_sync'] = since is None
+            for name in resource_types:
+                store = self.resources.get(name, {})
+                if since is None:
+                    response[name] = list(store.values())
+                else:
+                    response[name] = [
+                        store[obj_id] for (kind, obj_id), version in self.changed.items()
+                        if kind == name and version > since and obj_id in store
+                    ]
+            response['sync_token'] = str(self.version)
+            return response
+
+    def _command(self, command, temp_id_mapping):
+        args = command.get('args', {})
+        items = self.resources['items']
+        if command['type'] == 'item_close':
+            item = items.get(str(args.get('id')))
+            if item is None:
+                return {'error_code': 22, 'error': 'Item not found'}
+            item['checked'] = True
+            self.completed.insert(0, {
+                'id': uuid.uuid4().hex, 'task_id': item['id'], 'content': item['content'],
+                'project_id': item['project_id'], 'section_id': item.get('section_id'),
+                'completed_at': datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000000Z"),
+            })
+            self._touch('items', item['id'])
+            return 'ok'
+        if command['type'] == 'item_update':
+            item = items.get(str(args.get('id')))
+            if item is None:
+                return {'error_code': 22, 'error': 'Item not found'}
+            item.update({key: value for key, value in args.items() if key != 'id'})
+            self._touch('items', item['id'])
+            return 'ok'
+        if command['type'] == 'item_add':
+            item_id = str(8500000000 + len(items))
+            item = {'id': item_id, 'checked': False, 'is_deleted': False, 'child_order': len(items)}
+            item.update(args)
+            items[item_id] = item
+            if command.get('temp_id'):
+                temp_id_mapping[command['temp_id']] = item_id
+            self._touch('items', item_id)
+            return 'ok'
+        return {'error_code': 21, 'error': 'Unknown command'}
+
+    def completed_get_all(self, query):
+        """GET /sync/v9/completed/get_all"""
+        since = query.get('since', '')
+        until = query.get('until', '9999')
+        limit = int(query.get('limit', 30))
+        offset = int(query.get('offset', 0))
+        with self.lock:
+            items = [item for item in self.completed if since <= item['completed_at'][:19] <= until]
+        return {'items': items[offset:offset + limit], 'projects': {}}
+
+    def rest_tasks(self, query):
+        """GET /rest/v2/tasks?filter=today"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self.lock:
+            return [
+                dict(item, is_completed=False) for item in self.resources['items'].values()
+                if not item.get('checked') and item.get('due') and item['due']['date'] <= today
+            ]
+
+    def rest_close(self, item_id):
+        """POST /rest/v2/tasks/{id}/close"""
+        self._command({'type': 'item_close', 'args': {'id': item_id}}, {})
+
+
+class FakeGitHub:
+    """1リポジトリ分のblob・ツリー・コミット・ブランチ"""
+
+    def __init__(self, repository, branch='main', files=None):
+        self.lock = threading.Lock()
+        self.repository = repository
+        self.branch = branch
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        tree_sha = self._make_tree({}, files or {})
+        self.head = self._make_commit("Initial commit", tree_sha, [])
+
+    def _make_tree(self, base, files):
+        entries = dict(base)
+        for path, content in files.items():
+            data = content.encode('utf-8') if isinstance(content, str) else content
+            sha = _blob_sha(data)
+            self.blobs[sha] = data
+            entries[path] = sha
+        tree_sha = _object_sha('tree', entries)
+        self.trees[tree_sha] = entries
+        return tree_sha
+
+    def _make_commit(self, message, tree_sha, parents):
+        commit_sha = _object_sha('commit', {'m': message, 't': tree_sha, 'p': parents, 'n': len(self.commits)})
+        self.commits[commit_sha] = {'message': message, 'tree': tree_sha, 'parents': parents}
+        return commit_sha
+
+    def handle(self, method, parts, query, body, base):
+        """/repos/{owner}/{repo}/... を処理して (status, payload, headers) を返す"""
+        repo_url = f"{base}/repos/{self.repository}"
+        rest = parts[3:]
+        with self.lock:
+            if not rest:
+                return 200, {
+                    'full_name': self.repository, 'name': self.repository.split('/')[-1],
+                    'url': repo_url, 'default_branch': self.branch,
+                }, {}
+            if rest[0] == 'contents':
+                return self._contents('/'.join(rest[1:]), query)
+            if rest[:2] in (['git', 'ref'], ['git', 'refs']):
+                if method == 'PATCH':
+                    parent = self.commits.get(body['sha'], {}).get('parents', [])
+                    if self.head not in parent and not body.get('force'):
+                        return 422, {'message': 'Update is not a fast forward'}, {}
+                    self.head = body['sha']
+                return 200, {
+                    'ref': f"refs/heads/{self.branch}", 'url': f"{repo_url}/git/refs/heads/{self.branch}",
+                    'object': {'sha': self.head, 'type': 'commit', 'url': f"{repo_url}/git/commits/{self.head}"},
+                }, {}
+            if rest[:2] == ['git', 'commits']:
+                if method == 'POST':
+                    sha = self._make_commit(body['message'], body['tree'], body.get('parents', []))
+                else:
+                    sha = rest[2]
+                return 200, self._commit_payload(sha, repo_url), {}
+            if rest[:2] == ['git', 'trees']:
+                if method == 'POST':
+                    base_entries = self.trees.get(body.get('base_tree'), {})
+                    files = {element['path']: element['content'] for element in body['tree']}
+                    sha = self._make_tree(base_entries, files)
+                else:
+                    sha = rest[2]
+                return 200, self._tree_payload(sha, repo_url), {}
+        return 404, {'message': 'Not Found'}, {}
+
+    def _contents(self, path, query):
+        entries = self.trees[self.commits[self.head]['tree']]
+        sha = entries.get(unquote(path))
+        if sha is None:
+            return 404, {'message': 'Not Found'}, {}
+        etag = f'"{sha}"'
+        if query.get('_if_none_match') == etag:
+            return 304, None, {'ETag': etag}
+        return 200, {
+            'path': path, 'sha': sha, 'encoding': 'base64',
+            'content': base64.b64encode(self.blobs[sha]).decode('ascii'),
+        }, {'ETag': etag}
+
+    def _commit_payload(self, sha, repo_url):
+        commit = self.commits[sha]
+        return {
+            'sha': sha, 'url': f"{repo_url}/git/commits/{sha}", 'message': commit['message'],
+            'tree': {'sha': commit['tree'], 'url': f"{repo_url}/git/trees/{commit['tree']}"},
+            'parents': [{'sha': parent, 'url': f"{repo_url}/git/commits/{parent}"} for parent in commit['parents']],
+        }
+
+    def _tree_payload(self, sha, repo_url):
+        return {
+            'sha': sha, 'url': f"{repo_url}/git/trees/{sha}", 'truncated': False,
+            'tree': [
+                {'path': path, 'mode': '100644', 'type': 'blob', 'sha': blob_sha}
+                for path, blob_sha in sorted(self.trees[sha].items())
+            ],
+        }
+
+
+class FakeServer:
+    """Todoist・GitHubのスタンドインをまとめた1つのHTTPサーバー（応答遅延を設定可能）"""
+
+    def __init__(self, todoist, github, latency=0.0):
+        self.todoist = todoist
+        self.github = github
+        self.latency = latency
+        self.requests = 0
+        self.routes = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, route):
+        with self._lock:
+            self.requests += 1
+            self.routes[route] = self.routes.get(route, 0) + 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b''
+
+            def _send(self, status, payload, headers=None):
+                data = b'' if payload is None or status in (204, 304) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _dispatch(self, method):
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlsplit(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if self.headers.get('If-None-Match'):
+                    query['_if_none_match'] = self.headers['If-None-Match']
+                parts = [part for part in url.path.split('/') if part]
+                raw = self._body()
+
+                if parts[:2] == ['sync', 'v9']:
+                    server.count(f"todoist:{'/'.join(parts[2:])}")
+                    if parts[2:] == ['sync']:
+                        form = {key: values[-1] for key, values in parse_qs(raw.decode('utf-8')).items()}
+                        return self._send(200, server.todoist.sync(form))
+                    if parts[2:] == ['completed', 'get_all']:
+                        return self._send(200, server.todoist.completed_get_all(query))
+                elif parts[:2] == ['rest', 'v2']:
+                    server.count(f"todoist:rest/{parts[2] if len(parts) > 2 else ''}")
+                    if parts[2:] == ['tasks'] and method == 'GET':
+                        return self._send(200, server.todoist.rest_tasks(query))
+                    if len(parts) == 5 and parts[2] == 'tasks' and parts[4] == 'close':
+                        server.todoist.rest_close(parts[3])
+                        return self._send(204, None)
+                elif parts[:1] == ['github'] and parts[1:2] == ['repos']:
+                    server.count(f"github:{parts[4] if len(parts) > 4 else 'repo'}")
+                    body = json.loads(raw.decode('utf-8')) if raw else {}
+                    status, payload, headers = server.github.handle(
+                        method, parts[1:], query, body, f"{server.base_url}/github"
+                    )
+                    return self._send(status, payload, headers)
+                return self._send(404, {'message': 'Not Found'})
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PATCH(self):
+                self._dispatch('PATCH')
+
+        return Handler
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark runner
+合成Vaultとローカルのスタンドインサーバーで各同期処理を計測し、結果をJSONで出力する
+
+    python -m benchmarks.run_benchmarks [--notes 2000] [--tasks 200] [--latency 0.01] [--output results.json]
+
+結果の "startup" は各サブコマンドの起動時間と、STARTUP_BUDGET_MS の予算に収まっているか
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic_vault import generate_vault, generate_todoist, note_content
+from benchmarks.fake_servers import FakeTodoist, FakeGitHub, FakeServer
+
+REPOSITORY = "bench/obsidian-sync"
+
+# サブコマンドの起動で読み込むモジュール（別プロセスで計測）
+STARTUP_CASES = {
+    "interpreter": "pass",
+    "status": "import obsidian_sync; obsidian_sync.main(['status'])",
+    "cloud": "import obsidian_sync, cloud_sync",
+    "local": "import obsidian_sync, local_sync",
+    "bidi": "import obsidian_sync, sync_daemon; sync_daemon.load_bidirectional_sync()",
+    "backfill": "import obsidian_sync, backfill",
+}
+# 起動時間の予算（素のインタープリター起動を除いたミリ秒）
+STARTUP_BUDGET_MS = {
+    "status": 30,
+    "cloud": 80,
+    "local": 60,
+    "bidi": 60,
+    "backfill": 60,
+}
+
+
+def git_revision():
+    """計測したコミット（比較用）"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def configure_environment(state_dir, base_url):
+    """同期モジュールを読み込む前に、接続先と状態の保存先を差し替える"""
+    os.environ.update({
+        "OBSIDIAN_SYNC_STATE_DIR": state_dir,
+        "TODOIST_API_TOKEN": "bench-token",
+        "TODOIST_API_BASE_URL": f"{base_url}/rest/v2",
+        "TODOIST_SYNC_API_URL": f"{base_url}/sync/v9",
+        "GITHUB_API_URL": f"{base_url}/github",
+        "GITHUB_TOKEN": "bench-token",
+        "GITHUB_REPOSITORY": REPOSITORY,
+    })
+
+
+def measure_startup(repeat):
+    """各サブコマンドの起動（import）時間を新しいプロセスで計測し、予算と比べる"""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    timings = {}
+    for name, code in STARTUP_CASES.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True)
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[name] = min(samples)
+
+    baseline = timings.pop("interpreter")
+    results = {"interpreter": {"best_ms": round(baseline, 3)}}
+    for name, best in timings.items():
+        overhead = best - baseline
+        results[name] = {
+            "best_ms": round(best, 3),
+            "overhead_ms": round(overhead, 3),
+            "budget_ms": STARTUP_BUDGET_MS[name],
+            "within_budget": overhead <= STARTUP_BUDGET_MS[name],
+        }
+    return results
+
+
+def load_bidirectional_sync():
+    import importlib.util
+
+    path = ROOT / "03.Automation" / "bidirectional_sync.py"
+    spec = importlib.util.spec_from_file_location("bidirectional_sync", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Runner:
+    """各ケースを繰り返し実行して、時間とスタンドインへのリクエスト数を記録"""
+
+    def __init__(self, server, repeat):
+        self.server = server
+        self.repeat = repeat
+        self.results = {}
+
+    def measure(self, name, func, split_cold=False):
+        timings = []
+        requests = []
+        for _ in range(self.repeat):
+            before = self.server.requests
+            started = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                func()
+            timings.append((time.perf_counter() - started) * 1000)
+            requests.append(self.server.requests - before)
+
+        if split_cold and len(timings) > 1:
+            self.results[f"{name}/cold"] = {"ms": round(timings[0], 3), "requests": requests[0]}
+            timings, requests = timings[1:], requests[1:]
+            name = f"{name}/warm"
+        self.results[name] = {
+            "best_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "requests": max(requests),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--notes", type=int, default=2000, help="合成Vaultの日次ノート数")
+    parser.add_argument("--note-tasks", type=int, default=200, help="ノートあたりのタスク数")
+    parser.add_argument("--tasks", type=int, default=200, help="Todoistの未完了タスク数")
+    parser.add_argument("--completed", type=int, default=500, help="Todoistの完了タスク数（履歴）")
+    parser.add_argument("--latency", type=float, default=0.01, help="スタンドインサーバーの応答遅延（秒）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="結果のJSONを書き出すパス（省略時は標準出力）")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="obsidian-sync-bench-")
+    today = datetime.now()
+    account = generate_todoist(args.tasks, args.completed, today=today)
+    github = FakeGitHub(REPOSITORY)
+    server = FakeServer(FakeTodoist(account), github, latency=args.latency).start()
+    configure_environment(os.path.join(workdir, "state"), server.base_url)
+
+    # 接続先を差し替えてから読み込む
+    from config import Config
+    from cloud_sync import CloudSync
+    from local_sync import LocalSync
+    from note_writer import get_writer
+
+    vault = os.path.join(workdir, "vault")
+    started = time.perf_counter()
+    paths = generate_vault(vault, args.notes, args.note_tasks, end=today)
+    vault_seconds = time.perf_counter() - started
+    Config.DAILY_NOTES_PATH = vault
+
+    bidirectional = load_bidirectional_sync()
+    bidirectional.DAILY_NOTES_PATH = vault
+    bidirectional.SYNC_DATA_FILE = os.path.join(workdir, "sync_data.json")
+
+    runner = Runner(server, args.repeat)
+    with redirect_stdout(io.StringIO()):
+        manager = bidirectional.SyncManager()
+        cloud = CloudSync()
+        local = LocalSync()
+
+    # 1. ノートのタスク解析（今日の大きなノート）
+    runner.measure("parse_obsidian_tasks", lambda: manager.parse_obsidian_tasks(paths[-1]))
+
+    # 2. タスク行の整形（未完了 + 完了履歴）
+    incomplete = list(account['items'].values())
+    runner.measure(
+        "format_tasks_for_obsidian",
+        lambda: cloud.format_tasks_for_obsidian(incomplete, account['completed'])
+    )
+
+    # 3. GitHubの内容をVaultのノートへマージして書き込み
+    github_note = note_content(random.Random(1), today, args.note_tasks)
+    runner.measure("update_obsidian_file", lambda: (local.update_obsidian_file(github_note), local.flush_notes()))
+
+    # 4. 双方向同期（初回は完全同期、以降は差分）
+    runner.measure("full_sync", manager.full_sync, split_cold=True)
+
+    # 5. クラウド同期（Todoist取得 → ノート作成 → GitHubに1コミット）
+    runner.measure("cloud_run_sync", cloud.run_sync, split_cold=True)
+
+    get_writer().flush()
+    server.stop()
+
+    # 6. サブコマンドごとの起動時間
+    startup = measure_startup(args.repeat)
+
+    results = {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {
+            "notes": args.notes,
+            "note_tasks": args.note_tasks,
+            "todoist_open_tasks": args.tasks,
+            "todoist_completed_tasks": args.completed,
+            "latency_s": args.latency,
+            "repeat": args.repeat,
+        },
+        "vault": {"notes": len(paths), "generate_seconds": round(vault_seconds, 3)},
+        "cases": runner.results,
+        "startup": startup,
+        "server_requests": server.routes,
+    }
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
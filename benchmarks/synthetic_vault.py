@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Synthetic vault and Todoist account generator
+日本語・リンク入りの日次ノートと、Todoistのタスク・履歴を乱数で生成する
+"""
+
+import os
+import random
+from datetime import datetime, timedelta
+
+VERBS = ['確認する', '整理する', '送る', '書く', '読む', '予約する', '準備する', '振り返る', '片付ける', '調べる']
+OBJECTS = [
+    '請求書', '議事録', '企画書', 'メール', '読書メモ', '歯医者', '買い物リスト',
+    '週報', 'ブログ記事', '家計簿', '旅行の計画', '英単語', 'ランニング', '部屋の掃除',
+]
+PROJECT_NAMES = ['受信箱', '仕事', '個人', '副業', '学習', '家事', '健康', '読書']
+SECTION_NAMES = ['今週', '来週', 'いつか', '会議', '連絡']
+
+
+def task_text(rng, number):
+    """タスク名（3件に1件はリンク付き）"""
+    text = f"{rng.choice(OBJECTS)}を{rng.choice(VERBS)} #{number}"
+    if number % 3 == 0:
+        text += f" [資料](https://example.com/docs/{number})"
+    return text
+
+
+def note_content(rng, date, tasks_per_note, start_number=0):
+    """Vault形式の日次ノート"""
+    lines = [
+        "---", "tags:", "  - daily", "  - diary", "---",
+        f"### {date:%Y-%m-%d}", "",
+        "#### <朝日記>", "##### やりたいこと: ", "今日は早めに寝る。散歩もしたい。", "",
+        "#### ＜今日のタスク＞",
+    ]
+    for offset in range(tasks_per_note):
+        number = start_number + offset
+        if rng.random() < 0.5:
+            lines.append(f"- [x] {task_text(rng, number)} ✅ {rng.randint(6, 23):02d}:{rng.randint(0, 59):02d} [プロジェクト: {rng.choice(PROJECT_NAMES)}] %%td:{number}%%")
+        else:
+            lines.append(f"- [ ] {task_text(rng, number)} 🔥 [プロジェクト: {rng.choice(PROJECT_NAMES)}] %%td:{number}%%")
+    lines += [
+        "", "#### ＜AI振り返り＞", "",
+        "#### <夜振り返り>", "##### 1️⃣今日の出来事を記入する: ",
+        "会議が長引いたが、[[プロジェクトA]]の方針が決まった。", "",
+        "---", f"*Last updated: {date:%Y-%m-%d} 21:00:00 (Local Sync)*", "",
+    ]
+    return "\n".join(lines)
+
+
+def generate_vault(root, notes=1000, tasks_per_note=50, end=None, seed=0):
+    """root/YYYY/MM/DD.md 形式で notes 日分のノートを生成し、パスのリストを返す"""
+    rng = random.Random(seed)
+    if end is None:
+        end = datetime.now()
+    paths = []
+    for offset in range(notes):
+        date = end - timedelta(days=notes - 1 - offset)
+        path = os.path.join(root, date.strftime("%Y"), date.strftime("%m"), f"{date:%d}.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(note_content(rng, date, tasks_per_note, offset * tasks_per_note))
+        paths.append(path)
+    return paths
+
+
+def generate_todoist(open_tasks=200, completed_tasks=500, days=3, today=None, seed=0):
+    """Todoistアカウントのデータ {projects, sections, labels, items, completed}"""
+    rng = random.Random(seed)
+    if today is None:
+        today = datetime.now()
+    today_str = today.strftime("%Y-%m-%d")
+
+    projects = {}
+    for order, name in enumerate(PROJECT_NAMES):
+        project_id = str(2350000000 + order)
+        projects[project_id] = {
+            'id': project_id, 'name': name, 'child_order': order,
+            'inbox_project': order == 0, 'is_deleted': False,
+        }
+    sections = {}
+    for order, name in enumerate(SECTION_NAMES):
+        section_id = str(180000000 + order)
+        sections[section_id] = {
+            'id': section_id, 'name': name, 'section_order': order,
+            'project_id': str(2350000001 + order % (len(PROJECT_NAMES) - 1)), 'is_deleted': False,
+        }
+    labels = {
+        str(2150000000 + order): {'id': str(2150000000 + order), 'name': name, 'item_order': order}
+        for order, name in enumerate(['急ぎ', '外出', '電話', 'PC'])
+    }
+
+    project_ids = list(projects)
+    section_ids = list(sections)
+    items = {}
+    for number in range(open_tasks):
+        item_id = str(8000000000 + number)
+        due = today_str if number % 4 else (today - timedelta(days=1)).strftime("%Y-%m-%d")
+        items[item_id] = {
+            'id': item_id,
+            'content': task_text(rng, number),
+            'project_id': rng.choice(project_ids),
+            'section_id': rng.choice(section_ids) if number % 2 else None,
+            'labels': rng.sample(['急ぎ', '外出', '電話', 'PC'], k=number % 3),
+            'due': {'date': due, 'is_recurring': False, 'string': due},
+            'priority': 1 + number % 4,
+            'child_order': number,
+            'checked': False,
+            'is_deleted': False,
+        }
+
+    completed = []
+    span = days * 24 * 60 * 60
+    for number in range(completed_tasks):
+        completed_at = today.replace(hour=23, minute=0, second=0, microsecond=0) - timedelta(seconds=rng.randrange(span))
+        completed.append({
+            'id': str(9000000000 + number),
+            'task_id': str(7000000000 + number),
+            'content': task_text(rng, open_tasks + number),
+            'project_id': rng.choice(project_ids),
+            'section_id': None,
+            'completed_at': completed_at.strftime("%Y-%m-%dT%H:%M:%S.000000Z"),
+        })
+    completed.sort(key=lambda item: item['completed_at'], reverse=True)
+
+    return {'projects': projects, 'sections': sections, 'labels': labels, 'items': items, 'completed': completed}
@@ -6,12 +6,21 @@ GitHub Actions用のクラウド同期スクリプト
 
 import os
 import json
-import requests
 from datetime import datetime, timedelta
 from pathlib import Path
 import base64
-from github import Github
 from config import Config
+from http_client import get_client
+from todoist_sync import TodoistSyncClient
+from todoist_metadata import TodoistMetadata
+from github_commit import GitHubCommitBuilder, connect_github
+from content_hash import has_meaningful_change, read_if_exists
+from note_parser import replace_task_section
+from task_model import Task
+from note_writer import get_writer
+from outbox import Outbox
+from instrumentation import start_run, finish_run, current_run, span, count
+from todoist_history import iter_completed_items, completed_window
 
 class CloudSync:
     def __init__(self):
@@ -27,50 +36,69 @@ class CloudSync:
             "Content-Type": "application/json"
         }
         
-        # GitHub APIクライアント
-        if self.github_token:
-            self.github = Github(self.github_token)
-            self.repo = self.github.get_repo(self.repo_name)
+        self.task_counts = {'incomplete': 0, 'completed': 0}
+        
+        # 送れなかった書き込みを次回に再送するアウトボックス
+        self.outbox = Outbox()
+        
+        # 差分同期クライアント（sync_token + ローカルレプリカ）
+        if Config.TODOIST_INCREMENTAL_SYNC:
+            self.todoist_sync = TodoistSyncClient(self.todoist_token)
         else:
-            self.github = None
-            self.repo = None
+            self.todoist_sync = None
+        
+        # プロジェクト名などの解決（レプリカか有効期間付きキャッシュを使う）
+        self.metadata = TodoistMetadata(self.todoist_token, self.todoist_sync)
+        
+        # GitHub APIクライアント（PyGithubの読み込みは重いので初回利用時に作成）
+        self._repo = None
+        self._commit_builder = None
+    
+    @property
+    def repo(self):
+        """GitHubリポジトリ（GITHUB_TOKENがなければNone）"""
+        if self._repo is None and self.github_token:
+            self._repo = connect_github(self.github_token, self.repo_name)
+        return self._repo
     
-    def get_todoist_tasks(self):
-        """Todoistからタスクを取得（未完了と今日完了したタスク）"""
+    @property
+    def commit_builder(self):
+        """1コミットにまとめて書き込むビルダー（GITHUB_TOKENがなければNone）"""
+        if self._commit_builder is None and self.repo is not None:
+            self._commit_builder = GitHubCommitBuilder(self.repo)
+        return self._commit_builder
+    
+    def get_todoist_tasks(self, days=1):
+        """Todoistからタスクを取得（未完了と今日完了したタスク）
+        
+        完了タスクはページを辿りながら1件ずつ返すジェネレーターで返す
+        """
         try:
             print("🔍 Todoistタスクを取得中...")
             
-            # 未完了の今日期限タスク
-            today_response = requests.get(
-                "https://api.todoist.com/rest/v2/tasks",
-                headers=self.headers,
-                params={"filter": "today"}
-            )
-            
-            if today_response.status_code != 200:
-                print(f"❌ Todoist API error: {today_response.status_code}")
-                return [], []
-            
-            incomplete_tasks = today_response.json()
+            # 未完了の今日期限タスク（差分同期が使えればレプリカから）
+            incomplete_tasks = None
+            if self.todoist_sync:
+                incomplete_tasks = self.todoist_sync.get_today_tasks()
             
-            # 今日完了したタスク
-            today_str = datetime.now().strftime("%Y-%m-%d")
-            completed_response = requests.get(
-                "https://api.todoist.com/sync/v9/completed/get_all",
-                headers=self.headers,
-                params={
-                    "since": f"{today_str}T00:00",
-                    "until": f"{today_str}T23:59",
-                    "limit": 100
-                }
-            )
+            if incomplete_tasks is None:
+                today_response = get_client().get(
+                    f"{Config.TODOIST_API_BASE_URL}/tasks",
+                    headers=self.headers,
+                    params={"filter": "today"},
+                    cache=True
+                )
+                
+                if today_response.status_code != 200:
+                    print(f"❌ Todoist API error: {today_response.status_code}")
+                    return [], []
+                
+                incomplete_tasks = today_response.json()
             
-            completed_tasks = []
-            if completed_response.status_code == 200:
-                completed_data = completed_response.json()
-                completed_tasks = completed_data.get('items', [])
+            # 完了したタスク（今日を含む直近days日分、件数の上限なし）
+            completed_tasks = self.iter_completed_tasks(days)
             
-            print(f"📋 取得したタスク: 未完了{len(incomplete_tasks)}個, 完了{len(completed_tasks)}個")
+            print(f"📋 取得したタスク: 未完了{len(incomplete_tasks)}個")
             
             return incomplete_tasks, completed_tasks
             
@@ -78,61 +106,52 @@ class CloudSync:
             print(f"❌ タスク取得エラー: {e}")
             return [], []
     
-    def format_tasks_for_obsidian(self, incomplete_tasks, completed_tasks):
-        """タスクをObsidian形式に変換（未完了と完了済み）"""
+    def iter_completed_tasks(self, days=None, since=None, until=None):
+        """完了タスクを1件ずつ取得（days省略時はConfig.HISTORY_DAYS日分、取得に失敗したら例外）"""
+        if since is None or until is None:
+            since, until = completed_window(days)
+        
+        try:
+            yield from iter_completed_items(self.todoist_token, since, until)
+        except Exception as e:
+            # 途中までの履歴でノートを作らないよう呼び出し元に伝える
+            print(f"❌ 完了タスク取得エラー: {e}")
+            raise
+    
+    def format_tasks_for_obsidian(self, incomplete_tasks, completed_tasks, date=None):
+        """タスクをObsidian形式に変換（未完了と完了済み）
+        
+        completed_tasks はイテレーターでもよく、行は届いた順に組み立てる
+        """
         formatted_tasks = []
-        today = datetime.now().strftime("%Y-%m-%d")
+        today = (date or datetime.now()).date()
+        self.task_counts = {'incomplete': 0, 'completed': 0}
+        self.metadata.refresh()
         
-        # 未完了タスクを処理
-        for task in incomplete_tasks:
-            task_line = f"- [ ] {task['content']}"
-            
-            # 期限があれば追加
-            if task.get('due'):
-                due_date = task['due']['date']
-                if due_date == today:
-                    task_line += " 🔥"
-                else:
-                    task_line += f" (期限: {due_date})"
-            
-            # プロジェクトがあれば追加
-            if task.get('project_id'):
-                task_line += f" [プロジェクト: {task['project_id']}]"
-            
-            formatted_tasks.append(task_line)
+        # 未完了タスクを処理（プロジェクト・セクション順にまとめる）
+        # 期限（今日なら🔥）・プロジェクト・双方向同期用のマーカーは Task.to_line が付ける
+        for item in self.metadata.group(incomplete_tasks):
+            project = self.metadata.project_label(item) if item.get('project_id') else None
+            formatted_tasks.append(Task.from_todoist(item, project, completed=False).to_line(today))
+            self.task_counts['incomplete'] += 1
         
-        # 完了済みタスクを処理
+        # 完了済みタスクを処理（完了時刻付き）
         for item in completed_tasks:
-            task = item.get('content', '')
-            if task:
-                task_line = f"- [x] {task}"
-                
-                # 完了時刻を追加
-                completed_at = item.get('completed_at', '')
-                if completed_at:
-                    # ISO形式から時刻のみ抽出
-                    try:
-                        completed_time = datetime.fromisoformat(completed_at.replace('Z', '+00:00'))
-                        task_line += f" ✅ {completed_time.strftime('%H:%M')}"
-                    except:
-                        task_line += " ✅"
-                
-                # プロジェクトがあれば追加
-                if item.get('project_id'):
-                    task_line += f" [プロジェクト: {item['project_id']}]"
-                
-                formatted_tasks.append(task_line)
+            if item.get('content'):
+                project = self.metadata.project_label(item) if item.get('project_id') else None
+                formatted_tasks.append(Task.from_todoist(item, project, completed=True).to_line(today))
+                self.task_counts['completed'] += 1
         
         if not formatted_tasks:
             return "タスクがありません"
         
         return "\n".join(formatted_tasks)
     
-    def create_simple_daily_note_content(self, incomplete_tasks, completed_tasks):
-        """GitHub Actions用シンプルな日次ノートのコンテンツを作成"""
-        today = datetime.now()
+    def create_simple_daily_note_content(self, incomplete_tasks, completed_tasks, date=None):
+        """GitHub Actions用シンプルな日次ノートのコンテンツを作成（date省略時は今日）"""
+        today = date or datetime.now()
         date_str = today.strftime("%Y-%m-%d")
-        formatted_tasks = self.format_tasks_for_obsidian(incomplete_tasks, completed_tasks)
+        formatted_tasks = self.format_tasks_for_obsidian(incomplete_tasks, completed_tasks, today)
         
         content = f"""# {date_str}
 
@@ -147,10 +166,10 @@ class CloudSync:
 """
         return content
 
-    def create_daily_note_content(self, tasks):
+    def create_daily_note_content(self, incomplete_tasks, completed_tasks):
         """日次ノートのコンテンツを作成"""
         today = datetime.now()
-        formatted_tasks = self.format_tasks_for_obsidian(tasks)
+        formatted_tasks = self.format_tasks_for_obsidian(incomplete_tasks, completed_tasks)
         
         # Obsidianファイルの既存内容を取得
         obsidian_file_path = Config.get_daily_file_path(today)
@@ -165,23 +184,8 @@ class CloudSync:
         
         # タスクセクションを更新
         if existing_content:
-            # 既存のタスクセクションを置換
-            import re
-            task_section_pattern = r'(#### ＜今日のタスク＞\s*\n)(.*?)(\n#### ＜AI振り返り＞|$)'
-            new_task_section = f"#### ＜今日のタスク＞\n{formatted_tasks}\n\n"
-            
-            if re.search(task_section_pattern, existing_content, re.DOTALL):
-                updated_content = re.sub(
-                    task_section_pattern,
-                    lambda m: new_task_section + (m.group(3) if m.group(3) else ''),
-                    existing_content,
-                    flags=re.DOTALL
-                )
-            else:
-                # タスクセクションが見つからない場合は末尾に追加
-                updated_content = existing_content + f"\n\n{new_task_section}"
-            
-            return updated_content
+            # 既存のタスクセクションの本文だけを差し替え（なければ末尾に追加）
+            return replace_task_section(existing_content, formatted_tasks.split('\n'))
         else:
             # ファイルが存在しない場合はシンプルな形式で作成
             date_str = today.strftime("%Y-%m-%d")
@@ -201,89 +205,65 @@ tags:
             return content
     
     def save_to_obsidian(self, content):
-        """Obsidianファイルに直接保存"""
+        """Obsidianファイルに保存（実行の最後にまとめて書き込む）"""
         try:
             today = datetime.now()
             obsidian_file_path = Config.get_daily_file_path(today)
             
-            # ディレクトリが存在しない場合は作成
-            os.makedirs(os.path.dirname(obsidian_file_path), exist_ok=True)
-            
-            # ファイルに書き込み
-            with open(obsidian_file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # フッター以外に変更がなければ書き込まない
+            def apply(existing_content):
+                if not has_meaningful_change(existing_content, content):
+                    return existing_content
+                return content
             
-            print(f"✅ Obsidianファイル更新: {obsidian_file_path}")
+            writer = get_writer()
+            before = writer.read(obsidian_file_path)
+            if writer.edit(obsidian_file_path, apply) == before:
+                print(f"⏭️ 変更なし: {obsidian_file_path}")
+            else:
+                print(f"✅ Obsidianファイル更新: {obsidian_file_path}")
             return True
             
         except Exception as e:
             print(f"❌ Obsidianファイル保存エラー: {e}")
             return False
     
-    def save_to_github(self, content):
-        """GitHubリポジトリにもバックアップ保存"""
-        if not self.repo:
+    def save_to_github(self, content, date=None):
+        """GitHubリポジトリにもバックアップ保存（commit_to_githubで1コミットにまとめる）"""
+        if not self.commit_builder:
             print("⚠️ GitHub repository not configured - skipping backup")
             return True  # Obsidianへの保存が成功していればOK
         
-        try:
-            today = datetime.now()
-            file_path = f"daily_notes/{today.strftime('%Y')}/{today.strftime('%m')}/{today.strftime('%d')}.md"
-            
-            # ファイルが存在するかチェック
-            try:
-                file = self.repo.get_contents(file_path)
-                # ファイルが存在する場合は更新
-                self.repo.update_file(
-                    file_path,
-                    f"Update daily note for {today.strftime('%Y-%m-%d')}",
-                    content,
-                    file.sha
-                )
-                print(f"✅ GitHub backup updated: {file_path}")
-            except:
-                # ファイルが存在しない場合は新規作成
-                self.repo.create_file(
-                    file_path,
-                    f"Create daily note for {today.strftime('%Y-%m-%d')}",
-                    content
-                )
-                print(f"✅ GitHub backup created: {file_path}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"⚠️ GitHubバックアップエラー: {e}")
-            return True  # バックアップの失敗は致命的ではない
+        self.commit_builder.stage(self.github_note_path(date), content)
+        return True
     
-    def save_sync_data(self, tasks):
+    def github_note_path(self, date=None):
+        """リポジトリ内の日次ノートのパス"""
+        if date is None:
+            date = datetime.now()
+        return f"daily_notes/{date.strftime('%Y')}/{date.strftime('%m')}/{date.strftime('%d')}.md"
+    
+    def save_sync_data(self, tasks_count):
         """同期データをJSONファイルに保存"""
         try:
             sync_data = {
                 "last_sync": datetime.now().isoformat(),
-                "tasks_count": len(tasks),
+                "tasks_count": tasks_count,
                 "sync_status": "success"
             }
+            # コミット前までの計測の要約
+            if current_run():
+                sync_data["metrics"] = current_run().summary()
             
-            if self.repo:
+            if self.commit_builder:
                 content = json.dumps(sync_data, ensure_ascii=False, indent=2)
-                try:
-                    file = self.repo.get_contents("sync_data.json")
-                    self.repo.update_file(
-                        "sync_data.json",
-                        "Update sync data",
-                        content,
-                        file.sha
-                    )
-                except:
-                    self.repo.create_file(
-                        "sync_data.json",
-                        "Create sync data",
-                        content
-                    )
-                print("✅ Sync data saved to GitHub")
+                self.commit_builder.stage("sync_data.json", content)
             else:
-                # ローカルファイルに保存
+                # ローカルファイルに保存（last_sync以外が同じなら書き込まない）
+                content = json.dumps(sync_data, ensure_ascii=False, indent=2)
+                if not has_meaningful_change(read_if_exists("sync_data.json"), content, "sync_data.json"):
+                    print("⏭️ Sync data unchanged")
+                    return
                 with open("sync_data.json", "w", encoding="utf-8") as f:
                     json.dump(sync_data, f, ensure_ascii=False, indent=2)
                 print("✅ Sync data saved locally")
@@ -291,29 +271,66 @@ tags:
         except Exception as e:
             print(f"❌ 同期データ保存エラー: {e}")
     
+    def commit_to_github(self, message=None):
+        """ステージしたノートと同期データを1コミットでGitHubに書き込み
+
+        コミットSHA（変更がなければNone）を返す。GitHubが未設定・保留中・失敗で
+        書き込めなかった場合はFalse（保留中・失敗のファイルはアウトボックスから次回再送する）。
+        """
+        if not self.commit_builder:
+            return False
+        
+        if message is None:
+            message = f"Update daily note for {datetime.now().strftime('%Y-%m-%d')}"
+        
+        # 前回までに送れなかったファイルも同じコミットにまとめる
+        try:
+            return self.outbox.flush_github(self.commit_builder, message)
+        except Exception as e:
+            print(f"⚠️ GitHubバックアップエラー: {e}")
+            return False
+    
     def run_sync(self):
         """同期を実行"""
         print("🚀 クラウド同期を開始...")
-        
-        # タスクを取得
-        incomplete_tasks, completed_tasks = self.get_todoist_tasks()
-        
-        # 日次ノートを作成（GitHub Actions用シンプル形式）
-        content = self.create_simple_daily_note_content(incomplete_tasks, completed_tasks)
-        
-        # GitHubに保存
-        github_success = self.save_to_github(content)
-        
-        if github_success:
-            print("✅ 同期完了")
-        else:
-            print("❌ 同期失敗")
-        
-        # 同期データを保存
-        total_tasks = incomplete_tasks + completed_tasks
-        self.save_sync_data(total_tasks)
-        
-        return github_success
+        start_run("cloud_sync")
+        status = "error"  # 例外で抜けた場合もその実行を記録する
+        try:
+            # タスクを取得（完了タスクはノート作成時に順次取得される）
+            with span("fetch"):
+                incomplete_tasks, completed_tasks = self.get_todoist_tasks()
+            
+            # 日次ノートを作成（GitHub Actions用シンプル形式、完了タスクの取得を含む）
+            with span("render"):
+                content = self.create_simple_daily_note_content(incomplete_tasks, completed_tasks)
+            count("tasks_incomplete", self.task_counts['incomplete'])
+            count("tasks_completed", self.task_counts['completed'])
+            
+            # GitHubに保存
+            github_success = self.save_to_github(content)
+            
+            # 同期データを保存
+            print(f"📋 ノートに反映したタスク: 未完了{self.task_counts['incomplete']}個, 完了{self.task_counts['completed']}個")
+            self.save_sync_data(self.task_counts['incomplete'] + self.task_counts['completed'])
+            
+            # ノートと同期データをまとめて1コミット（バックアップの失敗は致命的ではない）
+            with span("commit"):
+                self.commit_to_github()
+            
+            # ローカルのノートへの編集があれば1回だけ書き込む
+            with span("write"):
+                get_writer().flush()
+            
+            if github_success:
+                print("✅ 同期完了")
+            else:
+                print("❌ 同期失敗")
+            
+            get_client().report()
+            status = "success" if github_success else "failed"
+            return github_success
+        finally:
+            finish_run(status)
 
 def main():
     """メイン関数"""
@@ -16,15 +16,87 @@ class Config:
     SCRIPTS_PATH = f"{OBSIDIAN_VAULT_PATH}/scripts"
     SYNC_DATA_FILE = f"{SCRIPTS_PATH}/sync_data.json"
     
+    # 同期状態（レプリカ・キャッシュ）の保存先
+    STATE_DIR = os.getenv(
+        'OBSIDIAN_SYNC_STATE_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sync_state')
+    )
+    TODOIST_REPLICA_FILE = f"{STATE_DIR}/todoist_replica.json"
+    TODOIST_METADATA_FILE = f"{STATE_DIR}/todoist_metadata.json"
+    GITHUB_TREE_CACHE_FILE = f"{STATE_DIR}/github_tree.json"
+    GIT_MIRROR_PATH = f"{STATE_DIR}/mirror"
+    GIT_MIRROR_STATE_FILE = f"{STATE_DIR}/git_mirror.json"
+    HTTP_CACHE_DIR = f"{STATE_DIR}/http_cache"
+    TASK_INDEX_DB = f"{STATE_DIR}/task_index.sqlite3"
+    DAEMON_STATUS_FILE = f"{STATE_DIR}/daemon_status.json"
+    MERGE_BASE_DIR = f"{STATE_DIR}/merge_base"
+    METRICS_FILE = f"{STATE_DIR}/metrics.jsonl"
+    PROFILE_DIR = f"{STATE_DIR}/profiles"
+    OUTBOX_FILE = f"{STATE_DIR}/outbox.jsonl"
+    WEBHOOK_DELIVERIES_FILE = f"{STATE_DIR}/webhook_deliveries.json"
+    
+    # チーム運用（テナントごとのプロファイル）
+    TENANTS_DIR = os.getenv(
+        'OBSIDIAN_SYNC_TENANTS_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tenants')
+    )
+    TENANT_WORKERS = int(os.getenv('OBSIDIAN_SYNC_TENANT_WORKERS', '0')) or None  # 省略時はCPU数
+    # 全テナントで共有するホストごとの同時接続数
+    TENANT_HOST_CONCURRENCY = {
+        'api.todoist.com': 4,
+        'api.github.com': 4,
+    }
+    
     # Todoist API設定
     TODOIST_API_TOKEN = os.getenv('TODOIST_API_TOKEN', '45f3698e07894547badfea77db6df6a621002031')
-    TODOIST_API_BASE_URL = "https://api.todoist.com/rest/v2"
-    TODOIST_SYNC_API_URL = "https://api.todoist.com/sync/v9"
+    TODOIST_API_BASE_URL = os.getenv('TODOIST_API_BASE_URL', "https://api.todoist.com/rest/v2")
+    TODOIST_SYNC_API_URL = os.getenv('TODOIST_SYNC_API_URL', "https://api.todoist.com/sync/v9")
+    TODOIST_INCREMENTAL_SYNC = os.getenv('TODOIST_INCREMENTAL_SYNC', '1') != '0'  # sync_tokenによる差分取得
+    TODOIST_METADATA_TTL = 6 * 60 * 60  # プロジェクト名などのキャッシュの有効期間（秒）
+    TODOIST_CLIENT_SECRET = os.getenv('TODOIST_CLIENT_SECRET')  # Webhookの署名検証に使うアプリのClient secret
     
     # 同期設定
+    TIMEZONE = os.getenv('OBSIDIAN_SYNC_TIMEZONE', 'Asia/Tokyo')  # 日次ノートの日付の基準
     EVENING_CLEANUP_HOUR = 20  # 夜間クリーンアップ開始時刻
     HISTORY_DAYS = 3  # 完了タスクの履歴取得日数
     MAX_ACTIVITY_LIMIT = 100  # アクティビティ取得の最大件数
+    TASK_MAPPING_RETENTION_DAYS = 30  # タスクIDの対応表を保持する日数
+    
+    # GitHub設定
+    GITHUB_REPOSITORY = os.getenv('GITHUB_REPOSITORY', 'tekitoo7777/obsidian-sync-scripts')
+    GITHUB_GIT_URL = os.getenv('GITHUB_GIT_URL', f"https://github.com/{GITHUB_REPOSITORY}.git")
+    GITHUB_BRANCH = os.getenv('GITHUB_BRANCH', 'main')
+    GITHUB_API_URL = os.getenv('GITHUB_API_URL', "https://api.github.com")
+    
+    # HTTP設定
+    HTTP_TIMEOUT = (5, 30)  # (接続, 読み込み) 秒
+    HTTP_MAX_RETRIES = 4  # 429/5xx/接続エラー時の最大リトライ回数
+    HTTP_BACKOFF_BASE = 0.5  # 指数バックオフの基準秒数
+    HTTP_BACKOFF_MAX = 30  # バックオフの上限秒数
+    HTTP_RETRY_AFTER_MAX = 5 * 60  # これより長いRetry-Afterはリトライせずに応答を返す
+    HTTP_POOL_MAXSIZE = 4  # ホストごとの最大コネクション数
+    HTTP_CACHE_MAX_BYTES = 50 * 1024 * 1024  # 条件付きリクエスト用キャッシュの上限
+    # ホストごとのリクエスト予算（リクエスト数, 秒）
+    HTTP_RATE_LIMITS = {
+        'api.todoist.com': (450, 15 * 60),
+        'api.github.com': (5000, 60 * 60),
+    }
+    OUTBOX_RETRY_SECONDS = 5 * 60  # 接続に失敗した送信先への再送を控える時間
+    
+    # Vault監視設定
+    WATCH_DEBOUNCE_SECONDS = 0.5  # 連続保存をまとめる待ち時間
+    WATCH_POLL_INTERVAL = 1.0  # inotifyが使えない環境でのポーリング間隔
+    
+    # Webhook設定
+    WEBHOOK_HOST = os.getenv('OBSIDIAN_SYNC_WEBHOOK_HOST', '127.0.0.1')
+    WEBHOOK_PORT = int(os.getenv('OBSIDIAN_SYNC_WEBHOOK_PORT', '8765'))
+    WEBHOOK_PATH = '/todoist/webhook'
+    WEBHOOK_DEDUPE_SIZE = 1000  # 重複除去のために覚えておく配信IDの件数
+    
+    # 常駐デーモン設定
+    DAEMON_MIN_INTERVAL = 60  # 活動が多いときの最短間隔（秒）
+    DAEMON_MAX_INTERVAL = 30 * 60  # 活動がないときの最長間隔（秒）
+    DAEMON_BACKOFF_FACTOR = 1.5  # 変更がなかったときに間隔を伸ばす倍率
     
     # ファイルテンプレート設定
     TASK_SECTION_HEADER = "#### ＜今日のタスク＞"
@@ -36,6 +108,19 @@ class Config:
     # ログ設定
     LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
     
+    # 計測設定
+    PROFILE_ENABLED = os.getenv('OBSIDIAN_SYNC_PROFILE', '0') == '1'  # cProfile/tracemalloc を記録
+    PROFILE_SLOW_SECONDS = float(os.getenv('OBSIDIAN_SYNC_PROFILE_SLOW', '10'))  # これより遅い実行だけ保存
+    
+    @classmethod
+    def set_state_dir(cls, state_dir):
+        """状態の保存先を切り替える（その下に置くファイルのパスも付け替える）"""
+        previous = cls.STATE_DIR
+        for name, value in list(vars(cls).items()):
+            if name.isupper() and isinstance(value, str) and value.startswith(f"{previous}/"):
+                setattr(cls, name, state_dir + value[len(previous):])
+        cls.STATE_DIR = state_dir
+    
     @classmethod
     def get_daily_file_path(cls, date=None):
         """指定日の日記ファイルパスを取得"""
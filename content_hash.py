@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Canonical content hashing
+更新時刻などの揮発的な部分を除いた内容で変更を判定する
+"""
+
+import re
+import json
+import hashlib
+
+# ノート末尾に生成する "---" + "*Last updated: ... (...)*" フッター
+FOOTER_PATTERN = re.compile(r'^\*Last updated: .* \([^()]*\)\*$')
+
+# sync_data.json のうち実行ごとに変わるだけのキー
+VOLATILE_JSON_KEYS = ('last_sync', 'metrics')
+
+
+def _sort_front_matter_lists(lines):
+    """フロントマター内のリスト（tagsなど）を順序に依存しない形に揃える"""
+    if not lines or lines[0] != '---':
+        return lines
+
+    try:
+        end = lines.index('---', 1)
+    except ValueError:
+        return lines
+
+    front_matter = []
+    run = []
+    for line in lines[1:end]:
+        if line.lstrip().startswith('- '):
+            run.append(line)
+            continue
+        front_matter.extend(sorted(run))
+        run = []
+        front_matter.append(line)
+    front_matter.extend(sorted(run))
+
+    return ['---'] + front_matter + lines[end:]
+
+
+def _strip_footer(lines):
+    """末尾の生成フッター（最後の "---" と直後の Last updated 行）だけを除く"""
+    end = len(lines)
+    while end and lines[end - 1] == '':
+        end -= 1
+    if end >= 2 and FOOTER_PATTERN.match(lines[end - 1]) and lines[end - 2] == '---':
+        return lines[:end - 2]
+    return lines
+
+
+def canonical_note(text):
+    """ノートの正規形（改行・行末空白・生成フッター・フロントマター順序を無視）"""
+    lines = [line.rstrip() for line in text.replace('\r\n', '\n').split('\n')]
+    lines = _strip_footer(lines)
+    return '\n'.join(_sort_front_matter_lists(lines))
+
+
+def canonical_json(data, volatile_keys=VOLATILE_JSON_KEYS):
+    """JSONの正規形（キー順・揮発的キーを無視）"""
+    if isinstance(data, str):
+        data = json.loads(data)
+    if isinstance(data, dict):
+        data = {key: value for key, value in data.items() if key not in volatile_keys}
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def content_digest(content, path=''):
+    """正規化した内容のSHA-256（.json は JSON として、それ以外はノートとして扱う）"""
+    if path.endswith('.json'):
+        try:
+            canonical = canonical_json(content)
+        except ValueError:
+            canonical = content
+    else:
+        canonical = canonical_note(content)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def has_meaningful_change(old_content, new_content, path=''):
+    """揮発的な部分を除いて内容が変わったか"""
+    if old_content is None:
+        return True
+    if old_content == new_content:
+        return False
+    return content_digest(old_content, path) != content_digest(new_content, path)
+
+
+def read_if_exists(path):
+    """ファイルがあれば内容を返す（なければNone）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
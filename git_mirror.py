@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Local git mirror of the backup repository
+バックアップリポジトリのローカルミラーから変更されたノートだけを取り出す
+"""
+
+import os
+import re
+import json
+import base64
+import subprocess
+from datetime import datetime
+from config import Config
+
+NOTES_DIR = "daily_notes"
+NOTE_PATH_PATTERN = re.compile(r'^daily_notes/(\d{4})/(\d{2})/(\d{2})\.md$')
+
+
+class GitMirror:
+    """daily_notes だけをsparse checkoutしたblobなしクローン"""
+
+    def __init__(self, repo_url=None, path=None, branch=None, token=None, state_file=None):
+        self.repo_url = repo_url or Config.GITHUB_GIT_URL
+        self.path = path or Config.GIT_MIRROR_PATH
+        self.branch = branch or Config.GITHUB_BRANCH
+        self.token = token if token is not None else os.getenv('GITHUB_TOKEN', '')
+        self.state_file = state_file or Config.GIT_MIRROR_STATE_FILE
+
+    def _git(self, *args, cwd=None):
+        """gitコマンドを実行して標準出力を返す"""
+        env = None
+        if self.token:
+            # トークンはremote URLにもコマンドライン（ps で見える）にも載せず、
+            # 環境変数の GIT_CONFIG_* でヘッダーとして渡す（git 2.31以降）
+            basic = base64.b64encode(f"x-access-token:{self.token}".encode()).decode()
+            env = dict(os.environ)
+            index = int(env.get('GIT_CONFIG_COUNT') or 0)
+            env['GIT_CONFIG_COUNT'] = str(index + 1)
+            env[f'GIT_CONFIG_KEY_{index}'] = 'http.extraHeader'
+            env[f'GIT_CONFIG_VALUE_{index}'] = f"Authorization: Basic {basic}"
+
+        result = subprocess.run(
+            ["git", *args],
+            cwd=cwd or self.path,
+            env=env,
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result.stdout.strip()
+
+    def load_applied(self):
+        """最後にVaultへ反映したコミットSHA"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('applied')
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save_applied(self, commit_sha):
+        """Vaultへ反映したコミットSHAを記録"""
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump({'applied': commit_sha, 'updated': datetime.now().isoformat()}, f)
+
+    def ensure_clone(self):
+        """ミラーがなければ blob なし + sparse でクローン"""
+        if os.path.isdir(os.path.join(self.path, ".git")):
+            return False
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        print(f"📦 ミラーを作成: {self.repo_url}")
+        self._git(
+            "clone", "--filter=blob:none", "--sparse", "--single-branch",
+            "--branch", self.branch, self.repo_url, self.path,
+            cwd=os.path.dirname(self.path)
+        )
+        self._git("sparse-checkout", "set", NOTES_DIR)
+        return True
+
+    def fetch(self):
+        """新しいオブジェクトだけを取得し、作業ツリーをリモートに合わせてHEADを返す"""
+        self._git("fetch", "--quiet", "origin", self.branch)
+        self._git("reset", "--quiet", "--hard", "FETCH_HEAD")
+        return self._git("rev-parse", "HEAD")
+
+    def changed_notes(self, since_commit, head):
+        """since_commit..head で追加・変更された daily_notes のパス"""
+        output = self._git(
+            "diff", "--name-only", "--diff-filter=AM",
+            f"{since_commit}..{head}", "--", NOTES_DIR
+        )
+        return [line for line in output.splitlines() if NOTE_PATH_PATTERN.match(line)]
+
+    def read_note(self, note_path):
+        """作業ツリーからノートを読み込み"""
+        with open(os.path.join(self.path, note_path), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    @staticmethod
+    def note_date(note_path):
+        """daily_notes/YYYY/MM/DD.md から日付を取得"""
+        match = NOTE_PATH_PATTERN.match(note_path)
+        if not match:
+            return None
+        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    def pull(self):
+        """前回反映以降に変わったノートを (パス, 日付, 内容) で返し、HEADも返す
+
+        初回は今日のノートのみを対象にする。
+        """
+        self.ensure_clone()
+        head = self.fetch()
+        applied = self.load_applied()
+
+        if applied == head:
+            return [], head
+
+        if applied:
+            try:
+                paths = self.changed_notes(applied, head)
+            except RuntimeError:
+                # 履歴が書き換えられた等で前回のコミットがない場合は今日のノートのみ
+                applied = None
+
+        if not applied:
+            today = datetime.now()
+            today_path = f"{NOTES_DIR}/{today.strftime('%Y')}/{today.strftime('%m')}/{today.strftime('%d')}.md"
+            paths = [today_path] if os.path.exists(os.path.join(self.path, today_path)) else []
+
+        notes = [(path, self.note_date(path), self.read_note(path)) for path in paths]
+        return notes, head
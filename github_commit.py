@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+GitHub single-commit writer
+Git Data APIで複数ファイルを1つのツリー・1つのコミットとして書き込む
+"""
+
+import os
+import json
+import hashlib
+from config import Config
+from content_hash import content_digest
+from instrumentation import count
+
+
+# PyGithubの接続クラスを差し替えたか（クラス単位の設定なのでプロセスで1回だけ行う）
+_connections_injected = False
+
+
+def _connection_class(protocol):
+    """PyGithubの通信を共有HttpClient経由で送る接続クラス（httplib互換）
+
+    PyGithubの内部（Requester.injectConnectionClasses・RequestsResponse・noopAuth）に
+    依存するので、requirements.txt でバージョンを固定している。
+    """
+    from github.Requester import Requester, RequestsResponse
+    from http_client import get_client
+
+    class SharedClientConnection:
+        def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+            self.host = host
+            self.port = port if port else (443 if protocol == "https" else 80)
+            self.verify = kwargs.get("verify", True)
+
+        def request(self, verb, url, input, headers, stream=False):
+            self.verb = verb
+            self.url = url
+            self.input = input
+            self.headers = headers
+            self.stream = stream
+
+        def getresponse(self):
+            # 予算・ホストごとの同時接続数・リトライはTodoistと同じHttpClientで管理する
+            response = get_client().request(
+                self.verb,
+                f"{protocol}://{self.host}:{self.port}{self.url}",
+                headers=self.headers,
+                data=self.input,
+                stream=self.stream,
+                verify=self.verify,
+                auth=Requester.noopAuth,
+                allow_redirects=False,
+            )
+            return RequestsResponse(response)
+
+        def close(self):
+            pass
+
+    return SharedClientConnection
+
+
+def connect_github(token, repo_name=None):
+    """共有HttpClient経由で通信するPyGithubのリポジトリを取得"""
+    global _connections_injected
+    from github import Auth, Github
+    from github.Requester import Requester
+
+    if not _connections_injected:
+        Requester.injectConnectionClasses(_connection_class("http"), _connection_class("https"))
+        _connections_injected = True
+    github = Github(auth=Auth.Token(token), base_url=Config.GITHUB_API_URL, retry=0)
+    return github.get_repo(repo_name or Config.GITHUB_REPOSITORY)
+
+
+def git_blob_sha(data):
+    """gitのblob SHA-1をローカルで計算"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    header = f"blob {len(data)}\0".encode('ascii')
+    return hashlib.sha1(header + data).hexdigest()
+
+
+class GitHubCommitBuilder:
+    """ファイルをステージして1コミットにまとめるビルダー
+
+    リモートツリーのblob SHAはコミットSHAと一緒にキャッシュするので、
+    ファイル数に関係なくAPI呼び出しは数回で済む。自分で書いたファイルは
+    正規化した内容のダイジェストも覚えておき、フッターだけの変更は送らない。
+    """
+
+    def __init__(self, repo, branch=None, cache_path=None):
+        self.repo = repo
+        self.branch = branch or repo.default_branch
+        self.cache_path = cache_path or Config.GITHUB_TREE_CACHE_FILE
+        self.staged = {}
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        """リモートツリーのキャッシュを読み込み"""
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"⚠️ ツリーキャッシュ読み込みエラー: {e}")
+        return {"commit": None, "tree": None, "blobs": {}, "digests": {}}
+
+    def _save_cache(self):
+        """リモートツリーのキャッシュを保存"""
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def stage(self, path, content):
+        """コミットするファイルを追加（同じパスは後勝ち）"""
+        self.staged[path] = content
+
+    def _remote_blobs(self, commit):
+        """HEADコミットのツリーにあるblob SHA（キャッシュが古ければ取得し直す）"""
+        if self.cache.get("tree") != commit.tree.sha:
+            tree = self.repo.get_git_tree(commit.tree.sha, recursive=True)
+            self.cache = {
+                "digests": self.cache.get("digests", {}),
+                "commit": commit.sha,
+                "tree": tree.sha,
+                "blobs": {
+                    element.path: element.sha
+                    for element in tree.tree
+                    if element.type == "blob"
+                },
+            }
+        return self.cache["blobs"]
+
+    def remote_paths(self, prefix=""):
+        """ブランチのHEADにあるファイルのパス（prefixで絞り込み）"""
+        ref = self.repo.get_git_ref(f"heads/{self.branch}")
+        head = self.repo.get_git_commit(ref.object.sha)
+        return {path for path in self._remote_blobs(head) if path.startswith(prefix)}
+
+    def commit(self, message, max_attempts=2):
+        """ステージしたファイルを1コミットで書き込み、コミットSHAを返す（変更なしならNone）"""
+        from github import GithubException, InputGitTreeElement
+
+        if not self.staged:
+            return None
+
+        for attempt in range(max_attempts):
+            ref = self.repo.get_git_ref(f"heads/{self.branch}")
+            head = self.repo.get_git_commit(ref.object.sha)
+            remote_blobs = self._remote_blobs(head)
+
+            digests = self.cache.setdefault("digests", {})
+            changed = {}
+            for path, content in self.staged.items():
+                blob_sha = git_blob_sha(content)
+                remote_sha = remote_blobs.get(path)
+                if remote_sha == blob_sha:
+                    continue
+                # リモートが前回自分の書いた版のままで、意味のある差分がなければスキップ
+                digest = content_digest(content, path)
+                if remote_sha and digests.get(path) == [remote_sha, digest]:
+                    continue
+                changed[path] = (content, blob_sha, digest)
+
+            if not changed:
+                print(f"⏭️ GitHub: ステージした{len(self.staged)}ファイルに変更なし - コミットをスキップ")
+                self.staged = {}
+                self._save_cache()
+                return None
+
+            elements = [
+                InputGitTreeElement(path, "100644", "blob", content=content)
+                for path, (content, _, _) in sorted(changed.items())
+            ]
+            tree = self.repo.create_git_tree(elements, base_tree=head.tree)
+            new_commit = self.repo.create_git_commit(message, tree, [head])
+
+            try:
+                ref.edit(new_commit.sha)
+            except GithubException as e:
+                # 他のコミットが先に入った場合はHEADを取り直して再試行
+                if attempt + 1 >= max_attempts:
+                    raise
+                print(f"🔁 ブランチが更新されていたため再コミットします: {e.status}")
+                continue
+
+            for path, (_, blob_sha, digest) in changed.items():
+                self.cache["blobs"][path] = blob_sha
+                digests[path] = [blob_sha, digest]
+            self.cache["commit"] = new_commit.sha
+            self.cache["tree"] = tree.sha
+            self._save_cache()
+
+            count("github_files_committed", len(changed))
+            print(f"✅ GitHub: {len(changed)}ファイルを1コミットで保存 ({new_commit.sha[:7]})")
+            self.staged = {}
+            return new_commit.sha
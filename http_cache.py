@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Persistent conditional-request cache
+ETag / Last-Modified を使った条件付きGETのディスクキャッシュ（LRUで容量管理）
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from config import Config
+
+
+class HttpCache:
+    """URL・パラメータ・認証スコープをキーにしたレスポンスキャッシュ"""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or Config.HTTP_CACHE_DIR
+        self.max_bytes = max_bytes or Config.HTTP_CACHE_MAX_BYTES
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.index = self._load_index()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, f"{key}.body")
+
+    @staticmethod
+    def make_key(url, params=None, headers=None):
+        """キャッシュキー（認証ヘッダーはハッシュ化してスコープとしてのみ使う）"""
+        auth = (headers or {}).get("Authorization", "")
+        scope = hashlib.sha256(auth.encode('utf-8')).hexdigest() if auth else ""
+        raw = json.dumps([url, sorted((params or {}).items()), scope], ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def conditional_headers(self, key):
+        """保存済みのETag/Last-Modifiedから条件付きヘッダーを作成"""
+        entry = self.index.get(key)
+        if not entry or not os.path.exists(self._body_path(key)):
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def load(self, key, response):
+        """304レスポンスをキャッシュ済みの本文で200として復元"""
+        entry = self.index.get(key)
+        if not entry:
+            return None
+        try:
+            with open(self._body_path(key), 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+
+        with self.lock:
+            self.hits += 1
+            entry['atime'] = time.time()
+            self._save_index()
+
+        response.status_code = 200
+        response._content = body
+        if entry.get('content_type'):
+            response.headers['Content-Type'] = entry['content_type']
+        response.from_cache = True
+        return response
+
+    def store(self, key, response):
+        """検証子付きの200レスポンスを保存"""
+        with self.lock:
+            self.misses += 1
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._body_path(key), 'wb') as f:
+                f.write(body)
+            self.index[key] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_type': response.headers.get('Content-Type'),
+                'size': len(body),
+                'atime': time.time(),
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """合計サイズが上限を超えたら最終利用が古いものから削除"""
+        total = sum(entry['size'] for entry in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]['atime']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            del self.index[key]
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+
+    @property
+    def size(self):
+        """キャッシュ本文の合計バイト数"""
+        return sum(entry['size'] for entry in self.index.values())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client
+コネクションプール・リトライ・リクエスト予算を共有するHTTPクライアント
+"""
+
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from config import Config
+from http_cache import HttpCache
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# 処理されずに返るので、idempotentでなくても再送してよいステータス
+REJECTED_STATUS_CODES = {429}
+# タイムアウト（送信済みかもしれない）でも再送してよいメソッド
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# このヘッダーがあればサーバー側で重複が除かれる（TodoistのREST API）
+IDEMPOTENCY_HEADER = 'X-Request-Id'
+
+
+class TokenBucket:
+    """トークンバケット方式のリクエスト予算"""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / float(period)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """トークンを1つ消費（足りなければ補充されるまで待機）し、待機秒数を返す"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    @property
+    def remaining(self):
+        """残りトークン数"""
+        with self.lock:
+            self._refill()
+            return int(self.tokens)
+
+
+class SharedTokenBucket(TokenBucket):
+    """複数プロセスで共有するトークンバケット（共有メモリ上の残量を使う）"""
+
+    def __init__(self, capacity, period, context=None):
+        import multiprocessing
+
+        context = context or multiprocessing.get_context()
+        self.capacity = capacity
+        self.rate = capacity / float(period)
+        self._tokens = context.RawValue('d', float(capacity))
+        self._updated = context.RawValue('d', time.monotonic())
+        self.lock = context.Lock()
+
+    @property
+    def tokens(self):
+        return self._tokens.value
+
+    @tokens.setter
+    def tokens(self, value):
+        self._tokens.value = value
+
+    @property
+    def updated(self):
+        return self._updated.value
+
+    @updated.setter
+    def updated(self, value):
+        self._updated.value = value
+
+
+class HttpClient:
+    """requests.Sessionを共有し、リトライと予算管理を行うクライアント"""
+
+    def __init__(self, timeout=None, max_retries=None, rate_limits=None, cache=None,
+                 budgets=None, concurrency=None):
+        self.timeout = timeout or Config.HTTP_TIMEOUT
+        self.max_retries = Config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        if budgets is None:
+            budgets = {
+                host: TokenBucket(capacity, period)
+                for host, (capacity, period) in (rate_limits or Config.HTTP_RATE_LIMITS).items()
+            }
+        self.budgets = budgets
+        # ホストごとの同時リクエスト数の上限（プロセス間で共有するセマフォも可）
+        self.concurrency = concurrency or {}
+        self.cache = cache
+        self._session = None
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """リクエスト数などの統計をゼロに戻す（実行の開始時に呼ぶ）"""
+        with self._lock:
+            self.stats = {
+                'requests': 0,
+                'retries': 0,
+                'throttled_seconds': 0.0,
+                'bytes_sent': 0,
+                'bytes_received': 0,
+                'hosts': {},
+            }
+
+    @property
+    def session(self):
+        """コネクションプール付きのSession（初回利用時に作成）"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=len(self.budgets) or 1,
+                pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+                pool_block=True
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    def _count(self, host, key):
+        with self._lock:
+            host_stats = self.stats['hosts'].setdefault(host, {'requests': 0, 'retries': 0})
+            host_stats[key] += 1
+            self.stats[key] += 1
+
+    def _count_throttled(self, seconds):
+        with self._lock:
+            self.stats['throttled_seconds'] += seconds
+
+    def _count_bytes(self, response):
+        body = response.request.body if response.request is not None else None
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        sent = len(body) if isinstance(body, bytes) else 0
+        with self._lock:
+            self.stats['bytes_sent'] += sent
+            self.stats['bytes_received'] += len(response.content)
+
+    def _retry_delay(self, attempt, response=None):
+        """Retry-Afterを優先し、なければジッター付き指数バックオフ"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return max(float(retry_after), 0)
+                except ValueError:
+                    from email.utils import parsedate_to_datetime
+
+                    try:
+                        retry_at = parsedate_to_datetime(retry_after)
+                        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+                    except (TypeError, ValueError):
+                        pass
+
+        backoff = min(Config.HTTP_BACKOFF_MAX, Config.HTTP_BACKOFF_BASE * (2 ** attempt))
+        return random.uniform(0, backoff)
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """リトライ付きでリクエストを送信
+
+        接続できなかった場合と429は常に再送する。送信済みの可能性がある失敗
+        （読み込みタイムアウト・切断）と5xxは、idempotent（省略時はメソッドか
+        X-Request-Id ヘッダーで判定）なリクエストだけ再送する。
+        """
+        import requests
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS or IDEMPOTENCY_HEADER in (kwargs.get('headers') or {})
+        host = urlparse(url).hostname
+        budget = self.budgets.get(host)
+        slots = self.concurrency.get(host)
+        kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+        while True:
+            if budget:
+                waited = budget.acquire()
+                if waited:
+                    self._count_throttled(waited)
+            self._count(host, 'requests')
+
+            if slots:
+                slots.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectTimeout:
+                # 接続できなかった（まだ何も送っていない）
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            except (requests.ConnectionError, requests.Timeout):
+                # 切断・読み込みタイムアウトは送信済みかもしれない
+                if attempt >= self.max_retries or not idempotent:
+                    raise
+                response = None
+            finally:
+                if slots:
+                    slots.release()
+
+            if response is not None:
+                self._count_bytes(response)
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                return response
+            if response is not None and not idempotent and response.status_code not in REJECTED_STATUS_CODES:
+                return response
+            if attempt >= self.max_retries:
+                return response
+
+            delay = self._retry_delay(attempt, response)
+            if delay > Config.HTTP_RETRY_AFTER_MAX:
+                # 待ち時間が長すぎる場合は今回は諦める（早めに再送しても予算を使うだけ）
+                print(f"⏸️ {method} {host}: Retry-After {delay:.0f}秒のためリトライしません")
+                return response
+            status = response.status_code if response is not None else "接続エラー"
+            print(f"🔁 {method} {host} リトライ ({status}) {delay:.1f}秒後")
+            self._count(host, 'retries')
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, cache=False, **kwargs):
+        """GET（cache=Trueなら条件付きリクエストで304をキャッシュから返す）"""
+        if not cache:
+            return self.request("GET", url, **kwargs)
+
+        if self.cache is None:
+            self.cache = HttpCache()
+
+        key = HttpCache.make_key(url, kwargs.get('params'), kwargs.get('headers'))
+        conditional = self.cache.conditional_headers(key)
+        if conditional:
+            headers = dict(kwargs.get('headers') or {})
+            headers.update(conditional)
+            response = self.request("GET", url, **dict(kwargs, headers=headers))
+            if response.status_code == 304:
+                cached = self.cache.load(key, response)
+                if cached is not None:
+                    return cached
+                response = self.request("GET", url, **kwargs)
+        else:
+            response = self.request("GET", url, **kwargs)
+
+        self.cache.store(key, response)
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def report(self):
+        """この実行（reset_stats以降）のリクエスト数・リトライ数を表示"""
+        print(f"📊 HTTP: {self.stats['requests']}リクエスト, {self.stats['retries']}リトライ")
+        for host, host_stats in sorted(self.stats['hosts'].items()):
+            line = f"   - {host}: {host_stats['requests']}リクエスト, {host_stats['retries']}リトライ"
+            budget = self.budgets.get(host)
+            if budget:
+                line += f" (残り予算 {budget.remaining}/{budget.capacity})"
+            print(line)
+        if self.cache is not None:
+            print(f"   - キャッシュ: {self.cache.hits}ヒット, {self.cache.misses}ミス ({self.cache.size} bytes)")
+        return self.stats
+
+
+_shared_client = None
+
+
+def get_client():
+    """実行中で共有するHttpClientを取得"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = HttpClient()
+    return _shared_client
+
+
+def set_client(client):
+    """共有するHttpClientを差し替える（テナントごとの予算・統計の分離に使う）"""
+    global _shared_client
+    _shared_client = client
+    return client
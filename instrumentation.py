@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Per-run instrumentation
+フェーズごとの時間・HTTP呼び出し・書き込み件数を集計し、実行ごとにJSON Linesで記録する
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from config import Config
+from http_client import get_client
+
+HTTP_COUNTERS = ('requests', 'retries', 'bytes_sent', 'bytes_received', 'throttled_seconds')
+
+_current = None
+
+
+class RunRecorder:
+    """1回の同期実行のスパンとカウンター"""
+
+    def __init__(self, name, profile=None):
+        self.name = name
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._http_start = self._http_snapshot()
+        self._profiler = None
+        if Config.PROFILE_ENABLED if profile is None else profile:
+            self._start_profile()
+
+    def _http_snapshot(self):
+        client = get_client()
+        snapshot = {key: client.stats[key] for key in HTTP_COUNTERS}
+        cache = client.cache
+        snapshot['cache_hits'] = cache.hits if cache else 0
+        snapshot['cache_misses'] = cache.misses if cache else 0
+        return snapshot
+
+    @contextmanager
+    def span(self, name):
+        """with span("fetch"): ... の区間の時間を名前ごとに合計する"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                entry = self.spans.setdefault(name, {'count': 0, 'ms': 0.0})
+                entry['count'] += 1
+                entry['ms'] += elapsed
+
+    def count(self, name, value=1):
+        """カウンターを加算"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        """ここまでの集計（同期データに保存する要約）"""
+        http_now = self._http_snapshot()
+        http = {key: http_now[key] - self._http_start[key] for key in http_now}
+        http['throttled_seconds'] = round(http['throttled_seconds'], 3)
+        return {
+            'run': self.name,
+            'started': self.started_at.isoformat(timespec='seconds'),
+            'duration_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'phases_ms': {name: round(entry['ms'], 1) for name, entry in self.spans.items()},
+            'http': http,
+            'counters': dict(self.counters),
+        }
+
+    def finish(self, status='success'):
+        """実行を締めてJSON Linesに追記し、記録を返す"""
+        record = self.summary()
+        record['status'] = status
+        record['spans'] = {
+            name: {'count': entry['count'], 'ms': round(entry['ms'], 3)}
+            for name, entry in self.spans.items()
+        }
+        record['profile'] = self._stop_profile(record['duration_ms'] / 1000)
+
+        try:
+            os.makedirs(os.path.dirname(Config.METRICS_FILE), exist_ok=True)
+            with open(Config.METRICS_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"⚠️ 計測データ書き込みエラー: {e}")
+
+        phases = ", ".join(f"{name} {entry['ms']:.0f}ms" for name, entry in self.spans.items())
+        print(f"⏱️ {self.name}: {record['duration_ms']:.0f}ms ({phases})")
+        return record
+
+    def _start_profile(self):
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def _stop_profile(self, elapsed):
+        """遅い実行だけプロファイルを保存し、保存先を返す"""
+        if self._profiler is None:
+            return None
+        import tracemalloc
+
+        self._profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        if elapsed < Config.PROFILE_SLOW_SECONDS:
+            return None
+
+        os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+        base = os.path.join(Config.PROFILE_DIR, f"{self.name}-{self.started_at:%Y%m%d-%H%M%S}")
+        self._profiler.dump_stats(f"{base}.prof")
+        with open(f"{base}.memory.txt", 'w', encoding='utf-8') as f:
+            for stat in snapshot.statistics('lineno')[:30]:
+                f.write(f"{stat}\n")
+        print(f"🧪 遅い実行のプロファイルを保存: {base}.prof")
+        return f"{base}.prof"
+
+
+def start_run(name, profile=None):
+    """計測する実行を開始（以降の span/count とHTTPの統計はこの実行に集計される）"""
+    global _current
+    get_client().reset_stats()
+    _current = RunRecorder(name, profile)
+    return _current
+
+
+def current_run():
+    return _current
+
+
+def finish_run(status='success'):
+    """実行を締めて記録を返す（開始していなければNone）"""
+    global _current
+    recorder, _current = _current, None
+    return recorder.finish(status) if recorder else None
+
+
+@contextmanager
+def span(name):
+    """実行中なら区間を計測（計測していなければ何もしない）"""
+    if _current is None:
+        yield
+    else:
+        with _current.span(name):
+            yield
+
+
+def count(name, value=1):
+    """実行中ならカウンターを加算"""
+    if _current is not None:
+        _current.count(name, value)
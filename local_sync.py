@@ -6,21 +6,29 @@ Local Sync Script for Obsidian
 
 import os
 import json
-import requests
-import re
+import sys
 from datetime import datetime
 from pathlib import Path
 from config import Config
+from http_client import get_client
+from content_hash import has_meaningful_change
+from git_mirror import GitMirror
+from note_parser import parse_note
+from note_merge import MergeBaseStore, merge_task_section
+from note_writer import get_writer
+from task_model import Task
+from instrumentation import start_run, finish_run, span, count
 
 class LocalSync:
     def __init__(self):
         self.github_token = os.getenv('GITHUB_TOKEN', '')
-        self.repo_name = 'tekitoo7777/obsidian-sync-scripts'
+        self.repo_name = Config.GITHUB_REPOSITORY
+        self.merge_bases = MergeBaseStore()
         
     def get_github_file_content(self, file_path):
         """GitHubリポジトリからファイル内容を取得"""
         try:
-            url = f"https://api.github.com/repos/{self.repo_name}/contents/{file_path}"
+            url = f"{Config.GITHUB_API_URL}/repos/{self.repo_name}/contents/{file_path}"
             headers = {
                 "Accept": "application/vnd.github.v3+json"
             }
@@ -28,7 +36,7 @@ class LocalSync:
             if self.github_token:
                 headers["Authorization"] = f"token {self.github_token}"
             
-            response = requests.get(url, headers=headers)
+            response = get_client().get(url, headers=headers, cache=True)
             
             if response.status_code == 200:
                 import base64
@@ -43,45 +51,63 @@ class LocalSync:
             print(f"❌ GitHubファイル取得エラー: {e}")
             return None
     
-    def update_obsidian_file(self, github_content):
-        """GitHubの内容でObsidianファイルを更新"""
+    def update_obsidian_file(self, github_content, date=None):
+        """GitHubの内容でObsidianファイルを更新（書き込みは flush_notes でまとめて行う）"""
         try:
-            today = datetime.now()
+            today = date or datetime.now()
             obsidian_file_path = Config.get_daily_file_path(today)
             
-            # Obsidianファイルの既存内容を取得
-            existing_content = ""
-            if os.path.exists(obsidian_file_path):
-                with open(obsidian_file_path, 'r', encoding='utf-8') as f:
-                    existing_content = f.read()
-            
             # GitHubから取得したタスクリストを抽出
-            github_tasks = self.extract_tasks_from_github_content(github_content)
+            with span("parse"):
+                github_tasks = self.extract_tasks_from_github_content(github_content)
             
             if not github_tasks:
                 print("⚠️ GitHubファイルからタスクを抽出できませんでした")
                 return False
             
-            # Obsidianファイルのタスクセクションを更新
-            if existing_content:
-                # 既存のタスクセクションを置換
-                task_section_pattern = r'(#### ＜今日のタスク＞\s*\n)(.*?)(\n#### ＜AI振り返り＞)'
-                new_task_section = f"#### ＜今日のタスク＞\n{github_tasks}\n"
-                
-                if re.search(task_section_pattern, existing_content, re.DOTALL):
-                    updated_content = re.sub(
-                        task_section_pattern,
-                        lambda m: m.group(1) + github_tasks + '\n' + m.group(3),
-                        existing_content,
-                        flags=re.DOTALL
-                    )
+            date_key = today.strftime("%Y-%m-%d")
+            github_lines = [task.to_line() for task in github_tasks]
+            base_lines = self.merge_bases.load('github', date_key)
+            
+            def apply(existing_content):
+                # Obsidianファイルのタスクセクションを更新
+                if existing_content:
+                    # 前回取り込んだ行をベースに3方向マージ（Vault側の編集は残す）
+                    updated_content, _, conflicts = merge_task_section(existing_content, github_lines, base_lines)
+                    for conflict in conflicts:
+                        print(f"⚠️ 衝突のためVault側を優先: {conflict['ours']} ⇔ {conflict['theirs']}")
                 else:
-                    # タスクセクションが見つからない場合は末尾に追加
-                    updated_content = existing_content + f"\n\n{new_task_section}"
+                    # ファイルが存在しない場合は新規作成
+                    updated_content = self.create_daily_note_content(today, "\n".join(github_lines))
+                
+                # フッター以外に変更がなければ書き込まない
+                if not has_meaningful_change(existing_content or None, updated_content):
+                    return existing_content
+                return updated_content
+            
+            writer = get_writer()
+            before = writer.read(obsidian_file_path)
+            # ベースは書き込めた場合だけ更新する（失敗したら次回も同じ行をマージし直す）
+            with span("merge"):
+                after = writer.edit(
+                    obsidian_file_path, apply,
+                    on_flushed=lambda: self.merge_bases.save('github', date_key, github_lines)
+                )
+            
+            if after == before:
+                print(f"⏭️ 変更なし: {obsidian_file_path}")
             else:
-                # ファイルが存在しない場合は新規作成
-                date_str = today.strftime("%Y-%m-%d")
-                updated_content = f"""---
+                print(f"✅ Obsidianファイル更新: {obsidian_file_path}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Obsidianファイル更新エラー: {e}")
+            return False
+    
+    def create_daily_note_content(self, today, github_tasks):
+        """新規の日次ノート"""
+        date_str = today.strftime("%Y-%m-%d")
+        return f"""---
 tags:
   - daily
   - diary
@@ -140,82 +166,128 @@ tags:
 ---
 *Last updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")} (Local Sync)*
 """
-            
-            # ディレクトリが存在しない場合は作成
-            os.makedirs(os.path.dirname(obsidian_file_path), exist_ok=True)
-            
-            # ファイルに書き込み
-            with open(obsidian_file_path, 'w', encoding='utf-8') as f:
-                f.write(updated_content)
-            
-            print(f"✅ Obsidianファイル更新: {obsidian_file_path}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Obsidianファイル更新エラー: {e}")
-            return False
+    
+    def flush_notes(self):
+        """まとめた編集をノートごとに1回だけ書き込む"""
+        results = get_writer().flush()
+        written = sum(1 for status in results.values() if status in ('written', 'rebased'))
+        if results:
+            print(f"💾 ノート書き込み: {written}/{len(results)}件")
+        return all(status != 'error' and status != 'conflict' for status in results.values())
     
     def extract_tasks_from_github_content(self, content):
-        """GitHubの内容からタスクリストを抽出（未完了と完了済み両方）"""
+        """GitHubの内容からタスク（Task）のリストを抽出（未完了と完了済み両方）"""
         try:
             # "## 今日のタスク" セクションからタスクを抽出
-            task_section_pattern = r'## 今日のタスク\s*\n(.*?)(?=\n## |$)'
-            match = re.search(task_section_pattern, content, re.DOTALL)
+            index = parse_note(content)
+            section = index.task_section()
             
-            if match:
-                tasks_text = match.group(1).strip()
+            if section:
+                tasks_text = index.section_body(section).strip()
                 
-                # タスクを未完了と完了済みに分離（順序を保持）
-                lines = tasks_text.split('\n')
-                processed_lines = []
+                # 未完了と完了済みを順序どおりに解析（タスク行でない行は直前のタスクの続き）
+                tasks = []
+                for line in tasks_text.split('\n'):
+                    task = Task.from_line(line.strip())
+                    if task is not None:
+                        tasks.append(task)
+                    elif line.strip() and tasks:
+                        tasks[-1].title += ' ' + line.strip()
                 
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith('- [ ]') or line.startswith('- [x]'):
-                        processed_lines.append(line)
-                    elif line:  # 空行でない場合は継続行として処理
-                        if processed_lines:
-                            processed_lines[-1] += ' ' + line
-                
-                return '\n'.join(processed_lines)
+                return tasks
             else:
                 print("⚠️ タスクセクションが見つかりませんでした")
-                return ""
+                return []
                 
         except Exception as e:
             print(f"❌ タスク抽出エラー: {e}")
-            return ""
+            return []
     
     def run_sync(self):
         """ローカル同期を実行"""
         print("🚀 ローカル同期を開始...")
-        
-        # 今日の日付でGitHubファイルを取得
-        today = datetime.now()
-        github_file_path = f"daily_notes/{today.strftime('%Y')}/{today.strftime('%m')}/{today.strftime('%d')}.md"
-        
-        print(f"📥 GitHubファイル取得: {github_file_path}")
-        github_content = self.get_github_file_content(github_file_path)
-        
-        if not github_content:
-            print("❌ GitHubファイルが見つかりませんでした")
-            return False
-        
-        # Obsidianファイルを更新
-        success = self.update_obsidian_file(github_content)
-        
-        if success:
-            print("✅ ローカル同期完了")
-        else:
-            print("❌ ローカル同期失敗")
-        
-        return success
+        start_run("local_sync")
+        status = "error"  # 例外で抜けた場合もその実行を記録する
+        try:
+            # 今日の日付でGitHubファイルを取得
+            today = datetime.now()
+            github_file_path = f"daily_notes/{today.strftime('%Y')}/{today.strftime('%m')}/{today.strftime('%d')}.md"
+            
+            print(f"📥 GitHubファイル取得: {github_file_path}")
+            with span("fetch"):
+                github_content = self.get_github_file_content(github_file_path)
+            
+            if not github_content:
+                print("❌ GitHubファイルが見つかりませんでした")
+                status = "failed"
+                return False
+            
+            # Obsidianファイルを更新（parse・merge の区間は update_obsidian_file の中で計測）
+            success = self.update_obsidian_file(github_content)
+            with span("write"):
+                success = self.flush_notes() and success
+            
+            if success:
+                print("✅ ローカル同期完了")
+            else:
+                print("❌ ローカル同期失敗")
+            
+            get_client().report()
+            status = "success" if success else "failed"
+            return success
+        finally:
+            finish_run(status)
+
+    def run_mirror_sync(self):
+        """ローカルミラーを使って、前回以降に変わったノートをまとめて同期"""
+        print("🚀 ミラー同期を開始...")
+        start_run("mirror_sync")
+        status = "error"
+        try:
+            try:
+                with span("fetch"):
+                    mirror = GitMirror(token=self.github_token)
+                    notes, head = mirror.pull()
+            except Exception as e:
+                print(f"❌ ミラー取得エラー: {e}")
+                status = "failed"
+                return False
+            
+            if not notes:
+                print("✅ 変更されたノートはありません")
+                mirror.save_applied(head)
+                status = "success"
+                return True
+            
+            print(f"📥 変更されたノート: {len(notes)}件 ({head[:7]})")
+            count("notes_changed", len(notes))
+            success = True
+            for note_path, date, content in notes:
+                print(f"📄 {note_path}")
+                success = self.update_obsidian_file(content, date) and success
+            with span("write"):
+                success = self.flush_notes() and success
+            
+            # 全ノートを書き込めたときだけ進める（失敗したノートは次回の差分に残る）
+            if success:
+                mirror.save_applied(head)
+                print("✅ ミラー同期完了")
+            else:
+                print("❌ 一部のノートを反映できませんでした（次回もう一度反映します）")
+            
+            status = "success" if success else "failed"
+            return success
+        finally:
+            finish_run(status)
 
 def main():
     """メイン関数"""
     try:
         sync = LocalSync()
-        sync.run_sync()
+        if "--mirror" in sys.argv[1:]:
+            sync.run_mirror_sync()
+        else:
+            sync.run_sync()
     except Exception as e:
         print(f"❌ 同期エラー: {e}")
         exit(1)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Three-way merge for the task section
+前回取り込んだ内容（ベース）を基準に、Vault側の編集を残したまま取り込み元の変更だけを反映する
+"""
+
+import os
+import json
+import hashlib
+from difflib import SequenceMatcher
+from config import Config
+from note_parser import parse_note, replace_task_section
+from task_model import Task
+
+
+def line_identity(line):
+    """行の同一性キー（マーカーのタスクID・タスクのタイトル・行そのもの）"""
+    task = Task.from_line(line)
+    if task is None:
+        return (('line', line.strip()),)
+    if task.todoist_id:
+        return (('id', task.todoist_id), ('title', task.title))
+    return (('title', task.title),)
+
+
+def _hunks(base, other):
+    """base → other の変更箇所 [(base開始, base終了, 置き換え後の行)]"""
+    matcher = SequenceMatcher(None, base, other, autojunk=False)
+    return [
+        (i1, i2, other[j1:j2])
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != 'equal'
+    ]
+
+
+def _resolve(ours, theirs, key, conflicts):
+    """両側が同じ範囲を変更した場合: Vault側の行を残し、取り込み元にしかない行を加える
+
+    マーカーのない行に同じタイトルのマーカー付きの行が来た場合は、取り込み元の行を採用する。
+    同じタスクIDの行は表記が違っても1つのタスクとして扱い、Vault側の行を残す。
+    """
+    if ours == theirs:
+        return list(ours)
+    merged = list(ours)
+    ours_keys = {}
+    for position, line in enumerate(ours):
+        for line_key in key(line):
+            ours_keys.setdefault(line_key, position)
+    for line in theirs:
+        line_keys = key(line)
+        position = next((ours_keys[k] for k in line_keys if k in ours_keys), None)
+        if position is not None and line_keys[0][0] == 'id':
+            # 同じタイトルでも別のタスクIDの行とは対応付けない
+            existing_keys = key(merged[position])
+            if existing_keys[0][0] == 'id' and existing_keys[0] != line_keys[0]:
+                position = None
+        if position is None:
+            merged.append(line)
+            continue
+        existing = merged[position]
+        if existing == line:
+            continue
+        existing_key = key(existing)[0]
+        if line_keys[0][0] == 'id' and existing_key[0] != 'id':
+            merged[position] = line
+        elif existing_key == line_keys[0] and existing_key[0] == 'id':
+            # 同じタスクIDの行は同じタスクなので衝突にせずVault側を残す
+            continue
+        else:
+            conflicts.append({'ours': existing, 'theirs': line})
+    return merged
+
+
+def merge_lines(base, ours, theirs, key=line_identity):
+    """行単位の3方向マージ。(マージ結果, 衝突のリスト) を返す
+
+    3つに共通する先頭・末尾を除いた範囲だけを差分計算するため、
+    コストはノートの大きさではなく変更量に比例する。
+    """
+    if ours == theirs:
+        return list(ours), []
+    if base == theirs:
+        return list(ours), []
+    if base == ours:
+        return list(theirs), []
+
+    # 共通の先頭・末尾を除く
+    prefix = 0
+    limit = min(len(base), len(ours), len(theirs))
+    while prefix < limit and base[prefix] == ours[prefix] == theirs[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and base[-1 - suffix] == ours[-1 - suffix] == theirs[-1 - suffix]:
+        suffix += 1
+
+    base_mid = base[prefix:len(base) - suffix]
+    ours_mid = ours[prefix:len(ours) - suffix]
+    theirs_mid = theirs[prefix:len(theirs) - suffix]
+
+    # 各側の変更箇所を (base開始, base終了, 置き換え, 側) として並べる
+    changes = [(start, end, lines, 'ours') for start, end, lines in _hunks(base_mid, ours_mid)]
+    changes += [(start, end, lines, 'theirs') for start, end, lines in _hunks(base_mid, theirs_mid)]
+    changes.sort(key=lambda change: (change[0], change[1]))
+
+    # Vault側に既にあるタスクID（Obsidianで作成してIDを書き戻した行など）
+    ours_ids = {line_key[0] for line_key in map(key, ours_mid) if line_key[0][0] == 'id'}
+
+    merged = list(ours[:prefix])
+    conflicts = []
+    position = 0
+    i = 0
+    while i < len(changes):
+        # base上で重なる（または同じ位置への挿入の）変更をまとめる
+        start, end = changes[i][0], changes[i][1]
+        group = [changes[i]]
+        i += 1
+        while i < len(changes) and (changes[i][0] < end or changes[i][0] == start):
+            end = max(end, changes[i][1])
+            group.append(changes[i])
+            i += 1
+
+        merged.extend(base_mid[position:start])
+        sides = {side for _, _, _, side in group}
+        if len(sides) == 1:
+            # 片側だけの変更はそのまま適用
+            cursor = start
+            for change_start, change_end, lines, side in group:
+                merged.extend(base_mid[cursor:change_start])
+                if side == 'theirs':
+                    lines = _without_known_ids(lines, base_mid[change_start:change_end], ours_ids, key)
+                merged.extend(lines)
+                cursor = change_end
+            merged.extend(base_mid[cursor:end])
+        else:
+            ours_lines = _apply_group(base_mid, start, end, group, 'ours')
+            theirs_lines = _apply_group(base_mid, start, end, group, 'theirs')
+            merged.extend(_resolve(ours_lines, theirs_lines, key, conflicts))
+        position = end
+
+    merged.extend(base_mid[position:])
+    merged.extend(ours[len(ours) - suffix:])
+    return merged, conflicts
+
+
+def _without_known_ids(lines, replaced, ours_ids, key):
+    """取り込み元が追加した行のうち、同じタスクIDの行がVault側の別の位置にあるものを除く"""
+    replaced_ids = {key(line)[0] for line in replaced}
+    return [
+        line for line in lines
+        if key(line)[0] not in ours_ids or key(line)[0] in replaced_ids
+    ]
+
+
+def _apply_group(base, start, end, group, side):
+    """base[start:end] に片側の変更だけを適用した行"""
+    lines = []
+    cursor = start
+    for change_start, change_end, replacement, change_side in group:
+        if change_side != side:
+            continue
+        lines.extend(base[cursor:change_start])
+        lines.extend(replacement)
+        cursor = change_end
+    lines.extend(base[cursor:end])
+    return lines
+
+
+def section_lines(text, index=None):
+    """タスクセクション本文の行（前後の空行を除く）"""
+    index = index or parse_note(text)
+    section = index.task_section()
+    if section is None:
+        return []
+    body = index.section_body(section).strip('\n')
+    if not body.strip():
+        return []
+    return [line.rstrip('\r') for line in body.split('\n')]
+
+
+def merge_task_section(text, incoming_lines, base_lines, header="#### ＜今日のタスク＞"):
+    """ノートのタスクセクションに取り込み元の変更をマージする
+
+    (新しい本文, マージ後の行, 衝突) を返す。base_lines が None（初回）の場合は
+    Vault側の行を残したまま、まだない行だけを追加する。
+    """
+    index = parse_note(text)
+    ours = section_lines(text, index)
+    merged, conflicts = merge_lines(base_lines or [], ours, list(incoming_lines))
+    if merged == ours and index.task_section() is not None:
+        return text, merged, conflicts
+    return replace_task_section(text, merged, header=header, index=index), merged, conflicts
+
+
+class MergeBaseStore:
+    """取り込み元ごと・ノートごとのベース（前回取り込んだタスク行）"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or Config.MERGE_BASE_DIR
+
+    def _path(self, source, note):
+        name = hashlib.sha1(str(note).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, source, f"{name}.json")
+
+    def load(self, source, note):
+        """ベースの行（なければNone）"""
+        try:
+            with open(self._path(source, note), 'r', encoding='utf-8') as f:
+                return json.load(f)['lines']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, source, note, lines):
+        """ベースを保存"""
+        path = self._path(source, note)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'note': str(note), 'lines': list(lines)}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Daily note section parser
+日次ノートを1回の走査で見出し・タスク行に分解し、オフセットで差し替える
+"""
+
+import re
+
+# 行頭の改行を含めてマッチさせ、先頭のリテラルで高速に読み飛ばせるようにする
+HEADING_PATTERN = re.compile(
+    r'\n(?:(?P<fence>```)|(?P<hashes>#{1,6})[ \t]+(?P<title>[^\n]*?)[ \t\r]*(?=\n|\Z))'
+)
+TASK_PATTERN = re.compile(r'[ \t]*- \[([ xX])\][ \t]?(.*)')
+
+# タスクセクションとして扱う見出し（Vault形式 / GitHub Actions形式）
+TASK_SECTION_TITLES = ('＜今日のタスク＞', '今日のタスク')
+
+# 日次ノートのパス（.../YYYY/MM/DD.md）
+NOTE_PATH_PATTERN = re.compile(r'(\d{4})[/\\](\d{2})[/\\](\d{2})\.md$')
+
+
+class Section:
+    """見出しと本文の範囲（オフセットは文字単位）"""
+
+    __slots__ = ('title', 'level', 'start', 'body_start', 'end')
+
+    def __init__(self, title, level, start, body_start):
+        self.title = title
+        self.level = level
+        self.start = start  # 見出し行の先頭
+        self.body_start = body_start  # 見出し行の次の行の先頭
+        self.end = None  # 同じか上位レベルの次の見出しの先頭（なければ末尾）
+
+    def __repr__(self):
+        return f"Section({self.title!r}, level={self.level}, {self.start}-{self.end})"
+
+
+class TaskLine:
+    """チェックボックス付きのタスク行"""
+
+    __slots__ = ('line_no', 'start', 'end', 'checked', 'content')
+
+    def __init__(self, line_no, start, end, checked, content):
+        self.line_no = line_no  # 1始まりの行番号
+        self.start = start
+        self.end = end  # 改行を含まない行末
+        self.checked = checked
+        self.content = content
+
+    @property
+    def text(self):
+        """行の文字列（インデントを除く）"""
+        return f"- [{'x' if self.checked else ' '}] {self.content}"
+
+    def __repr__(self):
+        return f"TaskLine({self.line_no}, checked={self.checked}, {self.content!r})"
+
+
+class NoteIndex:
+    """ノート全体のセクション・タスク行の索引
+
+    見出しは1回の走査で索引化し、タスク行は要求されたセクションの範囲だけを
+    解析してキャッシュする。
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.sections = []
+        self._code_blocks = []
+        self._task_cache = {}
+        self._parse()
+
+    def _parse(self):
+        # 見出しとコードフェンスの行だけを正規表現で拾う（他の行はC側で読み飛ばす）
+        text = self.text
+        length = len(text)
+        open_sections = []
+        code_start = None
+
+        def handle(fence, hashes, title, position, line_end):
+            nonlocal code_start
+            if fence is not None:
+                if code_start is None:
+                    code_start = position
+                else:
+                    self._code_blocks.append((code_start, line_end))
+                    code_start = None
+                return
+            if code_start is not None:
+                return
+
+            level = len(hashes)
+            # 同じか上位レベルの見出しで前のセクションを閉じる
+            while open_sections and open_sections[-1].level >= level:
+                open_sections.pop().end = position
+            section = Section(title, level, position, min(line_end + 1, length))
+            self.sections.append(section)
+            open_sections.append(section)
+
+        # 1行目は直前に改行がないので、改行を補って個別に判定する
+        if text[:1] in ('#', '`'):
+            first_line_end = text.find('\n')
+            if first_line_end == -1:
+                first_line_end = length
+            first = HEADING_PATTERN.match("\n" + text[:first_line_end])
+            if first:
+                handle(*first.group('fence', 'hashes', 'title'), 0, first_line_end)
+
+        for match in HEADING_PATTERN.finditer(text):
+            handle(*match.group('fence', 'hashes', 'title'), match.start() + 1, match.end())
+
+        if code_start is not None:
+            self._code_blocks.append((code_start, length))
+        for section in open_sections:
+            section.end = length
+
+    def _in_code_block(self, position):
+        for start, end in self._code_blocks:
+            if start <= position < end:
+                return True
+        return False
+
+    def tasks_between(self, start, end):
+        """[start, end) の範囲にあるタスク行"""
+        key = (start, end)
+        if key in self._task_cache:
+            return self._task_cache[key]
+
+        text = self.text
+        line_no = text.count('\n', 0, start) + 1
+        position = start
+        tasks = []
+        append = tasks.append
+        match_task = TASK_PATTERN.match
+        for line in text[start:end].split('\n'):
+            if line[:1] in ('-', ' ', '\t'):
+                match = match_task(line)
+                if match and not (self._code_blocks and self._in_code_block(position)):
+                    mark, content = match.groups()
+                    line_end = position + len(line.rstrip('\r'))
+                    append(TaskLine(line_no, position, line_end, mark != ' ', content.strip()))
+            position += len(line) + 1
+            line_no += 1
+
+        self._task_cache[key] = tasks
+        return tasks
+
+    @property
+    def tasks(self):
+        """ノート全体のタスク行"""
+        return self.tasks_between(0, len(self.text))
+
+    def find_section(self, titles):
+        """タイトルが一致する最初のセクション"""
+        if isinstance(titles, str):
+            titles = (titles,)
+        for section in self.sections:
+            if section.title in titles:
+                return section
+        return None
+
+    def task_section(self):
+        """＜今日のタスク＞ / 今日のタスク セクション"""
+        return self.find_section(TASK_SECTION_TITLES)
+
+    def section_tasks(self, section):
+        """セクション内のタスク行"""
+        if section is None:
+            return []
+        return self.tasks_between(section.body_start, section.end)
+
+    def section_body(self, section):
+        """セクション本文（見出し行を除く）"""
+        return self.text[section.body_start:section.end]
+
+    def has_next_heading(self, section):
+        """セクションの後ろに別の見出しが続くか"""
+        return section.end < len(self.text)
+
+
+def parse_note(text):
+    """ノートを索引化"""
+    return NoteIndex(text)
+
+
+def splice(text, start, end, replacement):
+    """text[start:end] を replacement で置き換えた文字列"""
+    return text[:start] + replacement + text[end:]
+
+
+def format_section_body(lines, followed_by_heading=True):
+    """タスク行をセクション本文にする（次の見出しとの間に空行を1つ）"""
+    body = "\n".join(lines) + "\n"
+    if followed_by_heading:
+        body += "\n"
+    return body
+
+
+def replace_task_section(text, lines, header="#### ＜今日のタスク＞", index=None):
+    """タスクセクションの本文だけを差し替える（なければ末尾に追加）"""
+    index = index or parse_note(text)
+    section = index.task_section()
+
+    if section is None:
+        separator = "" if not text or text.endswith("\n\n") else ("\n" if text.endswith("\n") else "\n\n")
+        return text + separator + f"{header}\n" + format_section_body(lines, followed_by_heading=False)
+
+    body = format_section_body(lines, index.has_next_heading(section))
+    if section.body_start == len(text) and not text.endswith("\n"):
+        body = "\n" + body
+    return splice(text, section.body_start, section.end, body)
+
+
+def note_date_from_path(path):
+    """.../YYYY/MM/DD.md から YYYY-MM-DD を取得"""
+    match = NOTE_PATH_PATTERN.search(path)
+    if not match:
+        return None
+    return f"{match.group(1)}-{match.group(2)}-{match.group(3)}"
+
+
+def extract_task_lines(text, index=None):
+    """タスクセクション内のタスク行"""
+    index = index or parse_note(text)
+    return index.section_tasks(index.task_section())
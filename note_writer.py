@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Atomic, coalescing note writer
+1回の実行中のノートへの編集をまとめ、最後に一時ファイル＋renameで1回だけ書き込む
+"""
+
+import os
+from instrumentation import count
+
+
+def _read_bytes(path):
+    """ファイルの (内容, (mtime_ns, size))。存在しなければ (None, None)"""
+    try:
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            return f.read(), (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None, None
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class PendingNote:
+    """書き込み待ちのノート"""
+
+    __slots__ = ('path', 'original', 'signature', 'edits', 'content', 'on_flushed')
+
+    def __init__(self, path):
+        self.path = path
+        self.original, self.signature = _read_bytes(path)
+        self.edits = []
+        self.content = self.original_text()
+        self.on_flushed = []
+
+    def original_text(self):
+        if self.original is None:
+            return None
+        return self.original.decode('utf-8')
+
+    def apply(self, edit):
+        result = edit(self.content)
+        if result is not None:
+            self.content = result
+
+    def rebase(self, data, signature):
+        """他のプロセス（Obsidian）が書き換えた内容に編集をやり直す"""
+        self.original, self.signature = data, signature
+        self.content = self.original_text()
+        for edit in self.edits:
+            self.apply(edit)
+
+
+class NoteWriter:
+    """ノートへの編集をパスごとにまとめるwrite-behindの書き込み層
+
+    編集は「現在の本文 -> 新しい本文」の関数として登録する。flush時に
+    Obsidian側の変更（mtime・サイズ・内容）を検出した場合は、最新の本文に
+    編集をやり直してから書き込む。
+    """
+
+    def __init__(self):
+        self.pending = {}
+
+    def read(self, path):
+        """書き込み待ちの内容を含めた現在の本文（なければNone）"""
+        note = self.pending.get(os.path.abspath(path))
+        if note is not None:
+            return note.content
+        data, _ = _read_bytes(path)
+        return None if data is None else data.decode('utf-8')
+
+    def edit(self, path, edit, on_flushed=None):
+        """編集を登録し、適用後の本文を返す（edit が None を返した場合は変更なし）
+
+        on_flushed はノートがディスクの内容と一致した（written / rebased / unchanged）
+        ときだけflush後に呼ばれる。マージのベースなど、書き込めた場合だけ残す状態の保存に使う。
+        """
+        path = os.path.abspath(path)
+        note = self.pending.get(path)
+        if note is None:
+            note = self.pending[path] = PendingNote(path)
+        note.edits.append(edit)
+        if on_flushed is not None:
+            note.on_flushed.append(on_flushed)
+        note.apply(edit)
+        return note.content
+
+    def write(self, path, content):
+        """本文全体を置き換える"""
+        return self.edit(path, lambda _: content)
+
+    def flush(self):
+        """書き込み待ちのノートを書き込み、パスごとの結果を返す
+
+        結果: written / unchanged / rebased（Obsidianの変更に編集をやり直した）/
+        conflict（やり直し中にも変更されたため書き込まなかった）
+        """
+        results = {}
+        pending, self.pending = self.pending, {}
+        for path, note in pending.items():
+            try:
+                results[path] = self._flush_note(note)
+            except Exception as e:
+                print(f"❌ ノート書き込みエラー ({path}): {e}")
+                results[path] = 'error'
+            count(f"notes_{results[path]}")
+            if results[path] in ('written', 'rebased', 'unchanged'):
+                for callback in note.on_flushed:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"⚠️ 書き込み後の処理エラー ({path}): {e}")
+        return results
+
+    def _flush_note(self, note):
+        status = 'written'
+        if _signature(note.path) != note.signature:
+            data, signature = _read_bytes(note.path)
+            if data != note.original:
+                print(f"🔀 Obsidian側の変更を検出したため編集をやり直します: {note.path}")
+                note.rebase(data, signature)
+                status = 'rebased'
+            else:
+                note.signature = signature
+
+        if note.content is None:
+            return 'unchanged'
+        encoded = note.content.encode('utf-8')
+        if encoded == note.original:
+            return 'unchanged'
+
+        directory = os.path.dirname(note.path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{os.path.basename(note.path)}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # rename直前にもう一度確認し、やり直し中の変更は上書きしない
+        if _signature(note.path) != note.signature:
+            os.remove(tmp_path)
+            print(f"⚠️ 書き込み中にObsidianで変更されたためスキップ: {note.path}")
+            return 'conflict'
+
+        from vault_watcher import record_own_write
+
+        record_own_write(note.path, encoded)
+        os.replace(tmp_path, note.path)
+        return status
+
+    def discard(self):
+        """書き込み待ちの編集を破棄"""
+        self.pending = {}
+
+
+_writer = None
+
+
+def get_writer():
+    """プロセス共通のNoteWriter"""
+    global _writer
+    if _writer is None:
+        _writer = NoteWriter()
+    return _writer
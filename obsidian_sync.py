@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Unified command-line entry point
+同期処理をサブコマンドでまとめたCLI（重い依存はそのサブコマンドの中でだけ読み込む）
+
+    obsidian-sync cloud                       # Todoist → GitHub（GitHub Actions用）
+    obsidian-sync local [--mirror]            # GitHub → Obsidian
+    obsidian-sync bidi [--watch]              # Obsidian ⇔ Todoist
+    obsidian-sync backfill START [END] [--force] [--dry-run]
+    obsidian-sync daemon [--cloud]            # 常駐して同期を繰り返す
+    obsidian-sync outbox [--replay]           # 未送信の書き込み
+    obsidian-sync tenants [NAME ...] [--workers N]  # テナントごとのプロファイルで並列に同期
+    obsidian-sync webhook [--port N] [--replay FILE]  # TodoistのWebhookでノートを即時更新
+    obsidian-sync status                      # 直近の実行結果（ネットワークを使わない）
+"""
+
+import os
+import sys
+import argparse
+from config import Config
+
+
+def run_cloud(args):
+    from cloud_sync import CloudSync
+
+    return CloudSync().run_sync()
+
+
+def run_local(args):
+    from local_sync import LocalSync
+
+    sync = LocalSync()
+    return sync.run_mirror_sync() if args.mirror else sync.run_sync()
+
+
+def run_bidi(args):
+    from sync_daemon import load_bidirectional_sync
+
+    manager = load_bidirectional_sync().SyncManager()
+    if args.watch:
+        manager.watch()
+        return True
+    return manager.full_sync()['todoist_success']
+
+
+def run_backfill(args):
+    from backfill import Backfill, parse_date
+
+    start = parse_date(args.start)
+    end = parse_date(args.end) if args.end else start
+    if end < start:
+        print("❌ 終了日は開始日以降にしてください")
+        return False
+    Backfill().run(start, end, force=args.force, dry_run=args.dry_run)
+    return True
+
+
+def run_daemon(args):
+    from sync_daemon import SyncDaemon
+
+    SyncDaemon("cloud" if args.cloud else "bidi").run()
+    return True
+
+
+def run_outbox(args):
+    import outbox
+
+    outbox.main(replay=args.replay)
+    return True
+
+
+def run_tenants(args):
+    from tenants import TenantRunner, load_profiles
+
+    profiles = load_profiles(args.dir, set(args.names))
+    if not profiles:
+        print("⚠️ 同期するテナントがありません")
+        return True
+    results = TenantRunner(profiles, workers=args.workers).run()
+    summary = TenantRunner.summary(results)
+    print(f"📊 {summary['succeeded']}/{summary['tenants']}テナント成功, HTTP {summary['requests']}リクエスト")
+    return summary['failed'] == 0
+
+
+def run_webhook(args):
+    from webhook_server import WebhookServer, WebhookApplier, replay
+
+    if args.replay:
+        statuses = replay(args.replay, args.url)
+        return set(statuses) <= {200}
+    WebhookServer(WebhookApplier(), host=args.host, port=args.port).serve_forever()
+    return True
+
+
+def _read_json(path):
+    import json
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _last_runs(path, tail_bytes=64 * 1024):
+    """metrics.jsonl の末尾から、実行の種類ごとに最新の記録を返す"""
+    import json
+
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - tail_bytes))
+            lines = f.read().decode('utf-8', errors='ignore').splitlines()
+    except OSError:
+        return {}
+    runs = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # 途中から読んだ先頭行
+        runs[record['run']] = record
+    return runs
+
+
+def run_status(args):
+    from datetime import datetime
+    from outbox import Outbox, TODOIST, GITHUB
+
+    print(f"📂 状態ディレクトリ: {Config.STATE_DIR}")
+
+    runs = _last_runs(Config.METRICS_FILE)
+    if not runs:
+        print("⏱️ 実行記録はまだありません")
+    for name, record in sorted(runs.items()):
+        http = record.get('http', {})
+        icon = "✅" if record.get('status') == 'success' else "❌"
+        print(f"{icon} {name}: {record['started']} ({record['duration_ms']:.0f}ms, HTTP {http.get('requests', 0)}回)")
+
+    daemon = _read_json(Config.DAEMON_STATUS_FILE)
+    if daemon:
+        print(f"🔁 デーモン ({daemon['mode']}): {daemon['state']} - {daemon['cycles']}サイクル, 次回 {daemon['next_cycle']}")
+        if daemon.get('last_error'):
+            print(f"   ⚠️ 直近のエラー: {daemon['last_error']}")
+
+    if os.path.exists(Config.TODOIST_REPLICA_FILE):
+        updated = datetime.fromtimestamp(os.path.getmtime(Config.TODOIST_REPLICA_FILE))
+        print(f"📋 Todoistレプリカ: {updated:%Y-%m-%d %H:%M:%S} 更新")
+
+    outbox = Outbox()
+    for kind in (TODOIST, GITHUB):
+        pending = len(outbox.pending(kind))
+        if pending:
+            state = " (接続待ち)" if outbox.is_deferred(kind) else ""
+            print(f"📮 未送信 {kind}: {pending}件{state}")
+    return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="obsidian-sync", description="Obsidian・Todoist・GitHubの同期")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("cloud", help="Todoistのタスクを日次ノートにしてGitHubに保存").set_defaults(func=run_cloud)
+
+    local = commands.add_parser("local", help="GitHubの日次ノートをObsidianに反映")
+    local.add_argument("--mirror", action="store_true", help="gitミラーで変更されたノートをまとめて反映")
+    local.set_defaults(func=run_local)
+
+    bidi = commands.add_parser("bidi", help="ObsidianとTodoistの双方向同期")
+    bidi.add_argument("--watch", action="store_true", help="Vaultを監視して保存のたびに同期")
+    bidi.set_defaults(func=run_bidi)
+
+    backfill = commands.add_parser("backfill", help="欠けている日次ノートを期間指定で作り直す")
+    backfill.add_argument("start", help="開始日 (YYYY-MM-DD)")
+    backfill.add_argument("end", nargs="?", help="終了日 (YYYY-MM-DD、省略時は開始日)")
+    backfill.add_argument("--force", action="store_true", help="既にあるノートも作り直す")
+    backfill.add_argument("--dry-run", action="store_true", help="GitHubに書き込まない")
+    backfill.set_defaults(func=run_backfill)
+
+    daemon = commands.add_parser("daemon", help="活動量に応じた間隔で同期を繰り返す")
+    daemon.add_argument("--cloud", action="store_true", help="双方向同期の代わりにクラウド同期を繰り返す")
+    daemon.set_defaults(func=run_daemon)
+
+    outbox = commands.add_parser("outbox", help="送信できなかった書き込みを表示")
+    outbox.add_argument("--replay", action="store_true", help="保留中でも今すぐ再送する")
+    outbox.set_defaults(func=run_outbox)
+
+    tenants = commands.add_parser("tenants", help="テナントごとのプロファイルで同期を並列実行")
+    tenants.add_argument("names", nargs="*", help="同期するテナント（省略時は全員）")
+    tenants.add_argument("--dir", help="プロファイルのディレクトリ（既定: TENANTS_DIR）")
+    tenants.add_argument("--workers", type=int, help="ワーカープロセス数（既定: CPU数）")
+    tenants.set_defaults(func=run_tenants)
+
+    webhook = commands.add_parser("webhook", help="TodoistのWebhookを受けて該当タスク行だけを更新")
+    webhook.add_argument("--host", help="待ち受けるアドレス（既定: WEBHOOK_HOST）")
+    webhook.add_argument("--port", type=int, help="待ち受けるポート（既定: WEBHOOK_PORT）")
+    webhook.add_argument("--replay", metavar="FILE", help="記録したイベント（JSONL）に署名して送る")
+    webhook.add_argument("--url", help="--replay の送信先（既定: ローカルの待ち受けURL）")
+    webhook.set_defaults(func=run_webhook)
+
+    commands.add_parser("status", help="直近の実行結果と未送信の書き込み").set_defaults(func=run_status)
+    return parser
+
+
+def main(argv=None):
+    """メイン関数"""
+    args = build_parser().parse_args(argv)
+    try:
+        success = args.func(args)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except Exception as e:
+        print(f"❌ {args.command} エラー: {e}")
+        sys.exit(1)
+    if success is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
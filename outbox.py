@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Durable outbox for remote writes
+Todoist・GitHubへの書き込みを追記専用のジャーナルに記録し、接続が戻ったらまとめて再送する
+
+    python outbox.py            # 未送信の操作を表示
+    python outbox.py --replay   # 未送信の操作を再送
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+from config import Config
+
+TODOIST = 'todoist'
+GITHUB = 'github'
+
+
+class Outbox:
+    """冪等キーごとに最新の操作だけを保持する、追記専用のジャーナル
+
+    ジャーナルの1行は enqueue（操作の記録）/ done（送信済み）/ defer（接続失敗）
+    のいずれか。同じキーの操作は後から記録したものが前のものを置き換える。
+    Todoistのコマンドはキーごとのuuidで送るので、送信結果が分からないまま
+    再送しても二重に適用されない。
+    """
+
+    def __init__(self, path=None, retry_seconds=None):
+        self.path = path or Config.OUTBOX_FILE
+        self.retry_seconds = Config.OUTBOX_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self.entries = {}  # キー -> 最新の操作
+        self.deferred = {}  # 種類 -> 再送を控える期限（epoch秒）
+        self.lines = 0
+        self._load()
+
+    def _load(self):
+        """ジャーナルを先頭から適用して未送信の操作を復元"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 書き込み途中で止まった最終行
+                    self._apply(record)
+                    self.lines += 1
+        except Exception as e:
+            print(f"⚠️ アウトボックス読み込みエラー: {e}")
+
+    def _apply(self, record):
+        op = record.get('op')
+        if op == 'enqueue':
+            self.entries[record['key']] = record
+        elif op == 'done':
+            entry = self.entries.get(record['key'])
+            if entry and entry['id'] == record['id']:
+                del self.entries[record['key']]
+        elif op == 'defer':
+            self.deferred[record['kind']] = record['until']
+
+    def _append(self, records):
+        """ジャーナルに追記してfsync（プロセスが落ちても残る）"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        for record in records:
+            self._apply(record)
+        self.lines += len(records)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def pending(self, kind):
+        """未送信の操作（記録順）"""
+        return [entry for entry in self.entries.values() if entry['kind'] == kind]
+
+    def enqueue(self, kind, key, payload, label=None):
+        """操作を記録して冪等キーを返す（同じ内容が未送信なら何もしない）"""
+        current = self.entries.get(key)
+        if current and current['payload'] == payload:
+            return key
+        self._append([{
+            'op': 'enqueue',
+            'id': str(uuid.uuid4()),
+            'kind': kind,
+            'key': key,
+            'payload': payload,
+            'label': label,
+            'at': time.time(),
+        }])
+        return key
+
+    def enqueue_todoist(self, command_type, args, key=None, label=None, temp_id=None, meta=None):
+        """Todoistのコマンドを記録（item_updateは未送信の更新にまとめる）
+
+        meta は送信結果にそのまま付けて返す（作成したタスクをどの行に書き戻すかなど）
+        """
+        if key is None:
+            key = f"{command_type}:{args['id']}"
+        key = f"{TODOIST}:{key}"
+        if command_type == 'item_update' and key in self.entries:
+            merged = dict(self.entries[key]['payload']['args'])
+            merged.update(args)
+            args = merged
+        payload = {'type': command_type, 'args': args}
+        if temp_id:
+            payload['temp_id'] = temp_id
+        if meta is not None:
+            payload['meta'] = meta
+        return self.enqueue(TODOIST, key, payload, label)
+
+    def enqueue_github(self, path, content):
+        """GitHubに書き込むファイルを記録（同じパスは最新の内容だけ残す）"""
+        return self.enqueue(GITHUB, f"{GITHUB}:{path}", {'path': path, 'content': content}, path)
+
+    def mark_done(self, entries):
+        """送信済みにする（送信中に置き換えられた操作は残る）"""
+        if entries:
+            self._append([{'op': 'done', 'key': entry['key'], 'id': entry['id']} for entry in entries])
+            self._compact_if_needed()
+
+    def defer(self, kind):
+        """接続に失敗した種類の再送をしばらく控える"""
+        self._append([{'op': 'defer', 'kind': kind, 'until': time.time() + self.retry_seconds}])
+
+    def resume(self, kind):
+        """送信に成功したら保留を解除"""
+        if self.deferred.get(kind):
+            self._append([{'op': 'defer', 'kind': kind, 'until': 0}])
+
+    def is_deferred(self, kind):
+        return time.time() < self.deferred.get(kind, 0)
+
+    def _compact_if_needed(self):
+        """送信済みの行が溜まったら、未送信の操作だけのジャーナルに書き直す"""
+        if self.lines < 2 * len(self.entries) + 100:
+            return
+        records = list(self.entries.values())
+        records += [
+            {'op': 'defer', 'kind': kind, 'until': until}
+            for kind, until in self.deferred.items() if until > time.time()
+        ]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.lines = len(records)
+
+    def flush_todoist(self, api_token, base_url=None, force=False):
+        """未送信のTodoistコマンドをバッチで送信し、コマンドごとの結果を返す
+
+        通信エラーのコマンドは残して次回に再送する。Todoistが拒否したコマンド
+        （存在しないタスクなど）は再送しても成功しないので破棄する。
+        temp_id付きで作成したタスクの実IDは結果の id に入る。
+        """
+        from todoist_commands import TodoistCommandBatch
+
+        entries = self.pending(TODOIST)
+        if not entries:
+            return {}
+        if self.is_deferred(TODOIST) and not force:
+            print(f"⏸️ Todoistに接続できないため{len(entries)}件の送信を保留中")
+            return {}
+
+        # 失敗分は次回まとめて送るので、ここでは個別の再送はしない
+        batch = TodoistCommandBatch(api_token, base_url=base_url, max_retries=0)
+        for entry in entries:
+            command = entry['payload']
+            batch.add(command['type'], command['args'], temp_id=command.get('temp_id'),
+                      key=entry['label'], command_uuid=entry['id'])
+        results = batch.flush()
+
+        done, unreachable = [], False
+        for entry in entries:
+            result = results[entry['id']]
+            if 'meta' in entry['payload']:
+                result['meta'] = entry['payload']['meta']
+            if result['ok']:
+                done.append(entry)
+            elif isinstance(result['error'], dict) and 'error_code' in result['error']:
+                print(f"🗑️ Todoistが拒否したコマンドを破棄: {entry['label']} ({result['error'].get('error')})")
+                done.append(entry)
+            else:
+                unreachable = True
+        self.mark_done(done)
+        if unreachable:
+            self.defer(TODOIST)
+            print(f"📮 Todoistへの{len(entries) - len(done)}件をアウトボックスに残しました")
+        else:
+            self.resume(TODOIST)
+        return results
+
+    def flush_github(self, commit_builder, message=None, force=False):
+        """未送信のファイルを1コミットで書き込む（ビルダーでステージ済みのパスが優先）
+
+        コミットSHA（変更がなければNone）を返す。保留中でアウトボックスに移しただけならFalse。
+        """
+        entries = self.pending(GITHUB)
+        if self.is_deferred(GITHUB) and not force:
+            if entries:
+                print(f"⏸️ GitHubに接続できないため{len(entries)}ファイルの送信を保留中")
+            self._stash_github(commit_builder)
+            return False
+
+        for entry in entries:
+            if entry['payload']['path'] not in commit_builder.staged:
+                commit_builder.stage(entry['payload']['path'], entry['payload']['content'])
+        if not commit_builder.staged:
+            return None
+        if message is None:
+            message = f"Replay {len(entries)} pending change(s)"
+
+        staged = dict(commit_builder.staged)
+        try:
+            sha = commit_builder.commit(message)
+        except Exception as e:
+            print(f"⚠️ GitHubへの書き込みに失敗したためアウトボックスに残します: {e}")
+            commit_builder.staged = staged
+            self._stash_github(commit_builder)
+            self.defer(GITHUB)
+            raise
+        self.mark_done(entries)
+        self.resume(GITHUB)
+        return sha
+
+    def _stash_github(self, commit_builder):
+        """ステージしたファイルをアウトボックスに移す"""
+        for path, content in commit_builder.staged.items():
+            self.enqueue_github(path, content)
+        commit_builder.staged = {}
+        return None
+
+
+def main(replay=None):
+    """未送信の操作を表示（--replay で再送）"""
+    if replay is None:
+        replay = '--replay' in sys.argv[1:]
+    outbox = Outbox()
+    for kind in (TODOIST, GITHUB):
+        entries = outbox.pending(kind)
+        state = " (保留中)" if outbox.is_deferred(kind) else ""
+        print(f"📮 {kind}: {len(entries)}件{state}")
+        for entry in entries:
+            print(f"   - {entry['label'] or entry['key']}")
+
+    if not replay:
+        return
+
+    token = os.getenv('TODOIST_API_TOKEN')
+    if token and outbox.pending(TODOIST):
+        outbox.flush_todoist(token, force=True)
+
+    github_token = os.getenv('GITHUB_TOKEN')
+    if github_token and outbox.pending(GITHUB):
+        from github_commit import GitHubCommitBuilder, connect_github
+
+        repo = connect_github(github_token)
+        try:
+            outbox.flush_github(GitHubCommitBuilder(repo), force=True)
+        except Exception:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Long-running sync daemon
+接続・キャッシュ・レプリカを保持したまま、活動量に応じた間隔で同期を繰り返す
+
+    python sync_daemon.py            # 双方向同期 (SyncManager)
+    python sync_daemon.py --cloud    # クラウド同期 (CloudSync)
+"""
+
+import os
+import sys
+import json
+import signal
+import threading
+import importlib.util
+from datetime import datetime, timedelta
+from pathlib import Path
+from config import Config
+
+
+def load_bidirectional_sync():
+    """03.Automation/bidirectional_sync.py をモジュールとして読み込む"""
+    path = Path(__file__).resolve().parent / "03.Automation" / "bidirectional_sync.py"
+    spec = importlib.util.spec_from_file_location("bidirectional_sync", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class AdaptiveScheduler:
+    """変更があれば間隔を縮め、なければ伸ばすスケジューラー"""
+
+    def __init__(self, min_interval=None, max_interval=None, backoff=None):
+        self.min_interval = min_interval or Config.DAEMON_MIN_INTERVAL
+        self.max_interval = max_interval or Config.DAEMON_MAX_INTERVAL
+        self.backoff = backoff or Config.DAEMON_BACKOFF_FACTOR
+        self.interval = self.min_interval
+
+    def record(self, activity):
+        """サイクルの変更件数から次の間隔（秒）を決める"""
+        if activity > 0:
+            self.interval = max(self.min_interval, self.interval / (1 + min(activity, 4)))
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval
+
+    def next_run(self, now=None):
+        """次の実行時刻（夜間クリーンアップ時刻をまたぐ場合はその時刻に前倒し）"""
+        if now is None:
+            now = datetime.now()
+        scheduled = now + timedelta(seconds=self.interval)
+        cleanup = now.replace(hour=Config.EVENING_CLEANUP_HOUR, minute=0, second=0, microsecond=0)
+        if now < cleanup < scheduled:
+            return cleanup
+        return scheduled
+
+
+class SyncDaemon:
+    """SyncManager / CloudSync を使い回して同期を繰り返す常駐プロセス"""
+
+    def __init__(self, mode="bidi", scheduler=None, status_file=None):
+        self.mode = mode
+        self.scheduler = scheduler or AdaptiveScheduler()
+        self.status_file = status_file or Config.DAEMON_STATUS_FILE
+        self.stop_event = threading.Event()
+        self.started = datetime.now()
+        self.cycles = 0
+        self.last_activity = 0
+        self.last_error = None
+        self.last_cycle = None
+        self.next_cycle = None
+        self.worker = self._create_worker()
+
+    def _create_worker(self):
+        """同期オブジェクトは起動時に一度だけ作り、以降のサイクルで使い回す"""
+        if self.mode == "cloud":
+            from cloud_sync import CloudSync
+            return CloudSync()
+        return load_bidirectional_sync().SyncManager()
+
+    def _todoist_client(self):
+        if self.mode == "cloud":
+            return self.worker.todoist_sync
+        return self.worker.todoist.sync_client
+
+    def run_cycle(self):
+        """1サイクル分の同期を実行し、変更件数を返す"""
+        if self.mode == "cloud":
+            self.worker.run_sync()
+            activity = 0
+        else:
+            result = self.worker.full_sync() or {}
+            activity = result.get('completed_count', 0)
+
+        client = self._todoist_client()
+        if client:
+            activity += client.last_changed
+        return activity
+
+    def write_status(self, state):
+        """ヘルスチェック用のステータスファイルを書き出す"""
+        status = {
+            "pid": os.getpid(),
+            "mode": self.mode,
+            "state": state,
+            "started": self.started.isoformat(),
+            "cycles": self.cycles,
+            "last_cycle": self.last_cycle.isoformat() if self.last_cycle else None,
+            "next_cycle": self.next_cycle.isoformat() if self.next_cycle else None,
+            "interval_seconds": round(self.scheduler.interval, 1),
+            "last_activity": self.last_activity,
+            "last_error": self.last_error,
+        }
+        os.makedirs(os.path.dirname(self.status_file), exist_ok=True)
+        tmp_path = f"{self.status_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(status, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.status_file)
+
+    def stop(self, signum=None, frame=None):
+        """シグナルを受けたら停止（次のサイクルまでの待機はすぐ打ち切り、実行中のサイクルは最後まで行う）"""
+        print(f"🛑 停止要求を受信しました ({signum})")
+        self.stop_event.set()
+
+    def run(self):
+        """停止要求まで同期サイクルを繰り返す"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(f"🚀 同期デーモンを開始 (mode={self.mode}, pid={os.getpid()})")
+
+        while not self.stop_event.is_set():
+            self.write_status("syncing")
+            try:
+                self.last_activity = self.run_cycle()
+                self.last_error = None
+            except Exception as e:
+                print(f"❌ 同期サイクルエラー: {e}")
+                self.last_activity = 0
+                self.last_error = str(e)
+
+            self.cycles += 1
+            self.last_cycle = datetime.now()
+            self.scheduler.record(self.last_activity)
+            self.next_cycle = self.scheduler.next_run(self.last_cycle)
+            self.write_status("idle")
+
+            wait = max(0.0, (self.next_cycle - datetime.now()).total_seconds())
+            print(f"⏱️ 次回: {self.next_cycle.strftime(Config.LOG_DATE_FORMAT)} (変更{self.last_activity}件)")
+            self.stop_event.wait(wait)
+
+        self.next_cycle = None
+        self.write_status("stopped")
+        print("👋 同期デーモンを停止しました")
+
+
+def main():
+    """メイン関数"""
+    mode = "cloud" if "--cloud" in sys.argv[1:] else "bidi"
+    try:
+        SyncDaemon(mode).run()
+    except Exception as e:
+        print(f"❌ デーモン起動エラー: {e}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Stable task identity mapping
+TodoistのタスクIDとノート上のタスク行を、非表示マーカーと永続化した対応表で結び付ける
+"""
+
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from config import Config
+from note_parser import extract_task_lines
+from task_model import Task, task_marker, split_marker
+
+
+def task_title(content):
+    """照合に使うタイトル（マーカー・期限・プロジェクトなどの付加情報を除く）"""
+    return Task.from_content(content).title
+
+
+def add_markers(content, created):
+    """タスクセクションのマーカーのない行に、作成したタスクのIDのマーカーを付ける
+
+    created は [(タイトル, todoist_id), ...]。同じタイトルの行が複数あれば上から順に割り当てる。
+    """
+    remaining = list(created)
+    insertions = []
+    for task_line in extract_task_lines(content):
+        task = Task.from_content(task_line.content, task_line.checked)
+        if task.todoist_id:
+            continue
+        for position, (title, todoist_id) in enumerate(remaining):
+            if title == task.title:
+                insertions.append((task_line.end, task_marker(todoist_id)))
+                del remaining[position]
+                break
+    # 後ろから挿入して前の行の位置をずらさない
+    for end, marker in reversed(insertions):
+        content = content[:end] + marker + content[end:]
+    return content
+
+
+class TaskIdentityMap:
+    """TodoistのタスクID ⇔ (ノート, タイトル) の双方向対応表
+
+    mapping は sync_data['task_mapping'] をそのまま保持し、保存時にも同じ dict を使う。
+    形式: {todoist_id: {"note": "YYYY-MM-DD", "title": タイトル}}
+    """
+
+    def __init__(self, mapping=None):
+        self.mapping = mapping if mapping is not None else {}
+        self.anchors = defaultdict(list)  # (ノート, タイトル) -> [todoist_id, ...]
+        for todoist_id, entry in self.mapping.items():
+            self.anchors[(entry.get('note'), entry.get('title'))].append(todoist_id)
+
+    def bind(self, todoist_id, note, title):
+        """対応を登録（タイトル変更・ノート移動は古いアンカーを付け替える）"""
+        todoist_id = str(todoist_id)
+        previous = self.mapping.get(todoist_id)
+        if previous:
+            if previous.get('note') == note and previous.get('title') == title:
+                return
+            ids = self.anchors.get((previous.get('note'), previous.get('title')))
+            if ids and todoist_id in ids:
+                ids.remove(todoist_id)
+        self.mapping[todoist_id] = {'note': note, 'title': title}
+        self.anchors[(note, title)].append(todoist_id)
+
+    def ids_for(self, note, title):
+        """(ノート, タイトル) に対応付けられたタスクID"""
+        return self.anchors.get((note, title), ())
+
+    def match(self, note, obsidian_tasks, todoist_tasks):
+        """ノートのタスク行（Task）とTodoistタスクを対応付ける
+
+        1. 行のマーカーのID
+        2. 対応表に記録された (ノート, タイトル)
+        3. まだ対応付けられていない同じタイトルのTodoistタスク（重複は出現順）
+        の順に探し、(タスク行, Todoistタスク or None) のリストを返す。
+        各段階はハッシュ参照のみなので全体で O(行数 + タスク数)。
+        """
+        by_id = {str(task['id']): task for task in todoist_tasks}
+        by_title = defaultdict(deque)
+        for task in todoist_tasks:
+            by_title[task_title(task['content'])].append(task)
+
+        claimed = set()
+        matched = [None] * len(obsidian_tasks)
+
+        # マーカー付きの行を先に確定させる（タイトルによる推測より優先）
+        for position, obs_task in enumerate(obsidian_tasks):
+            todoist_id = obs_task.todoist_id
+            if todoist_id and todoist_id in by_id and todoist_id not in claimed:
+                claimed.add(todoist_id)
+                matched[position] = by_id[todoist_id]
+
+        for position, obs_task in enumerate(obsidian_tasks):
+            if matched[position] is not None or obs_task.todoist_id:
+                continue
+            title = obs_task.title
+            task = None
+            for todoist_id in self.ids_for(note, title):
+                if todoist_id in by_id and todoist_id not in claimed:
+                    task = by_id[todoist_id]
+                    break
+            if task is None:
+                candidates = by_title.get(title)
+                while candidates:
+                    candidate = candidates.popleft()
+                    if str(candidate['id']) not in claimed:
+                        task = candidate
+                        break
+            if task is not None:
+                claimed.add(str(task['id']))
+                matched[position] = task
+
+        for obs_task, task in zip(obsidian_tasks, matched):
+            if task is not None:
+                self.bind(task['id'], note, obs_task.title)
+        return list(zip(obsidian_tasks, matched))
+
+    def prune(self, today=None, days=None):
+        """保持期間より古いノートの対応を削除し、削除件数を返す"""
+        if today is None:
+            today = datetime.now()
+        if days is None:
+            days = Config.TASK_MAPPING_RETENTION_DAYS
+        cutoff = (today - timedelta(days=days)).strftime("%Y-%m-%d")
+
+        expired = [
+            todoist_id for todoist_id, entry in self.mapping.items()
+            if (entry.get('note') or '') < cutoff
+        ]
+        for todoist_id in expired:
+            entry = self.mapping.pop(todoist_id)
+            ids = self.anchors.get((entry.get('note'), entry.get('title')))
+            if ids and todoist_id in ids:
+                ids.remove(todoist_id)
+        return len(expired)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Vault-wide task index
+Vault内の全日次ノートのタスク行をSQLiteに索引化し、差分だけ更新する
+"""
+
+import os
+import sys
+import sqlite3
+import hashlib
+from datetime import date, datetime, timedelta
+from config import Config
+from note_parser import parse_note, note_date_from_path, NOTE_PATH_PATTERN
+from task_model import Task
+
+# これを超えるノートを解析するときは複数プロセスを使う
+PARALLEL_THRESHOLD = 64
+
+# スキーマを変えたら上げる（古い索引は作り直す）
+SCHEMA_VERSION = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    note_date TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    path TEXT NOT NULL,
+    note_date TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    completed_at TEXT,
+    project TEXT,
+    project_id TEXT,
+    todoist_id TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_path ON tasks (path);
+CREATE INDEX IF NOT EXISTS tasks_status_date ON tasks (status, note_date);
+CREATE INDEX IF NOT EXISTS tasks_project ON tasks (project, status);
+CREATE INDEX IF NOT EXISTS tasks_project_id ON tasks (project_id, status);
+CREATE INDEX IF NOT EXISTS tasks_title ON tasks (title, status, note_date);
+"""
+
+
+def parse_note_file(path, known_digest=None):
+    """ノートを読み込んで (path, mtime, size, hash, タスク行) を返す（ワーカーでも実行）
+
+    hash が known_digest と同じ（touchされただけ）なら解析せず、タスク行は None
+    """
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == known_digest:
+        return path, stat.st_mtime, stat.st_size, digest, None
+    return path, stat.st_mtime, stat.st_size, digest, parse_task_rows(path, data.decode('utf-8'))
+
+
+def parse_task_rows(path, text):
+    """ノート本文をタスク行のレコードにする"""
+    note_date = note_date_from_path(path)
+    parsed_date = date.fromisoformat(note_date) if note_date else None
+    rows = []
+    for line in parse_note(text).tasks:
+        task = Task.from_content(line.content, line.checked, parsed_date)
+        if not task.title:
+            continue
+        rows.append((
+            path,
+            note_date,
+            line.line_no,
+            'done' if task.checked else 'open',
+            task.title,
+            line.content,
+            task.completed_at.isoformat() if task.completed_at else None,
+            task.project,  # 表示名（プロジェクト / セクション）
+            None,  # プロジェクトID（行にはないので TaskIndex が解決する）
+            task.todoist_id,
+        ))
+    return rows
+
+
+class TaskIndex:
+    """日次ノートのタスク行のSQLite索引
+
+    プロジェクトIDは行のマーカー（%%td:ID%%）をTodoistのレプリカで引き、
+    なければプロジェクト名をレプリカ・メタデータキャッシュで引いて埋める（APIは呼ばない）。
+    """
+
+    def __init__(self, db_path=None, notes_path=None, replica=None, metadata_cache=None):
+        self.db_path = db_path or Config.TASK_INDEX_DB
+        self.notes_path = notes_path or Config.DAILY_NOTES_PATH
+        self.replica = replica
+        self.metadata_cache = metadata_cache
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # 索引はノートから作り直せるので、古いスキーマは捨てる
+            self.conn.executescript("DROP TABLE IF EXISTS tasks; DROP TABLE IF EXISTS files;")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def _project_ids(self):
+        """({タスクID: プロジェクトID}, {プロジェクト名: プロジェクトID}) をローカルの状態から作る"""
+        from todoist_sync import TodoistReplica
+        from todoist_metadata import TodoistMetadataCache
+
+        replica = self.replica or TodoistReplica()
+        cache = self.metadata_cache or TodoistMetadataCache()
+        by_task = {
+            str(item_id): str(item['project_id'])
+            for item_id, item in replica.resources.get('items', {}).items()
+            if item.get('project_id')
+        }
+        by_name = {}
+        for resources in (cache.resources, replica.resources):
+            for project_id, project in resources.get('projects', {}).items():
+                by_name.setdefault(project.get('name'), str(project_id))
+        return by_task, by_name
+
+    @staticmethod
+    def _with_project_ids(rows, project_ids):
+        """行のレコードにプロジェクトIDを埋める"""
+        by_task, by_name = project_ids
+        filled = []
+        for row in rows:
+            project, todoist_id = row[7], row[9]
+            project_id = by_task.get(todoist_id) if todoist_id else None
+            if project_id is None and project:
+                # 「プロジェクト / セクション」の表示名はプロジェクト名で引く
+                project_id = by_name.get(project) or by_name.get(project.split(' / ')[0])
+            filled.append(row[:8] + (project_id,) + row[9:])
+        return filled
+
+    def iter_note_paths(self):
+        """YYYY/MM/DD.md 形式のノートを列挙"""
+        if not os.path.isdir(self.notes_path):
+            return
+        for year in sorted(os.scandir(self.notes_path), key=lambda e: e.name):
+            if not (year.is_dir() and year.name.isdigit() and len(year.name) == 4):
+                continue
+            for month in sorted(os.scandir(year.path), key=lambda e: e.name):
+                if not (month.is_dir() and month.name.isdigit()):
+                    continue
+                for day in sorted(os.scandir(month.path), key=lambda e: e.name):
+                    if day.is_file() and NOTE_PATH_PATTERN.search(day.path):
+                        yield day
+
+    def refresh(self, workers=None):
+        """変更されたノートだけを解析し直し、(解析数, 削除数) を返す"""
+        known = {
+            path: (mtime, size, digest)
+            for path, mtime, size, digest in self.conn.execute("SELECT path, mtime, size, hash FROM files")
+        }
+
+        candidates = []
+        seen = set()
+        for entry in self.iter_note_paths():
+            seen.add(entry.path)
+            stat = entry.stat()
+            previous = known.get(entry.path)
+            if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                continue
+            candidates.append(entry.path)
+
+        # 前回のhashを渡し、内容が同じノートは解析しない
+        digests = [known[path][2] if path in known else None for path in candidates]
+        if len(candidates) > PARALLEL_THRESHOLD and (workers is None or workers > 1):
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(parse_note_file, candidates, digests, chunksize=32))
+        else:
+            results = [parse_note_file(path, digest) for path, digest in zip(candidates, digests)]
+
+        project_ids = self._project_ids()
+        parsed = 0
+        with self.conn:
+            for path, mtime, size, digest, rows in results:
+                if rows is None:
+                    # 内容は同じ（touchされただけ）
+                    self.conn.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?", (mtime, size, path))
+                    continue
+                self.conn.execute("DELETE FROM tasks WHERE path = ?", (path,))
+                self.conn.executemany(
+                    "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._with_project_ids(rows, project_ids)
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                    (path, note_date_from_path(path), mtime, size, digest)
+                )
+                parsed += 1
+
+            removed = [path for path in known if path not in seen]
+            for path in removed:
+                self.conn.execute("DELETE FROM tasks WHERE path = ?", (path,))
+                self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+        return parsed, len(removed)
+
+    def update_note(self, path, text):
+        """書き込んだ直後のノートを索引に反映"""
+        stat = os.stat(path)
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        rows = self._with_project_ids(parse_task_rows(path, text), self._project_ids())
+        with self.conn:
+            self.conn.execute("DELETE FROM tasks WHERE path = ?", (path,))
+            self.conn.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (path, note_date_from_path(path), stat.st_mtime, stat.st_size, digest)
+            )
+
+    def open_tasks(self, since=None, until=None, project=None, project_id=None):
+        """未完了タスク（日付範囲・プロジェクトの表示名・プロジェクトIDで絞り込み）"""
+        query = "SELECT note_date, path, line_no, title, project, project_id FROM tasks WHERE status = 'open'"
+        params = []
+        if since:
+            query += " AND note_date >= ?"
+            params.append(since)
+        if until:
+            query += " AND note_date <= ?"
+            params.append(until)
+        if project:
+            query += " AND project = ?"
+            params.append(project)
+        if project_id:
+            query += " AND project_id = ?"
+            params.append(str(project_id))
+        query += " ORDER BY note_date, line_no"
+        return [
+            dict(zip(('note_date', 'path', 'line_no', 'title', 'project', 'project_id'), row))
+            for row in self.conn.execute(query, params)
+        ]
+
+    def carry_over_candidates(self, date=None, days=7):
+        """date より前の days 日間で未完了のまま、以降に完了していないタスク"""
+        if date is None:
+            date = datetime.now()
+        until = (date - timedelta(days=1)).strftime("%Y-%m-%d")
+        since = (date - timedelta(days=days)).strftime("%Y-%m-%d")
+
+        rows = self.conn.execute(
+            """
+            SELECT t.title, MAX(t.note_date), COUNT(*), t.project, t.project_id
+            FROM tasks t
+            WHERE t.status = 'open' AND t.note_date BETWEEN ? AND ?
+              AND NOT EXISTS (
+                SELECT 1 FROM tasks d
+                WHERE d.title = t.title AND d.status = 'done' AND d.note_date >= t.note_date
+              )
+            GROUP BY t.title
+            ORDER BY MAX(t.note_date) DESC, t.title
+            """,
+            (since, until)
+        )
+        return [
+            dict(zip(('title', 'last_seen', 'days_open', 'project', 'project_id'), row))
+            for row in rows
+        ]
+
+    def stats(self):
+        """索引の件数"""
+        files = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        tasks = self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        open_count = self.conn.execute("SELECT COUNT(*) FROM tasks WHERE status = 'open'").fetchone()[0]
+        return {'files': files, 'tasks': tasks, 'open': open_count}
+
+
+def main():
+    """索引を更新して持ち越し候補を表示"""
+    index = TaskIndex()
+    started = datetime.now()
+    parsed, removed = index.refresh()
+    elapsed = (datetime.now() - started).total_seconds()
+    stats = index.stats()
+    print(f"📚 タスク索引: {stats['files']}ノート, {stats['tasks']}タスク (未完了{stats['open']})")
+    print(f"   - 更新 {parsed}件, 削除 {removed}件 ({elapsed:.2f}秒)")
+
+    if "--carry-over" in sys.argv[1:]:
+        for task in index.carry_over_candidates():
+            print(f"   ↪ {task['title']} ({task['last_seen']}, {task['days_open']}日)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
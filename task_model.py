@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Compact task model
+ノートのタスク行とTodoistのタスクを1つの __slots__ クラスで表し、行との変換を1か所にまとめる
+"""
+
+import re
+import sys
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo
+from config import Config
+from note_parser import TASK_PATTERN
+
+PROJECT_PATTERN = re.compile(r'\s*\[プロジェクト: ([^\]]+)\]')
+COMPLETED_PATTERN = re.compile(r'\s*✅(?: (\d{1,2}):(\d{2}))?')
+DUE_PATTERN = re.compile(r'\s*\(期限: (\d{4}-\d{2}-\d{2})\)')
+SUFFIX_PATTERN = re.compile(r'\s*🔥')
+# タスク行末尾の非表示マーカー（Obsidianのコメント記法）: %%td:<TodoistのタスクID>%%
+MARKER_PATTERN = re.compile(r'\s*%%td:([\w-]+)%%')
+
+
+def _intern(value):
+    """プロジェクトIDなど繰り返し現れる文字列を共有する"""
+    return None if value is None else sys.intern(str(value))
+
+
+def local_time(value, tz=None):
+    """TodoistのUTC時刻（ISO 8601）をローカル時刻（Config.TIMEZONE）のdatetimeにする"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(tz or ZoneInfo(Config.TIMEZONE))
+
+
+def _parse_date(value):
+    """YYYY-MM-DD（日時なら日付部分）を date にする（解析できなければNone）"""
+    try:
+        return date.fromisoformat(value[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def task_marker(todoist_id):
+    """タスク行末尾に付ける非表示マーカー（Obsidianのプレビューでは表示されない）"""
+    return f" %%td:{todoist_id}%%"
+
+
+def split_marker(content):
+    """タスク本文から (マーカーを除いた本文, TodoistのタスクID) を取り出す"""
+    match = MARKER_PATTERN.search(content)
+    if not match:
+        return content, None
+    return (content[:match.start()] + content[match.end():]).rstrip(), match.group(1)
+
+
+class Task:
+    """1件のタスク（ノートの行・Todoistのタスク共通）
+
+    行の付加情報（期限・完了時刻・プロジェクト・マーカー）は解析済みの値で持ち、
+    to_line で決まった順序の行に戻す。
+
+        - [x] タイトル 🔥|(期限: YYYY-MM-DD) ✅ HH:MM [プロジェクト: 名前] %%td:ID%%
+    """
+
+    __slots__ = (
+        'title', 'checked', 'todoist_id', 'project', 'project_id', 'due', 'flagged', 'completed', 'completed_at'
+    )
+
+    def __init__(self, title, checked=False, todoist_id=None, project=None, project_id=None,
+                 due=None, flagged=False, completed=False, completed_at=None):
+        self.title = title
+        self.checked = checked
+        self.todoist_id = None if todoist_id is None else str(todoist_id)
+        self.project = _intern(project)  # 表示名（プロジェクト / セクション）
+        self.project_id = _intern(project_id)
+        self.due = due  # date
+        self.flagged = flagged  # 🔥（今日が期限）
+        self.completed = completed or completed_at is not None  # ✅
+        self.completed_at = completed_at  # ローカル時刻のdatetime（✅だけならNone）
+
+    @classmethod
+    def from_content(cls, content, checked=False, note_date=None):
+        """チェックボックスより後ろの本文を解析
+
+        行には完了時刻（HH:MM）しかないので、日付は note_date（省略時は今日）を使う
+        """
+        todoist_id = None
+        match = MARKER_PATTERN.search(content)
+        if match:
+            todoist_id = match.group(1)
+            content = MARKER_PATTERN.sub('', content)
+
+        project = None
+        match = PROJECT_PATTERN.search(content)
+        if match:
+            project = match.group(1)
+            content = content[:match.start()] + content[match.end():]
+
+        completed = False
+        completed_at = None
+        match = COMPLETED_PATTERN.search(content)
+        if match:
+            completed = True
+            try:
+                completed_at = datetime.combine(
+                    note_date or date.today(), time(int(match.group(1)), int(match.group(2))),
+                    tzinfo=ZoneInfo(Config.TIMEZONE)
+                )
+            except (TypeError, ValueError):
+                pass  # ✅だけ（または時刻として読めない）
+            content = content[:match.start()] + content[match.end():]
+
+        due = None
+        match = DUE_PATTERN.search(content)
+        if match:
+            due = _parse_date(match.group(1))
+            if due is not None:
+                content = content[:match.start()] + content[match.end():]
+
+        flagged = False
+        if '🔥' in content:
+            flagged = True
+            content = SUFFIX_PATTERN.sub('', content)
+
+        return cls(content.strip(), checked, todoist_id, project, None, due, flagged, completed, completed_at)
+
+    @classmethod
+    def from_line(cls, line, note_date=None):
+        """タスク行を解析（タスク行でなければNone）"""
+        match = TASK_PATTERN.match(line)
+        if not match:
+            return None
+        return cls.from_content(match.group(2), match.group(1) != ' ', note_date)
+
+    @classmethod
+    def from_todoist(cls, item, project=None, completed=None):
+        """TodoistのタスクのJSON（REST・Sync API・完了履歴）から作成
+
+        completed 省略時は completed_at の有無で完了履歴かどうかを判定する。
+        完了時刻はここで一度だけローカル時刻（Config.TIMEZONE）に変換する。
+        """
+        if completed is None:
+            completed = 'completed_at' in item
+        if not completed:
+            due = item.get('due')
+            return cls(
+                item.get('content', ''),
+                checked=bool(item.get('checked') or item.get('is_completed')),
+                todoist_id=item.get('id'),
+                project=project,
+                project_id=item.get('project_id'),
+                due=_parse_date(due['date']) if due else None,
+            )
+
+        # 完了履歴の id は履歴自体のID。タスクのIDは task_id
+        completed_at = None
+        if item.get('completed_at'):
+            try:
+                completed_at = local_time(item['completed_at'])
+            except ValueError:
+                pass
+        return cls(
+            item.get('content', ''),
+            checked=True,
+            todoist_id=item.get('task_id'),
+            project=project,
+            project_id=item.get('project_id'),
+            completed=bool(item.get('completed_at')),
+            completed_at=completed_at,
+        )
+
+    def to_line(self, today=None):
+        """ノートのタスク行（today（date）と同じ期限は 🔥 で表す）"""
+        line = f"- [{'x' if self.checked else ' '}] {self.title}"
+        if self.due and self.due != today:
+            line += f" (期限: {self.due.isoformat()})"
+        elif self.due or self.flagged:
+            line += " 🔥"
+        if self.completed:
+            line += f" ✅ {self.completed_at:%H:%M}" if self.completed_at else " ✅"
+        if self.project:
+            line += f" [プロジェクト: {self.project}]"
+        if self.todoist_id:
+            line += task_marker(self.todoist_id)
+        return line
+
+    def __repr__(self):
+        return f"Task({self.title!r}, checked={self.checked}, id={self.todoist_id})"
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Multi-tenant sync runner
+テナント（Vault・アカウント）ごとのプロファイルを読み込み、プロセスプールで並列に同期する
+
+プロファイルは TENANTS_DIR/<名前>.json:
+
+    {
+      "mode": "cloud",                       # cloud / local / bidi
+      "env": {                               # "$VAR" は実行環境の環境変数から読む
+        "TODOIST_API_TOKEN": "$ALICE_TODOIST_TOKEN",
+        "GITHUB_TOKEN": "$ALICE_GITHUB_TOKEN",
+        "GITHUB_REPOSITORY": "alice/obsidian-notes"
+      },
+      "config": {"DAILY_NOTES_PATH": "/vaults/alice/02.Index", "TIMEZONE": "Europe/Berlin"}
+    }
+
+    python tenants.py [名前 ...] [--workers N]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from config import Config
+
+SYNC_MODES = ('cloud', 'local', 'bidi')
+
+# テナントを切り替えるたびに戻す既定値（ワーカーは複数のテナントを順に処理する）
+_CONFIG_DEFAULTS = {name: value for name, value in vars(Config).items() if name.isupper()}
+_ENV_DEFAULTS = dict(os.environ)
+
+
+class TenantProfile:
+    """1テナント分の設定（環境変数・Configの上書き・状態の保存先）"""
+
+    def __init__(self, name, mode='cloud', env=None, config=None, state_dir=None):
+        if mode not in SYNC_MODES:
+            raise ValueError(f"{name}: 不明な同期モード {mode!r}")
+        unknown = [key for key in (config or {}) if key not in _CONFIG_DEFAULTS]
+        if unknown:
+            raise ValueError(f"{name}: 不明な設定 {', '.join(unknown)}")
+        self.name = name
+        self.mode = mode
+        self.env = env or {}
+        self.config = config or {}
+        self.state_dir = state_dir or os.path.join(_CONFIG_DEFAULTS['STATE_DIR'], 'tenants', name)
+
+    @classmethod
+    def load(cls, path):
+        """プロファイルのJSONを読み込む（名前はファイル名）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        name = data.get('name') or os.path.splitext(os.path.basename(path))[0]
+        return cls(name, data.get('mode', 'cloud'), data.get('env'), data.get('config'), data.get('state_dir'))
+
+    def resolved_env(self):
+        """"$VAR" の値を実行環境の環境変数で置き換える"""
+        env = {}
+        for key, value in self.env.items():
+            value = str(value)
+            if value.startswith('$'):
+                if value[1:] not in _ENV_DEFAULTS:
+                    raise ValueError(f"{self.name}: 環境変数 {value[1:]} が設定されていません")
+                value = _ENV_DEFAULTS[value[1:]]
+            env[key] = value
+        return env
+
+    def apply(self):
+        """このプロセスの環境変数とConfigをテナント用に切り替える"""
+        restore_defaults()
+        env = self.resolved_env()
+        os.environ.update(env)
+
+        # Configが環境変数から読む値（トークン・リポジトリ・接続先）も合わせる
+        for key, value in env.items():
+            if key in _CONFIG_DEFAULTS:
+                setattr(Config, key, value)
+        if 'GITHUB_REPOSITORY' in env and 'GITHUB_GIT_URL' not in env:
+            Config.GITHUB_GIT_URL = f"https://github.com/{env['GITHUB_REPOSITORY']}.git"
+
+        # 状態・同期データはテナントごとのディレクトリに分ける
+        Config.set_state_dir(self.state_dir)
+        Config.SYNC_DATA_FILE = os.path.join(self.state_dir, 'sync_data.json')
+        for key, value in self.config.items():
+            setattr(Config, key, value)
+        os.makedirs(Config.STATE_DIR, exist_ok=True)
+
+
+def restore_defaults():
+    """環境変数とConfigを起動時の状態に戻す"""
+    for name, value in _CONFIG_DEFAULTS.items():
+        setattr(Config, name, value)
+    os.environ.clear()
+    os.environ.update(_ENV_DEFAULTS)
+
+
+def load_profiles(directory=None, names=None):
+    """ディレクトリ内のプロファイル（names 指定時はその名前だけ）"""
+    directory = directory or Config.TENANTS_DIR
+    profiles = []
+    for entry in sorted(os.listdir(directory)):
+        if entry.endswith('.json'):
+            profile = TenantProfile.load(os.path.join(directory, entry))
+            if not names or profile.name in names:
+                profiles.append(profile)
+    return profiles
+
+
+# --- ワーカープロセス ---
+
+_shared_budgets = None
+_shared_concurrency = None
+
+
+def _init_worker(budgets, concurrency):
+    """ワーカー起動時: 全テナントで共有する予算と同時接続数の上限を受け取る"""
+    global _shared_budgets, _shared_concurrency
+    _shared_budgets = budgets
+    _shared_concurrency = concurrency
+
+
+def _run_mode(profile):
+    if profile.mode == 'cloud':
+        from cloud_sync import CloudSync
+
+        return CloudSync().run_sync()
+    if profile.mode == 'local':
+        from local_sync import LocalSync
+
+        return LocalSync().run_sync()
+
+    from sync_daemon import load_bidirectional_sync
+
+    module = load_bidirectional_sync()
+    module.DAILY_NOTES_PATH = Config.DAILY_NOTES_PATH
+    module.SYNC_DATA_FILE = Config.SYNC_DATA_FILE
+    return module.SyncManager().full_sync()['todoist_success']
+
+
+def run_tenant(profile):
+    """1テナントを同期して結果を返す（ワーカーで実行、ログはテナントの状態ディレクトリへ）"""
+    from http_client import HttpClient, set_client
+    from note_writer import get_writer
+
+    result = {'tenant': profile.name, 'mode': profile.mode, 'pid': os.getpid(), 'success': False}
+    started = time.perf_counter()
+    cwd = os.getcwd()
+    output = io.StringIO()
+    client = None
+    try:
+        profile.apply()
+        # HTTPの統計・キャッシュはテナントごと、予算と同時接続数は全体で共有
+        client = set_client(HttpClient(budgets=_shared_budgets, concurrency=_shared_concurrency))
+        get_writer().discard()
+        os.chdir(Config.STATE_DIR)
+        with redirect_stdout(output):
+            result['success'] = bool(_run_mode(profile))
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        os.chdir(cwd)
+
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    if client is not None:
+        result['http'] = {key: client.stats[key] for key in ('requests', 'retries', 'throttled_seconds')}
+    try:
+        with open(os.path.join(profile.state_dir, 'sync.log'), 'a', encoding='utf-8') as f:
+            f.write(f"=== {datetime.now():%Y-%m-%d %H:%M:%S} ({profile.mode}) ===\n{output.getvalue()}\n")
+    except OSError:
+        pass
+    restore_defaults()
+    return result
+
+
+# --- 親プロセス ---
+
+class TenantRunner:
+    """テナントをプロセスプールに振り分けて同期し、テナントごとの結果をまとめる
+
+    ワーカーはテナントを1件ずつ処理し、処理の前後でConfig・環境変数・HTTPクライアントを
+    切り替える。APIの予算（HTTP_RATE_LIMITS）とホストごとの同時接続数
+    （TENANT_HOST_CONCURRENCY）は共有メモリ上で全ワーカーが共有する。
+    """
+
+    def __init__(self, profiles, workers=None, rate_limits=None, host_concurrency=None):
+        self.profiles = profiles
+        self.workers = workers or Config.TENANT_WORKERS or os.cpu_count() or 1
+        self.rate_limits = rate_limits or Config.HTTP_RATE_LIMITS
+        self.host_concurrency = host_concurrency or Config.TENANT_HOST_CONCURRENCY
+
+    def run(self):
+        """全テナントを同期し、{テナント名: 結果} を返す"""
+        import multiprocessing
+        from http_client import SharedTokenBucket
+
+        if not self.profiles:
+            return {}
+        context = multiprocessing.get_context()
+        budgets = {
+            host: SharedTokenBucket(capacity, period, context)
+            for host, (capacity, period) in self.rate_limits.items()
+        }
+        concurrency = {host: context.BoundedSemaphore(limit) for host, limit in self.host_concurrency.items()}
+
+        results = {}
+        workers = min(self.workers, len(self.profiles))
+        print(f"👥 {len(self.profiles)}テナントを{workers}プロセスで同期...")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(budgets, concurrency)
+        ) as pool:
+            futures = {pool.submit(run_tenant, profile): profile for profile in self.profiles}
+            for future in as_completed(futures):
+                profile = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'tenant': profile.name, 'mode': profile.mode, 'success': False, 'error': str(e)}
+                results[profile.name] = result
+                icon = "✅" if result['success'] else "❌"
+                detail = result.get('error') or f"{result.get('duration_ms', 0):.0f}ms"
+                print(f"{icon} {profile.name} ({profile.mode}): {detail}")
+        return results
+
+    @staticmethod
+    def summary(results):
+        """テナント全体の集計"""
+        succeeded = [result for result in results.values() if result['success']]
+        return {
+            'tenants': len(results),
+            'succeeded': len(succeeded),
+            'failed': len(results) - len(succeeded),
+            'requests': sum(result.get('http', {}).get('requests', 0) for result in results.values()),
+            'throttled_seconds': round(
+                sum(result.get('http', {}).get('throttled_seconds', 0) for result in results.values()), 3
+            ),
+        }
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="テナントごとのプロファイルで同期を並列実行")
+    parser.add_argument("names", nargs="*", help="同期するテナント（省略時は全員）")
+    parser.add_argument("--dir", help=f"プロファイルのディレクトリ（既定: {Config.TENANTS_DIR}）")
+    parser.add_argument("--workers", type=int, help="ワーカープロセス数（既定: CPU数）")
+    args = parser.parse_args()
+
+    try:
+        profiles = load_profiles(args.dir, set(args.names))
+    except Exception as e:
+        print(f"❌ プロファイル読み込みエラー: {e}")
+        sys.exit(1)
+    if not profiles:
+        print("⚠️ 同期するテナントがありません")
+        return
+
+    results = TenantRunner(profiles, workers=args.workers).run()
+    summary = TenantRunner.summary(results)
+    print(f"📊 {summary['succeeded']}/{summary['tenants']}テナント成功, HTTP {summary['requests']}リクエスト")
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
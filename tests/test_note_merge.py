@@ -0,0 +1,65 @@
+"""note_merge の3方向マージ（差分のまとめ方・同じタスクIDの扱い・重複行）"""
+
+from note_merge import merge_lines, merge_task_section
+
+
+def test_unchanged_side_takes_the_other():
+    base = ['- [ ] A', '- [ ] B']
+    ours = ['- [x] A', '- [ ] B']
+    assert merge_lines(base, ours, base) == (ours, [])
+    assert merge_lines(base, base, ours) == (ours, [])
+
+
+def test_non_overlapping_changes_are_both_applied():
+    base = ['- [ ] x', '- [ ] y', '- [ ] z']
+    ours = ['- [x] x', '- [ ] y', '- [ ] z']
+    theirs = ['- [ ] x', '- [ ] y', '- [x] z']
+    assert merge_lines(base, ours, theirs) == (['- [x] x', '- [ ] y', '- [x] z'], [])
+
+
+def test_same_task_id_changed_on_both_sides_keeps_vault_line_without_conflict():
+    base = ['- [ ] A %%td:1%%']
+    ours = ['- [ ] A 編集 %%td:1%%']
+    theirs = ['- [x] A %%td:1%%']
+    assert merge_lines(base, ours, theirs) == (ours, [])
+
+
+def test_same_title_without_id_changed_on_both_sides_is_a_conflict():
+    base = ['- [ ] A']
+    ours = ['- [ ] A [プロジェクト: 仕事]']
+    theirs = ['- [x] A']
+    merged, conflicts = merge_lines(base, ours, theirs)
+    assert merged == ours
+    assert conflicts == [{'ours': '- [ ] A [プロジェクト: 仕事]', 'theirs': '- [x] A'}]
+
+
+def test_marked_line_replaces_unmarked_line_with_same_title():
+    merged, conflicts = merge_lines(['- [ ] T'], ['- [x] T'], ['- [ ] T 🔥 %%td:3%%'])
+    assert merged == ['- [ ] T 🔥 %%td:3%%']
+    assert conflicts == []
+
+
+def test_same_title_with_different_ids_are_different_tasks():
+    merged, conflicts = merge_lines(['- [ ] A %%td:1%%'], ['- [ ] 同じ %%td:1%%'], ['- [ ] 同じ %%td:2%%'])
+    assert merged == ['- [ ] 同じ %%td:1%%', '- [ ] 同じ %%td:2%%']
+    assert conflicts == []
+
+
+def test_written_back_id_is_not_duplicated_when_todoist_renders_it_elsewhere():
+    # Obsidianで作成した行にIDを書き戻した後、Todoist側では別の位置に並ぶ
+    base = ['- [ ] A %%td:1%%', '- [ ] mid', '- [ ] B %%td:2%%']
+    ours = ['- [ ] 新規 %%td:5%%', '- [ ] A %%td:1%%', '- [ ] mid', '- [ ] B %%td:2%%']
+    theirs = ['- [ ] A %%td:1%%', '- [ ] mid', '- [ ] B %%td:2%%', '- [ ] 新規 %%td:5%%']
+    merged, conflicts = merge_lines(base, ours, theirs)
+    assert merged == ours
+    assert conflicts == []
+
+
+def test_first_merge_without_base_only_adds_missing_lines():
+    text = "# d\n\n## 今日のタスク\n- [ ] 自分\n"
+    new_text, merged, conflicts = merge_task_section(
+        text, ['- [ ] 自分', '- [ ] 新しい %%td:9%%'], None, header='## 今日のタスク'
+    )
+    assert merged == ['- [ ] 自分', '- [ ] 新しい %%td:9%%']
+    assert new_text == "# d\n\n## 今日のタスク\n- [ ] 自分\n- [ ] 新しい %%td:9%%\n"
+    assert conflicts == []
@@ -0,0 +1,187 @@
+"""Outbox の再送（破棄するコマンドと次回に残すコマンドの区別・ジャーナルの復元）"""
+
+import json
+
+import pytest
+
+import http_client
+from outbox import Outbox, TODOIST, GITHUB
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def json(self):
+        return self.payload
+
+
+class FakeSyncApi:
+    """/sync へのPOSTを記録し、コマンドのuuidごとに決めた結果を返す"""
+
+    def __init__(self, status=None, http_status=200, error=None):
+        self.status = status or (lambda command: "ok")
+        self.http_status = http_status
+        self.error = error
+        self.commands = []
+
+    def post(self, url, data=None, **kwargs):
+        if self.error:
+            raise self.error
+        commands = json.loads(data['commands'])
+        self.commands.extend(commands)
+        mapping = {command['temp_id']: f"real-{command['temp_id']}" for command in commands if command.get('temp_id')}
+        return FakeResponse(self.http_status, {
+            'sync_status': {command['uuid']: self.status(command) for command in commands},
+            'temp_id_mapping': mapping,
+        })
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return Outbox(path=str(tmp_path / "outbox.jsonl"), retry_seconds=300)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    def install(**kwargs):
+        fake = FakeSyncApi(**kwargs)
+        monkeypatch.setattr(http_client, '_shared_client', fake)
+        return fake
+    return install
+
+
+def test_sent_commands_are_removed_and_use_the_entry_id_as_uuid(outbox, api):
+    fake = api()
+    outbox.enqueue_todoist("item_close", {"id": "1"}, label="A")
+    entry_id = outbox.pending(TODOIST)[0]['id']
+
+    results = outbox.flush_todoist("token", base_url="http://todoist.test")
+
+    assert [command['uuid'] for command in fake.commands] == [entry_id]
+    assert results[entry_id]['ok']
+    assert outbox.pending(TODOIST) == []
+    assert not outbox.is_deferred(TODOIST)
+
+
+def test_rejected_command_is_dropped_but_unreachable_one_is_kept(outbox, api):
+    # Todoistが拒否した（error_code付き）コマンドは再送しても成功しないので破棄する
+    def status(command):
+        if command['args']['id'] == "gone":
+            return {"error": "Item not found", "error_code": 22}
+        return {"error": "temporary"}
+
+    api(status=status)
+    outbox.enqueue_todoist("item_close", {"id": "gone"}, label="gone")
+    outbox.enqueue_todoist("item_close", {"id": "2"}, label="retry")
+
+    outbox.flush_todoist("token", base_url="http://todoist.test")
+
+    assert [entry['label'] for entry in outbox.pending(TODOIST)] == ["retry"]
+    assert outbox.is_deferred(TODOIST)
+
+
+def test_http_error_keeps_every_command_and_defers(outbox, api):
+    api(http_status=503)
+    outbox.enqueue_todoist("item_close", {"id": "1"})
+    outbox.enqueue_todoist("item_close", {"id": "2"})
+
+    outbox.flush_todoist("token", base_url="http://todoist.test")
+
+    assert len(outbox.pending(TODOIST)) == 2
+    assert outbox.is_deferred(TODOIST)
+
+
+def test_deferred_commands_are_resent_with_the_same_uuid_when_forced(outbox, api):
+    api(error=ConnectionError("offline"))
+    outbox.enqueue_todoist("item_close", {"id": "1"})
+    entry_id = outbox.pending(TODOIST)[0]['id']
+    outbox.flush_todoist("token", base_url="http://todoist.test")
+
+    fake = api()
+    assert outbox.flush_todoist("token", base_url="http://todoist.test") == {}
+    assert fake.commands == []
+
+    outbox.flush_todoist("token", base_url="http://todoist.test", force=True)
+    assert [command['uuid'] for command in fake.commands] == [entry_id]
+    assert outbox.pending(TODOIST) == []
+    assert not outbox.is_deferred(TODOIST)
+
+
+def test_created_task_result_carries_real_id_and_meta(outbox, api):
+    api()
+    outbox.enqueue_todoist(
+        "item_add", {"content": "新規"}, key="item_add:n#0", temp_id="tmp-1", meta={"note": "2025-07-01"}
+    )
+    entry_id = outbox.pending(TODOIST)[0]['id']
+
+    result = outbox.flush_todoist("token", base_url="http://todoist.test")[entry_id]
+
+    assert result['id'] == "real-tmp-1"
+    assert result['meta'] == {"note": "2025-07-01"}
+
+
+def test_pending_updates_for_the_same_task_are_merged(outbox):
+    outbox.enqueue_todoist("item_update", {"id": "1", "content": "a"})
+    outbox.enqueue_todoist("item_update", {"id": "1", "priority": 4})
+
+    (entry,) = outbox.pending(TODOIST)
+    assert entry['payload']['args'] == {"id": "1", "content": "a", "priority": 4}
+
+
+def test_journal_restores_only_unsent_operations(outbox, api, tmp_path):
+    api(status=lambda command: "ok" if command['args']['id'] == "1" else {"error": "temporary"})
+    outbox.enqueue_todoist("item_close", {"id": "1"})
+    outbox.enqueue_todoist("item_close", {"id": "2"})
+    outbox.flush_todoist("token", base_url="http://todoist.test")
+
+    reloaded = Outbox(path=str(tmp_path / "outbox.jsonl"))
+    assert [entry['payload']['args']['id'] for entry in reloaded.pending(TODOIST)] == ["2"]
+    assert reloaded.is_deferred(TODOIST)
+
+
+class FakeCommitBuilder:
+    def __init__(self, error=None):
+        self.staged = {}
+        self.error = error
+        self.commits = []
+
+    def stage(self, path, content):
+        self.staged[path] = content
+
+    def commit(self, message):
+        if self.error:
+            raise self.error
+        self.commits.append(dict(self.staged))
+        self.staged = {}
+        return "abc1234"
+
+
+def test_github_commit_failure_stashes_files_and_defers(outbox):
+    builder = FakeCommitBuilder(error=ConnectionError("offline"))
+    builder.stage("a.md", "A1")
+
+    with pytest.raises(ConnectionError):
+        outbox.flush_github(builder, "msg")
+
+    assert builder.staged == {}
+    assert [entry['payload'] for entry in outbox.pending(GITHUB)] == [{'path': "a.md", 'content': "A1"}]
+    assert outbox.is_deferred(GITHUB)
+
+    # 保留中はコミットせずアウトボックスに移すだけ（False）
+    builder = FakeCommitBuilder()
+    builder.stage("a.md", "A2")
+    assert outbox.flush_github(builder, "msg") is False
+    assert builder.commits == []
+    assert outbox.pending(GITHUB)[0]['payload']['content'] == "A2"
+
+
+def test_github_replay_commits_pending_files_with_staged_ones(outbox):
+    outbox.enqueue_github("old.md", "old")
+    builder = FakeCommitBuilder()
+    builder.stage("new.md", "new")
+
+    assert outbox.flush_github(builder, "msg") == "abc1234"
+    assert builder.commits == [{"new.md": "new", "old.md": "old"}]
+    assert outbox.pending(GITHUB) == []
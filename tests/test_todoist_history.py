@@ -0,0 +1,130 @@
+"""完了履歴のページング（until カーソル・同一秒のoffset・取得失敗）と取得範囲"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import http_client
+from config import Config
+from todoist_history import CURSOR_FORMAT, completed_window, iter_completed_items
+
+START = datetime(2025, 7, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def json(self):
+        return self.payload
+
+
+class FakeCompletedApi:
+    """completed/get_all の since・until・limit・offset を解釈して新しい順に返す"""
+
+    def __init__(self, items, fail_on_call=None):
+        self.items = sorted(items, key=lambda item: (item['completed_at'], item['id']), reverse=True)
+        self.fail_on_call = fail_on_call
+        self.calls = []
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        self.calls.append(dict(params))
+        if self.fail_on_call == len(self.calls):
+            return FakeResponse(503)
+        since = params['since'].replace('T', ' ')
+        until = params['until'].replace('T', ' ')
+        matching = [
+            item for item in self.items
+            if since <= item['completed_at'][:19].replace('T', ' ') <= until
+        ]
+        page = matching[params['offset']:params['offset'] + params['limit']]
+        return FakeResponse(200, {'items': page})
+
+
+def completed(item_id, moment):
+    return {'id': str(item_id), 'task_id': f"t{item_id}", 'completed_at': moment.strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    def install(items, **kwargs):
+        fake = FakeCompletedApi(items, **kwargs)
+        monkeypatch.setattr(http_client, '_shared_client', fake)
+        return fake
+    return install
+
+
+def ids(items):
+    return [item['id'] for item in items]
+
+
+def collect(**kwargs):
+    return list(iter_completed_items(
+        "token", since=START - timedelta(days=1), until=START + timedelta(days=1),
+        base_url="http://todoist.test", **kwargs
+    ))
+
+
+def test_pages_through_more_items_than_one_page(api):
+    items = [completed(n, START - timedelta(minutes=n)) for n in range(7)]
+    api(items)
+
+    assert ids(collect(page_size=3)) == [str(n) for n in range(7)]
+
+
+def test_items_sharing_the_boundary_second_are_returned_once(api):
+    # ページの境界が同じ秒の完了タスクの途中に来ても重複・取りこぼしがない
+    items = [completed(n, START - timedelta(minutes=1)) for n in range(4)]
+    items += [completed(n, START - timedelta(minutes=2)) for n in range(4, 6)]
+    api(items)
+
+    result = ids(collect(page_size=3))
+    assert sorted(result) == [str(n) for n in range(6)]
+    assert len(result) == 6
+
+
+def test_more_than_a_page_in_one_second_advances_by_offset(api):
+    items = [completed(n, START) for n in range(5)]
+    fake = api(items)
+
+    result = ids(collect(page_size=2))
+    assert sorted(result) == [str(n) for n in range(5)]
+    assert len(result) == 5
+    assert any(call['offset'] > 0 for call in fake.calls)
+
+
+def test_failed_page_raises_instead_of_returning_partial_history(api):
+    items = [completed(n, START - timedelta(minutes=n)) for n in range(5)]
+    api(items, fail_on_call=2)
+
+    received = []
+    with pytest.raises(RuntimeError):
+        for item in iter_completed_items(
+            "token", since=START - timedelta(days=1), until=START + timedelta(days=1),
+            page_size=2, base_url="http://todoist.test"
+        ):
+            received.append(item['id'])
+    assert received == ["0", "1"]
+
+
+def test_range_is_sent_in_utc_for_aware_and_naive_bounds(api):
+    fake = api([])
+    tokyo = timezone(timedelta(hours=9))
+    list(iter_completed_items(
+        "token", since=datetime(2025, 7, 1, 9, 0, tzinfo=tokyo), until=datetime(2025, 7, 2, 0, 0),
+        base_url="http://todoist.test"
+    ))
+
+    assert fake.calls[0]['since'] == "2025-07-01T00:00:00"
+    # until は境界の秒を含めるため1秒先まで
+    assert fake.calls[0]['until'] == "2025-07-02T00:00:01"
+
+
+def test_completed_window_uses_local_day_boundaries(monkeypatch):
+    monkeypatch.setattr(Config, 'TIMEZONE', 'Asia/Tokyo')
+    since, until = completed_window(days=2, end=datetime(2025, 7, 2, 8, 0))
+
+    assert since == datetime(2025, 6, 30, 15, 0, tzinfo=timezone.utc)
+    assert until == datetime(2025, 7, 2, 14, 59, 59, tzinfo=timezone.utc)
+    assert since.strftime(CURSOR_FORMAT) == "2025-06-30T15:00:00"
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Todoist Sync API command batching
+Todoistへの書き込み（item_close / item_update / item_add）をまとめて送信
+"""
+
+import json
+import uuid
+from config import Config
+from http_client import get_client
+
+
+class TodoistCommandBatch:
+    """Sync APIコマンドを溜めてバッチ送信し、コマンドごとの結果を返す"""
+
+    MAX_COMMANDS = 100  # 1リクエストあたりのコマンド上限
+
+    def __init__(self, api_token, base_url=None, max_retries=2):
+        self.api_token = api_token
+        self.base_url = base_url or Config.TODOIST_SYNC_API_URL
+        self.max_retries = max_retries
+        self.headers = {
+            "Authorization": f"Bearer {self.api_token}"
+        }
+        self.pending = []
+        self.results = {}
+        self.temp_id_mapping = {}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, command_type, args, temp_id=None, key=None, command_uuid=None):
+        """コマンドを追加してuuidを返す（keyは呼び出し側の識別子）"""
+        command = {
+            "type": command_type,
+            "uuid": command_uuid or str(uuid.uuid4()),
+            "args": args,
+        }
+        if temp_id:
+            command["temp_id"] = temp_id
+        self.pending.append({'command': command, 'key': key})
+        return command["uuid"]
+
+    def close_item(self, task_id, key=None):
+        """タスク完了コマンドを追加"""
+        return self.add("item_close", {"id": str(task_id)}, key=key)
+
+    def update_item(self, task_id, key=None, **fields):
+        """タスク更新コマンドを追加"""
+        args = {"id": str(task_id)}
+        args.update(fields)
+        return self.add("item_update", args, key=key)
+
+    def add_item(self, content, temp_id=None, key=None, command_uuid=None, **fields):
+        """タスク作成コマンドを追加（temp_idは結果の実IDと対応付けられる）"""
+        args = {"content": content}
+        args.update(fields)
+        return self.add(
+            "item_add",
+            args,
+            temp_id=temp_id or str(uuid.uuid4()),
+            key=key,
+            command_uuid=command_uuid
+        )
+
+    def _send(self, entries):
+        """コマンド群を1リクエストで送信し、uuidごとのステータスを返す"""
+        commands = [entry['command'] for entry in entries]
+        try:
+            # コマンドごとのuuidでTodoist側が重複を除くので、タイムアウトでも再送してよい
+            response = get_client().post(
+                f"{self.base_url}/sync",
+                headers=self.headers,
+                data={"commands": json.dumps(commands, ensure_ascii=False)},
+                idempotent=True
+            )
+        except Exception as e:
+            return {command["uuid"]: {"error": str(e)} for command in commands}
+
+        if response.status_code != 200:
+            error = {"error": f"HTTP {response.status_code}"}
+            return {command["uuid"]: error for command in commands}
+
+        payload = response.json()
+        self.temp_id_mapping.update(payload.get('temp_id_mapping', {}))
+        sync_status = payload.get('sync_status', {})
+        return {
+            command["uuid"]: sync_status.get(command["uuid"], {"error": "no status"})
+            for command in commands
+        }
+
+    def _record(self, entry, status):
+        command = entry['command']
+        result = {
+            'type': command['type'],
+            'args': command['args'],
+            'key': entry['key'],
+            'ok': status == "ok",
+            'error': None if status == "ok" else status,
+        }
+        if command.get('temp_id'):
+            result['temp_id'] = command['temp_id']
+            result['id'] = self.temp_id_mapping.get(command['temp_id'])
+        self.results[command['uuid']] = result
+        return result['ok']
+
+    def flush(self):
+        """溜めたコマンドを上限ごとに分割して送信（失敗分は個別に再送）"""
+        entries, self.pending = self.pending, []
+        if not entries:
+            return {}
+
+        failed = []
+        for start in range(0, len(entries), self.MAX_COMMANDS):
+            chunk = entries[start:start + self.MAX_COMMANDS]
+            statuses = self._send(chunk)
+            for entry in chunk:
+                if not self._record(entry, statuses[entry['command']['uuid']]):
+                    failed.append(entry)
+
+        # 成功済みのコマンドは送り直さず、失敗したものだけ1件ずつ再送
+        for attempt in range(self.max_retries):
+            if not failed:
+                break
+            print(f"🔁 失敗した{len(failed)}件のコマンドを個別に再送 ({attempt + 1}/{self.max_retries})")
+            still_failed = []
+            for entry in failed:
+                statuses = self._send([entry])
+                if not self._record(entry, statuses[entry['command']['uuid']]):
+                    still_failed.append(entry)
+            failed = still_failed
+
+        batch_results = {entry['command']['uuid']: self.results[entry['command']['uuid']] for entry in entries}
+        ok_count = sum(1 for result in batch_results.values() if result['ok'])
+        print(f"📦 Todoistコマンド送信: {ok_count}/{len(entries)}件成功")
+        return batch_results
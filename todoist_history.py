@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Completed-task history pager
+完了タスク履歴（completed/get_all）を上限なしで順次取得するジェネレーター
+"""
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from config import Config
+from http_client import get_client
+
+CURSOR_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def completed_window(days=None, end=None):
+    """直近days日分（今日を含む、日付の区切りはConfig.TIMEZONE）の取得範囲 (since, until) をUTCで返す"""
+    if days is None:
+        days = Config.HISTORY_DAYS
+    tz = ZoneInfo(Config.TIMEZONE)
+    if end is None:
+        end = datetime.now(tz)
+    elif end.tzinfo is None:
+        end = end.replace(tzinfo=tz)
+    else:
+        end = end.astimezone(tz)
+
+    start = (end - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    until = end.replace(hour=23, minute=59, second=59, microsecond=0)
+    return start.astimezone(timezone.utc), until.astimezone(timezone.utc)
+
+
+def _as_utc(value):
+    """aware な datetime をUTCに揃える（naive はUTCとみなす）"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _parse_completed_at(value):
+    """completed_at（ISO形式, Z付き）をUTCの datetime に変換"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return _as_utc(parsed).replace(microsecond=0)
+
+
+def iter_completed_items(api_token, since=None, until=None, page_size=200, base_url=None):
+    """完了タスクを新しい順に1件ずつ返す
+
+    until カーソルを直前ページの最古の完了時刻まで進めながらページを辿るので、
+    保持するのは境界時刻のIDだけでメモリ使用量は件数に依存しない。
+    since・until はUTC（naive ならUTCとみなす）。途中のページが取得できなければ
+    RuntimeError を送出する（途中までの履歴を完全な履歴と取り違えないため）。
+    """
+    if since is None or until is None:
+        default_since, default_until = completed_window()
+        since = since or default_since
+        until = until or default_until
+    since, until = _as_utc(since), _as_utc(until)
+
+    url = f"{base_url or Config.TODOIST_SYNC_API_URL}/completed/get_all"
+    headers = {"Authorization": f"Bearer {api_token}"}
+
+    cursor = until
+    boundary_ids = set()
+    offset = 0
+
+    while True:
+        response = get_client().get(
+            url,
+            headers=headers,
+            params={
+                "since": since.strftime(CURSOR_FORMAT),
+                # 境界の秒を取りこぼさないよう1秒先まで含め、既出IDは読み飛ばす
+                "until": (cursor + timedelta(seconds=1)).strftime(CURSOR_FORMAT),
+                "limit": page_size,
+                "offset": offset,
+            }
+        )
+
+        if response.status_code != 200:
+            raise RuntimeError(f"Todoist completed API error: {response.status_code}")
+
+        items = response.json().get('items', [])
+        progressed = False
+
+        for item in items:
+            item_id = str(item.get('id') or item.get('task_id'))
+            if item_id in boundary_ids:
+                continue
+            progressed = True
+            yield item
+
+            completed_at = item.get('completed_at')
+            if not completed_at:
+                continue
+            completed_time = _parse_completed_at(completed_at)
+            if completed_time < cursor:
+                cursor = completed_time
+                boundary_ids = set()
+            boundary_ids.add(item_id)
+
+        if len(items) < page_size:
+            return
+
+        if progressed:
+            offset = 0
+        else:
+            # 同一秒に page_size 件以上が集中した場合のみ offset で進める
+            offset += page_size
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Cached Todoist metadata
+プロジェクト・セクションの名前をキャッシュし、タスク行にIDではなく名前を出す
+"""
+
+from datetime import datetime
+from config import Config
+from todoist_sync import TodoistReplica, TodoistSyncClient
+
+
+class TodoistMetadataCache(TodoistReplica):
+    """プロジェクト・セクションだけのレプリカ（有効期間付き）"""
+
+    RESOURCE_TYPES = ['projects', 'sections']
+
+    def __init__(self, path=None, ttl=None):
+        super().__init__(path or Config.TODOIST_METADATA_FILE)
+        self.ttl = Config.TODOIST_METADATA_TTL if ttl is None else ttl
+
+    def is_fresh(self, now=None):
+        """有効期間内か（期間内は差分同期のリクエストも送らない）"""
+        if self.is_empty or not self.last_sync:
+            return False
+        if now is None:
+            now = datetime.now()
+        try:
+            age = (now - datetime.fromisoformat(self.last_sync)).total_seconds()
+        except ValueError:
+            return False
+        return 0 <= age < self.ttl
+
+
+class TodoistMetadata:
+    """プロジェクト・セクションの名前解決
+
+    差分同期クライアントがあればそのレプリカ（タスクと同じリクエストで更新済み）を使い、
+    なければ専用のキャッシュを有効期間ごとに差分同期する。
+    """
+
+    def __init__(self, api_token, sync_client=None, cache=None, base_url=None):
+        self.api_token = api_token
+        self.sync_client = sync_client
+        self.cache = cache
+        self.base_url = base_url
+        self.projects = {}
+        self.sections = {}
+
+    def refresh(self):
+        """名前の対応を読み込む（必要なときだけAPIを呼ぶ）"""
+        if self.sync_client and not self.sync_client.replica.is_empty:
+            resources = self.sync_client.replica.resources
+        else:
+            if self.cache is None:
+                self.cache = TodoistMetadataCache()
+            if not self.cache.is_fresh():
+                TodoistSyncClient(self.api_token, replica=self.cache, base_url=self.base_url).sync()
+            resources = self.cache.resources
+
+        self.projects = resources.get('projects', {})
+        self.sections = resources.get('sections', {})
+        return self
+
+    def project_name(self, project_id):
+        """プロジェクト名（不明ならID）"""
+        project = self.projects.get(str(project_id))
+        return project['name'] if project else str(project_id)
+
+    def section_name(self, section_id):
+        """セクション名（不明ならNone）"""
+        section = self.sections.get(str(section_id)) if section_id else None
+        return section['name'] if section else None
+
+    def project_label(self, task):
+        """タスク行に付ける「プロジェクト / セクション」"""
+        name = self.project_name(task['project_id'])
+        section = self.section_name(task.get('section_id'))
+        return f"{name} / {section}" if section else name
+
+    def sort_key(self, task):
+        """プロジェクト・セクションの並び順でまとめるためのキー（受信箱が先頭）"""
+        project = self.projects.get(str(task.get('project_id')), {})
+        section = self.sections.get(str(task.get('section_id')), {})
+        return (
+            not project.get('inbox_project', False),
+            project.get('child_order', 0) if project else float('inf'),
+            section.get('section_order', 0),
+            task.get('child_order', task.get('order', 0)),
+        )
+
+    def group(self, tasks):
+        """タスクをプロジェクト・セクション順に並べ替える（同じ順位なら元の順序）"""
+        return sorted(tasks, key=self.sort_key)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Incremental Todoist Sync API client
+sync_token を使った Todoist の差分同期とローカルレプリカ
+"""
+
+import os
+import json
+from datetime import datetime
+from config import Config
+from http_client import get_client
+
+
+class TodoistReplica:
+    """Sync APIのローカルレプリカ（items/projects/sections）"""
+
+    RESOURCE_TYPES = ['items', 'projects', 'sections']
+
+    def __init__(self, path=None):
+        self.path = path or Config.TODOIST_REPLICA_FILE
+        self.sync_token = '*'
+        self.resources = {name: {} for name in self.RESOURCE_TYPES}
+        self.last_sync = None
+        self.load()
+
+    @property
+    def is_empty(self):
+        """一度も同期していないか"""
+        return self.sync_token == '*'
+
+    def load(self):
+        """レプリカをディスクから読み込み"""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # 取得するリソースの種類が変わった場合は差分では揃わないので完全同期
+            if data.get('resource_types') != self.RESOURCE_TYPES:
+                print("ℹ️ レプリカのリソース種別が変わったため完全同期します")
+                self.reset()
+                return
+            self.sync_token = data.get('sync_token', '*')
+            self.last_sync = data.get('last_sync')
+            for name in self.RESOURCE_TYPES:
+                self.resources[name] = data.get(name, {})
+        except Exception as e:
+            print(f"⚠️ レプリカ読み込みエラー（完全同期に戻します）: {e}")
+            self.reset()
+
+    def save(self):
+        """レプリカをディスクに保存（一時ファイル経由で置換）"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            'sync_token': self.sync_token,
+            'last_sync': self.last_sync,
+            'resource_types': self.RESOURCE_TYPES,
+        }
+        data.update(self.resources)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def reset(self):
+        """レプリカを空にして次回を完全同期にする"""
+        self.sync_token = '*'
+        self.last_sync = None
+        self.resources = {name: {} for name in self.RESOURCE_TYPES}
+
+    def apply(self, response):
+        """Sync APIのレスポンス（差分）を適用し、変更件数を返す"""
+        if response.get('full_sync'):
+            self.resources = {name: {} for name in self.RESOURCE_TYPES}
+
+        changed = 0
+        for name in self.RESOURCE_TYPES:
+            store = self.resources[name]
+            for obj in response.get(name, []):
+                obj_id = str(obj['id'])
+                if obj.get('is_deleted'):
+                    store.pop(obj_id, None)
+                else:
+                    store[obj_id] = obj
+                changed += 1
+
+        self.sync_token = response.get('sync_token', self.sync_token)
+        self.last_sync = datetime.now().isoformat()
+        return changed
+
+    def today_tasks(self, date=None):
+        """REST v2 の filter=today 相当の未完了タスクを返す"""
+        if date is None:
+            date = datetime.now()
+        today = date.strftime("%Y-%m-%d")
+
+        tasks = []
+        for item in self.resources['items'].values():
+            if item.get('checked') or not item.get('due'):
+                continue
+            if item['due'].get('date', '')[:10] != today:
+                continue
+            task = dict(item)
+            task['is_completed'] = False
+            tasks.append(task)
+
+        tasks.sort(key=lambda t: (t.get('child_order', 0), t['id']))
+        return tasks
+
+
+class TodoistSyncClient:
+    """sync_tokenを使って差分のみを取得するTodoistクライアント"""
+
+    def __init__(self, api_token, replica=None, base_url=None):
+        self.api_token = api_token
+        self.base_url = base_url or Config.TODOIST_SYNC_API_URL
+        self.replica = replica or TodoistReplica()
+        self.headers = {
+            "Authorization": f"Bearer {self.api_token}"
+        }
+        self.last_changed = 0  # 直近の差分同期で変わった件数（完全同期は0）
+
+    def sync(self):
+        """差分を取得してレプリカに適用（失敗時はレプリカをそのまま使う）"""
+        self.last_changed = 0
+        try:
+            response = get_client().post(
+                f"{self.base_url}/sync",
+                headers=self.headers,
+                data={
+                    "sync_token": self.replica.sync_token,
+                    "resource_types": json.dumps(self.replica.RESOURCE_TYPES)
+                },
+                idempotent=True  # 読み込みだけのリクエスト
+            )
+
+            if response.status_code != 200:
+                print(f"❌ Todoist Sync API error: {response.status_code}")
+                return False
+
+            payload = response.json()
+            changed = self.replica.apply(payload)
+            self.replica.save()
+            self.last_changed = 0 if payload.get('full_sync') else changed
+
+            mode = "完全同期" if payload.get('full_sync') else "差分同期"
+            print(f"🔄 Todoist {mode}: {changed}件の変更 ({len(response.content)} bytes)")
+            return True
+
+        except Exception as e:
+            print(f"⚠️ Todoist Sync APIに接続できません（オフラインのレプリカを使用）: {e}")
+            return False
+
+    def get_today_tasks(self, date=None):
+        """今日期限の未完了タスクを取得（レプリカが空で同期できなければNone）"""
+        synced = self.sync()
+        if not synced and self.replica.is_empty:
+            return None
+        return self.replica.today_tasks(date)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Event-driven vault watcher
+日次ノートの変更を監視し、保存が落ち着いたら変更されたノートだけを同期する
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import hashlib
+import threading
+from config import Config
+
+# 同期処理自身が書き込んだ内容（パス -> SHA-256）
+_own_writes = {}
+_own_writes_lock = threading.Lock()
+
+
+def _digest(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def record_own_write(path, content):
+    """同期処理が書き込んだ内容を記録（監視側で無視するため）"""
+    with _own_writes_lock:
+        _own_writes[os.path.abspath(path)] = _digest(content)
+
+
+def is_own_write(path):
+    """ファイルの現在の内容が、同期処理が最後に書き込んだものと同じか"""
+    with _own_writes_lock:
+        expected = _own_writes.get(os.path.abspath(path))
+    if expected is None:
+        return False
+    try:
+        with open(path, 'rb') as f:
+            return _digest(f.read()) == expected
+    except OSError:
+        return False
+
+
+class InotifyBackend:
+    """Linuxのinotifyでディレクトリツリーを監視"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    EVENT_HEADER = struct.Struct('iIII')
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+
+    def __init__(self, root):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self.watches = {}
+        self._add_tree(root)
+
+    def _add_watch(self, path):
+        import ctypes
+
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached")
+            return
+        self.watches[wd] = path
+
+    def _add_tree(self, root):
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+            self._add_watch(dirpath)
+
+    def wait(self, timeout):
+        """イベントを待ち、変更されたファイルのパスを返す"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += name_len
+
+            if mask & self.IN_Q_OVERFLOW:
+                # キューがあふれた場合はツリー全体を再登録して全ノートを候補にする
+                self._add_tree(self.root)
+                changed.update(_scan_tree(self.root).keys())
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add_tree(path)
+                    changed.update(_scan_tree(path).keys())
+                continue
+            if mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                changed.add(path)
+
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _scan_tree(root):
+    """ツリー内の .md ファイルの (mtime, size)"""
+    snapshot = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+        for name in filenames:
+            if name.endswith('.md'):
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+class PollingBackend:
+    """inotifyが使えない環境（macOSなど）向けのmtimeポーリング"""
+
+    def __init__(self, root, interval=None):
+        self.root = root
+        self.interval = interval or Config.WATCH_POLL_INTERVAL
+        self.snapshot = _scan_tree(root)
+
+    def wait(self, timeout):
+        """間隔ごとにツリーを走査して、変更されたファイルのパスを返す"""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = _scan_tree(self.root)
+        changed = {
+            path for path, signature in current.items()
+            if self.snapshot.get(path) != signature
+        }
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_backend(root):
+    """Linuxではinotify、それ以外はポーリング"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyBackend(root)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️ inotifyを使えないためポーリングで監視します: {e}")
+    return PollingBackend(root)
+
+
+class VaultWatcher:
+    """ノートの保存をデバウンスしてコールバックに渡す"""
+
+    def __init__(self, root, callback, debounce=None, backend=None):
+        self.root = root
+        self.callback = callback
+        self.debounce = Config.WATCH_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.backend = backend or create_backend(root)
+        self.pending = {}
+
+    def run(self, stop_event=None):
+        """stop_eventがセットされるかCtrl+Cまで監視を続ける"""
+        print(f"👀 Vaultを監視中: {self.root} ({type(self.backend).__name__})")
+        try:
+            while not (stop_event and stop_event.is_set()):
+                self.poll_once()
+        except KeyboardInterrupt:
+            print("👋 監視を終了します")
+        finally:
+            self.backend.close()
+
+    def poll_once(self):
+        """イベントを1回待ち、落ち着いたノートを処理する"""
+        if self.pending:
+            oldest = min(self.pending.values())
+            timeout = max(0.0, oldest + self.debounce - time.monotonic())
+        else:
+            timeout = 1.0 if isinstance(self.backend, InotifyBackend) else None
+
+        now_changed = self.backend.wait(timeout)
+        now = time.monotonic()
+        for path in now_changed:
+            if path.endswith('.md'):
+                self.pending[path] = now
+
+        ready = [path for path, seen in self.pending.items() if now - seen >= self.debounce]
+        for path in ready:
+            del self.pending[path]
+            if not os.path.exists(path) or is_own_write(path):
+                continue
+            try:
+                self.callback(path)
+            except Exception as e:
+                print(f"❌ 同期エラー ({path}): {e}")
+        return ready
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Todoist webhook receiver
+TodoistのWebhook（item:added/updated/completed）を受け取り、今日のノートの該当タスク行だけを更新する
+
+    python webhook_server.py serve [--host HOST] [--port PORT]
+    python webhook_server.py replay events.jsonl [--url URL]   # 記録したイベントに署名して送る
+
+Todoistのアプリ設定で Webhook callback URL を http(s)://<公開URL>/todoist/webhook に、
+TODOIST_CLIENT_SECRET にアプリの Client secret を設定する。
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import base64
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+from note_merge import section_lines
+from note_parser import replace_task_section
+from task_model import Task
+
+WEBHOOK_EVENTS = ('item:added', 'item:updated', 'item:completed', 'item:uncompleted')
+SIGNATURE_HEADER = 'X-Todoist-Hmac-SHA256'
+DELIVERY_HEADER = 'X-Todoist-Delivery-ID'
+
+
+def sign(body, secret):
+    """リクエスト本文のHMAC-SHA256（Base64）"""
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def verify_signature(body, signature, secret):
+    """X-Todoist-Hmac-SHA256 の署名を検証"""
+    if not signature or not secret:
+        return False
+    return hmac.compare_digest(sign(body, secret), signature)
+
+
+class DeliveryLog:
+    """反映済みの配信ID（Todoistが再送した同じイベントを除く）
+
+    直近 size 件だけを保持し、反映できた配信を記録するたびに保存する。
+    """
+
+    def __init__(self, path=None, size=None):
+        self.path = path or Config.WEBHOOK_DELIVERIES_FILE
+        self.size = size or Config.WEBHOOK_DEDUPE_SIZE
+        self.ids = OrderedDict()
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for delivery_id in json.load(f):
+                    self.ids[delivery_id] = True
+        except (OSError, ValueError):
+            pass
+
+    def seen(self, delivery_id):
+        """反映済みの配信IDならTrue"""
+        with self.lock:
+            return delivery_id in self.ids
+
+    def add(self, delivery_id):
+        """反映できた配信IDを記録"""
+        with self.lock:
+            self.ids[delivery_id] = True
+            while len(self.ids) > self.size:
+                self.ids.popitem(last=False)
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self.ids), f)
+        os.replace(tmp_path, self.path)
+
+
+def apply_task_event(lines, event_name, task, due_today):
+    """タスクセクションの行に1件のイベントを反映（変更がなければ lines をそのまま返す）
+
+    マーカーのIDで行を探し、完了・未完了はチェックだけ、更新はタイトルとプロジェクトを
+    書き換える。まだない行は今日期限の追加・更新のときだけ末尾に加える。
+    """
+    position = None
+    for index, line in enumerate(lines):
+        existing = Task.from_line(line)
+        if existing is not None and existing.todoist_id == task.todoist_id:
+            position = index
+            break
+
+    if position is None:
+        if event_name in ('item:added', 'item:updated') and due_today:
+            return lines + [task.to_line()]
+        return lines
+
+    existing = Task.from_line(lines[position])
+    if event_name == 'item:completed':
+        existing.checked = True
+    elif event_name == 'item:uncompleted':
+        existing.checked = False
+    else:
+        existing.title = task.title
+        existing.project = task.project
+    line = existing.to_line()
+    if line == lines[position]:
+        return lines
+    return lines[:position] + [line] + lines[position + 1:]
+
+
+class WebhookApplier:
+    """イベントを今日のノートの該当タスク行だけに反映する（SyncManagerのパス・対応表を使う）"""
+
+    def __init__(self, manager=None):
+        if manager is None:
+            from sync_daemon import load_bidirectional_sync
+
+            manager = load_bidirectional_sync().SyncManager()
+        self.manager = manager
+
+    def _project_label(self, item):
+        if not item.get('project_id'):
+            return 'Unknown'
+        try:
+            return self.manager.todoist.metadata.refresh().project_label(item)
+        except Exception as e:
+            print(f"⚠️ プロジェクト名を取得できませんでした: {e}")
+            return str(item['project_id'])
+
+    def apply(self, event):
+        """1件のイベントを反映し、ノートを書き込んだらTrue
+
+        書き込めなかった（衝突・エラー）場合は例外を送出し、Todoistの再送に任せる。
+        """
+        from note_writer import get_writer
+        from note_parser import note_date_from_path
+
+        event_name = event.get('event_name')
+        item = event.get('event_data') or {}
+        if event_name not in WEBHOOK_EVENTS or not item.get('id'):
+            print(f"⏭️ 対象外のイベント: {event_name}")
+            return False
+
+        daily_file = self.manager.get_daily_file_path()
+        note = note_date_from_path(daily_file) or daily_file
+        due = item.get('due')
+        due_today = bool(due) and due.get('date', '')[:10] == datetime.now().strftime("%Y-%m-%d")
+        task = Task(
+            item.get('content', ''), todoist_id=item['id'], project=self._project_label(item),
+            project_id=item.get('project_id'), flagged=True
+        )
+
+        def edit(content):
+            if content is None:
+                if not due_today or event_name not in ('item:added', 'item:updated'):
+                    return None
+                content = f"# {datetime.now().strftime('%Y-%m-%d')}\n\n## 今日のタスク\n\n"
+            lines = section_lines(content)
+            new_lines = apply_task_event(lines, event_name, task, due_today)
+            if new_lines is lines:
+                return content
+            return replace_task_section(content, new_lines, header=Config.TASK_SECTION_HEADER)
+
+        writer = get_writer()
+        writer.edit(daily_file, edit)
+        status = writer.flush().get(os.path.abspath(daily_file), 'unchanged')
+        if status in ('written', 'rebased'):
+            self.manager.identity.bind(item['id'], note, task.title)
+            self.manager.save_sync_data()
+            print(f"⚡ {event_name}: {task.title}")
+            return True
+        if status in ('conflict', 'error'):
+            raise RuntimeError(f"{daily_file} に書き込めませんでした ({status})")
+        return False
+
+
+class WebhookServer:
+    """Webhookを受け付けるHTTPサーバー
+
+    署名を検証し、ノートへの反映まで終えてから200を返す（反映は1件ずつ順に行う）。
+    配信IDは反映できたときだけ記録し、失敗したら500を返してTodoistに再送させる。
+    """
+
+    def __init__(self, applier, secret=None, host=None, port=None, deliveries=None):
+        self.applier = applier
+        self.secret = secret or Config.TODOIST_CLIENT_SECRET
+        if not self.secret:
+            raise ValueError("TODOIST_CLIENT_SECRET environment variable not set")
+        self.host = host or Config.WEBHOOK_HOST
+        self.port = Config.WEBHOOK_PORT if port is None else port
+        self.deliveries = deliveries or DeliveryLog()
+        self.lock = threading.Lock()
+        self.stats = {'accepted': 0, 'duplicates': 0, 'rejected': 0, 'applied': 0, 'failed': 0}
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.httpd.server_address[1]}{Config.WEBHOOK_PATH}"
+
+    def handle(self, headers, body):
+        """1件の配信を受け付け、返すHTTPステータスを返す"""
+        if not verify_signature(body, headers.get(SIGNATURE_HEADER), self.secret):
+            self.stats['rejected'] += 1
+            print("🚫 署名が一致しないWebhookを拒否しました")
+            return 401
+        try:
+            event = json.loads(body)
+        except ValueError:
+            self.stats['rejected'] += 1
+            return 400
+
+        delivery_id = headers.get(DELIVERY_HEADER)
+        with self.lock:
+            if delivery_id and self.deliveries.seen(delivery_id):
+                self.stats['duplicates'] += 1
+                return 200
+            self.stats['accepted'] += 1
+            try:
+                if self.applier.apply(event):
+                    self.stats['applied'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"❌ Webhookの反映エラー（再送を待ちます）: {e}")
+                return 500
+            if delivery_id:
+                self.deliveries.add(delivery_id)
+        return 200
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if self.path.split('?')[0] != Config.WEBHOOK_PATH:
+                    status = 404
+                else:
+                    body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                    status = server.handle(self.headers, body)
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        return Handler
+
+    def start(self):
+        """バックグラウンドで受け付けを開始"""
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"📡 Webhookを待ち受け中: {self.url}")
+        return self
+
+    def stop(self):
+        """受け付けを止めて終了"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("\n👋 Webhookサーバーを停止します")
+        finally:
+            self.stop()
+
+
+def replay(path, url=None, secret=None):
+    """記録したイベント（1行1件のJSON）に署名して送り、ステータスごとの件数を返す
+
+    配信IDは本文から決めるので、同じファイルを送り直すと再送として重複除去される。
+    """
+    from http_client import get_client
+
+    url = url or f"http://{Config.WEBHOOK_HOST}:{Config.WEBHOOK_PORT}{Config.WEBHOOK_PATH}"
+    secret = secret or Config.TODOIST_CLIENT_SECRET
+    statuses = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            body = json.dumps(json.loads(line), ensure_ascii=False).encode('utf-8')
+            headers = {
+                'Content-Type': 'application/json',
+                SIGNATURE_HEADER: sign(body, secret),
+                DELIVERY_HEADER: str(uuid.uuid5(uuid.NAMESPACE_URL, body.decode('utf-8'))),
+            }
+            response = get_client().post(url, data=body, headers=headers)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    print(f"📨 {sum(statuses.values())}件を送信: {statuses}")
+    return statuses
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="TodoistのWebhookでノートを即時更新")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Webhookを待ち受ける")
+    serve.add_argument("--host", help=f"待ち受けるアドレス（既定: {Config.WEBHOOK_HOST}）")
+    serve.add_argument("--port", type=int, help=f"待ち受けるポート（既定: {Config.WEBHOOK_PORT}）")
+    replayer = commands.add_parser("replay", help="記録したイベントに署名して送る")
+    replayer.add_argument("events", help="イベントのJSONLファイル")
+    replayer.add_argument("--url", help="送信先（既定: ローカルの待ち受けURL）")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "replay":
+            replay(args.events, args.url)
+        else:
+            WebhookServer(WebhookApplier(), host=args.host, port=args.port).serve_forever()
+    except Exception as e:
+        print(f"❌ Webhookエラー: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()